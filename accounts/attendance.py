@@ -0,0 +1,75 @@
+"""
+accounts/attendance.py — 当日の勤怠状態（出勤時刻・退勤済みか）のキャッシュ
+
+ナビゲーションの勤怠表示（context_processors.internal_nav_context）は全画面の描画で使われるため、
+LoginActivity を毎回引かずに、ユーザー × 勤務日の状態をキャッシュ（django.core.cache）から読む。
+
+  書き込み : google_login（出勤）・clock_out_view（退勤）で remember(activity)、勤怠修正で forget()
+  参照     : get_today_state(user) — キャッシュになければ LoginActivity を 1 回引いて保存する
+  有効期限 : ATTENDANCE_CACHE_TTL_SEC（管理画面からの修正など、上記以外の書き込みはこの時間で反映される）
+
+出勤・退勤・勤怠修正は別のワーカーで処理されることがあるため、キャッシュはワーカー間で共有される
+バックエンド（CACHE_BACKEND=redis / db / file）のときだけ使う。locmem ではワーカーごとに古い状態が
+残ってしまうので、キャッシュせず毎回 LoginActivity を引く。
+勤務時間（分）は出勤時刻から参照時点までを都度計算するため、キャッシュは出勤・退勤時にしか変わらない。
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import LoginActivity
+
+logger = logging.getLogger(__name__)
+
+
+def uses_shared_cache() -> bool:
+    """勤怠状態をキャッシュするか（ワーカー間で共有されるキャッシュのときだけ True）"""
+    return settings.CACHE_BACKEND != 'locmem'
+
+
+def _cache_key(user_id, work_date) -> str:
+    return f'attendance:{user_id}:{work_date.isoformat()}'
+
+
+def _state(activity: LoginActivity | None) -> dict:
+    """キャッシュに置く状態（その日の記録がなければ login_at=None）"""
+    if activity is None:
+        return {'login_at': None, 'logout_at': None, 'work_minutes': 0}
+    return {
+        'login_at': activity.login_at,
+        'logout_at': activity.logout_at,
+        'work_minutes': activity.work_minutes,
+    }
+
+
+def remember(activity: LoginActivity) -> None:
+    """出勤・退勤した勤怠（その日の最初の記録）をキャッシュに書き込む"""
+    if not uses_shared_cache():
+        return
+    cache.set(_cache_key(activity.user_id, activity.work_date), _state(activity), settings.ATTENDANCE_CACHE_TTL_SEC)
+
+
+def forget(user_id, work_date) -> None:
+    """勤怠を修正したとき、次の参照で読み直させる"""
+    if not uses_shared_cache():
+        return
+    cache.delete(_cache_key(user_id, work_date))
+
+
+def get_today_state(user) -> dict:
+    """当日の勤怠状態 {'login_at', 'logout_at', 'work_minutes'}（記録がなければ login_at=None）"""
+    today = timezone.localdate(timezone.now())
+    if not uses_shared_cache():
+        return _state(_load(user, today))
+    key = _cache_key(user.pk, today)
+    state = cache.get(key)
+    if state is None:
+        state = _state(_load(user, today))
+        cache.set(key, state, settings.ATTENDANCE_CACHE_TTL_SEC)
+    return state
+
+
+def _load(user, work_date) -> LoginActivity | None:
+    return LoginActivity.objects.filter(user=user, work_date=work_date).order_by('login_at').first()
@@ -1,6 +1,6 @@
 from django.utils import timezone
 
-from .models import LoginActivity
+from . import attendance
 
 
 def internal_nav_context(request):
@@ -12,13 +12,10 @@ def internal_nav_context(request):
             'attendance_is_clocked_out': False,
         }
 
-    today = timezone.localdate(timezone.now())
-    today_session = LoginActivity.objects.filter(
-        user=request.user,
-        work_date=today,
-    ).order_by('login_at').first()
+    # 当日の出勤時刻・退勤状態はキャッシュから読む（勤務時間はここで計算する）
+    today_state = attendance.get_today_state(request.user)
 
-    if not today_session:
+    if not today_state['login_at']:
         return {
             'attendance_login_at_iso': '',
             'attendance_login_at_label': '-',
@@ -26,13 +23,13 @@ def internal_nav_context(request):
             'attendance_is_clocked_out': False,
         }
 
-    login_at_local = timezone.localtime(today_session.login_at)
-    is_clocked_out = bool(today_session.logout_at)
+    login_at_local = timezone.localtime(today_state['login_at'])
+    is_clocked_out = bool(today_state['logout_at'])
     if is_clocked_out:
-        worked_minutes = today_session.work_minutes
+        worked_minutes = today_state['work_minutes']
     else:
         now = timezone.now()
-        worked_minutes = max(int((now - today_session.login_at).total_seconds() // 60), 0)
+        worked_minutes = max(int((now - today_state['login_at']).total_seconds() // 60), 0)
 
     return {
         'attendance_login_at_iso': login_at_local.isoformat(),
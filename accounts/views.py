@@ -19,6 +19,7 @@ from django.views.decorators.http import require_GET, require_POST
 from google.auth.transport import requests as google_requests
 from google.oauth2 import id_token
 
+from . import attendance
 from .models import LoginActivity, Store, UserProfile
 
 
@@ -148,13 +149,14 @@ def google_login(request):
     ).order_by('login_at').first()
 
     if not today_session:
-        LoginActivity.objects.create(
+        today_session = LoginActivity.objects.create(
             user=user,
             work_date=today,
             login_at=now,
         )
     else:
         logger.info(f'Today login activity exists for user={user.username}, reuse existing record')
+    attendance.remember(today_session)
 
     return redirect(settings.LOGIN_REDIRECT_URL)
 
@@ -176,6 +178,7 @@ def clock_out_view(request):
         ).order_by('login_at').first()
         if open_session:
             open_session.close_session(timezone.now())
+            attendance.remember(open_session)
 
     logout(request)
     return redirect(settings.LOGOUT_REDIRECT_URL)
@@ -623,6 +626,8 @@ def attendance_update_day(request, pk):
             work_minutes=raw_work_min,
         )
 
+    attendance.forget(act.user_id, act.work_date)
+
     display_work_min, display_overtime_min = _calc_day_attendance(act)
 
     return JsonResponse({
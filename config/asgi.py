@@ -3,6 +3,18 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+サイドバーの新着通知（/sateiinfo/api/check-new/stream/）は Server-Sent Events で
+接続を保持するため、本番は ASGI サーバーで配信する:
+
+    uvicorn config.asgi:application --host 0.0.0.0 --port 8000
+
+WSGI（runserver・gunicorn 等）で動かした場合、ストリームとロングポーリング（/sateiinfo/api/check-new/wait/）は
+ワーカーを占有しないよう即座に 503 を返し、クライアントは 30 秒ごとの定期ポーリング
+（/sateiinfo/api/check-new/）に切り替わる。
+
+CSV 出力（車両一覧・在庫管理表・古物台帳）は WSGI / ASGI のどちらでも逐次送信する
+（ASGI では非同期イテレータで返す。views/utils.py の _streaming_csv_response）。
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
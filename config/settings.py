@@ -11,7 +11,10 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
+import sys
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # .envファイル読み込み
@@ -114,6 +117,51 @@ DATABASES = {
 }
 
 
+# キャッシュ（gunicorn の複数ワーカーで集計結果などを共有する）
+#   CACHE_BACKEND=locmem : プロセスごとのメモリ（既定。ワーカー間では共有されない）
+#   CACHE_BACKEND=file   : CACHE_LOCATION のディレクトリ（単一サーバー構成向け）
+#   CACHE_BACKEND=db     : DB のキャッシュテーブル（python manage.py createcachetable が必要）
+#   CACHE_BACKEND=redis  : REDIS_URL（redis パッケージが必要）
+# 未指定時は REDIS_URL が設定され redis パッケージがあれば redis、なければ locmem。
+# テスト実行時（manage.py test）は常に locmem を使う。
+REDIS_URL = os.getenv('REDIS_URL', '')
+_REDIS_AVAILABLE = bool(REDIS_URL) and importlib.util.find_spec('redis') is not None
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'redis' if _REDIS_AVAILABLE else 'locmem')
+if CACHE_BACKEND == 'redis' and not _REDIS_AVAILABLE:
+    CACHE_BACKEND = 'locmem'
+if sys.argv[1:2] == ['test']:
+    CACHE_BACKEND = 'locmem'
+
+_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'navikuru',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'var' / 'cache')),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', 'django_cache'),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    },
+}
+if CACHE_BACKEND not in _CACHE_BACKENDS:
+    raise ImproperlyConfigured(f'CACHE_BACKEND は {", ".join(_CACHE_BACKENDS)} のいずれかを指定してください: {CACHE_BACKEND}')
+
+CACHES = {
+    'default': {
+        **_CACHE_BACKENDS[CACHE_BACKEND],
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT_SEC', '300')),
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'navikuru'),
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -170,10 +218,23 @@ LOGOUT_REDIRECT_URL = '/login/'
 GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID', '')
 ALLOWED_GOOGLE_DOMAIN = os.getenv('ALLOWED_GOOGLE_DOMAIN', 'gigicompany.jp')
 
+# ダッシュボードの Google カレンダー / Chat フィード（home/google_feeds.py）
+# 取得結果を返す期間（秒）・期限切れ後も古い結果を返しつつ裏で取り直す期間（秒）・Chat のスペース取得の並列数
+GOOGLE_FEED_TTL_SEC           = int(os.getenv('GOOGLE_FEED_TTL_SEC', '60'))
+GOOGLE_FEED_STALE_SEC         = int(os.getenv('GOOGLE_FEED_STALE_SEC', '3600'))
+GOOGLE_CHAT_FETCH_CONCURRENCY = int(os.getenv('GOOGLE_CHAT_FETCH_CONCURRENCY', '4'))
+
+# ナビゲーションの勤怠表示キャッシュの有効期限（秒）。出勤・退勤・勤怠修正では即時に反映される
+# （CACHE_BACKEND=locmem ではワーカー間で共有できないためキャッシュせず、毎回 DB から読む）
+ATTENDANCE_CACHE_TTL_SEC = int(os.getenv('ATTENDANCE_CACHE_TTL_SEC', '300'))
+
 # 査定システム
 ASSESSMENT_SYSTEM_BASE_URL = os.getenv('ASSESSMENT_SYSTEM_BASE_URL', 'https://satei.u-car.co.jp')
 ASSESSMENT_SYSTEM_USER     = os.getenv('ASSESSMENT_SYSTEM_USER', '')
 ASSESSMENT_SYSTEM_PASSWORD = os.getenv('ASSESSMENT_SYSTEM_PASSWORD', '')
+# 先読みの同時ログイン数（使い終わったセッションはログアウトする）・取得結果のキャッシュ期間
+ASSESSMENT_SYSTEM_POOL_SIZE     = int(os.getenv('ASSESSMENT_SYSTEM_POOL_SIZE', '1'))
+ASSESSMENT_SYSTEM_CACHE_TTL_SEC = int(os.getenv('ASSESSMENT_SYSTEM_CACHE_TTL_SEC', '1800'))
 
 LOGGING = {
     'version': 1,
@@ -0,0 +1,326 @@
+"""
+home/google_feeds.py — ダッシュボードの Google カレンダー / Chat フィード
+
+calendar_events_api / chat_messages_api から呼ばれる。Google API の応答待ちで画面の読み込みが
+遅れないよう、取得結果を leads.services.caching でキャッシュする。
+
+  キャッシュ : settings.GOOGLE_FEED_TTL_SEC（既定 60 秒）の間は取得済みの結果を返す。期限切れ後も
+               GOOGLE_FEED_STALE_SEC（既定 1 時間）の間は古い結果をすぐ返し、裏で取り直す
+               （取り直しに失敗した場合も古い結果を返し続ける）
+  クライアント : 認証情報と discovery 済みのサービスはプロセス内で使い回し、トークンの期限切れや
+               トークンファイルの更新（setup_google_workspace_token）があったときだけ読み直す
+  Chat       : スペースごとのメッセージ取得を GOOGLE_CHAT_FETCH_CONCURRENCY 並列で行う
+
+API 呼び出しは _GoogleClient.execute() を通るため、検証時は _calendar_client / _chat_client を
+スタブに差し替えればよい（home/tests.py）。
+"""
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import httplib2
+from django.conf import settings
+from django.utils import timezone
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+from leads.services import caching
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
+CHAT_SCOPES = [
+    'https://www.googleapis.com/auth/chat.spaces.readonly',
+    'https://www.googleapis.com/auth/chat.messages.readonly',
+]
+
+
+class FeedUnavailable(Exception):
+    """取得に失敗した（result は画面に返すエラー内容。キャッシュはしない）"""
+
+    def __init__(self, result):
+        super().__init__(result['message'])
+        self.result = result
+
+
+# ---------------------------------------------------------------------------
+# 認証・クライアント
+# ---------------------------------------------------------------------------
+
+def _token_file():
+    return os.getenv('GOOGLE_WORKSPACE_TOKEN_FILE', 'token_workspace.json')
+
+
+def _token_mtime():
+    try:
+        return os.path.getmtime(_token_file())
+    except OSError:
+        return None
+
+
+def _get_google_credentials(required_scopes):
+    credentials_file = os.getenv('GMAIL_CREDENTIALS_FILE', 'credentials.json')
+    token_file = _token_file()
+
+    if not os.path.exists(credentials_file):
+        return None, 'Google認証ファイル(credentials.json)が見つかりません。'
+
+    if not os.path.exists(token_file):
+        return None, f'Google Workspaceトークン({token_file})が見つかりません。setup_google_workspace_token を実行してください。'
+
+    try:
+        with open(token_file, 'r', encoding='utf-8') as token_handle:
+            token_payload = json.load(token_handle)
+        granted_scopes = set(token_payload.get('scopes') or [])
+        missing_scopes = [scope for scope in required_scopes if scope not in granted_scopes]
+        if missing_scopes:
+            return None, 'Googleトークンの権限が不足しています。setup_google_workspace_token を実行して再認証してください。'
+    except Exception:
+        return None, f'{token_file} の読み込みに失敗しました。setup_google_workspace_token で再作成してください。'
+
+    try:
+        creds = Credentials.from_authorized_user_file(token_file, required_scopes)
+    except Exception:
+        return None, f'{token_file} の読み込みに失敗しました。setup_google_workspace_token で再作成してください。'
+
+    if not creds.valid:
+        if creds.expired and creds.refresh_token:
+            try:
+                creds.refresh(Request())
+                with open(token_file, 'w', encoding='utf-8') as token_handle:
+                    token_handle.write(creds.to_json())
+            except Exception:
+                return None, 'Googleトークンの更新に失敗しました。再認証してください。'
+        else:
+            return None, 'Googleトークンが無効です。再認証してください。'
+
+    if not creds.has_scopes(required_scopes):
+        return None, 'Googleトークンに必要な権限(scope)が不足しています。setup_google_workspace_token を実行して再認証してください。'
+
+    return creds, ''
+
+
+class _GoogleClient:
+    """認証情報と discovery 済みのサービスをプロセス内で使い回す"""
+
+    def __init__(self, api, version, scopes):
+        self._api = api
+        self._version = version
+        self._scopes = scopes
+        self._lock = threading.Lock()
+        self._creds = None
+        self._service = None
+        self._token_mtime = None
+        self._local = threading.local()
+
+    def get(self):
+        """(service, エラーメッセージ)。トークンが期限切れ・更新済みのときだけ読み直す"""
+        with self._lock:
+            if self._service is None or not self._creds.valid or _token_mtime() != self._token_mtime:
+                creds, error_message = _get_google_credentials(self._scopes)
+                if not creds:
+                    self._creds = self._service = None
+                    return None, error_message
+                self._creds = creds
+                self._token_mtime = _token_mtime()
+                self._service = build(self._api, self._version, credentials=creds, cache_discovery=False)
+            return self._service, ''
+
+    def execute(self, request):
+        """スレッドごとの HTTP 接続で実行する（httplib2.Http はスレッド間で共有できないため）"""
+        http = getattr(self._local, 'http', None)
+        if http is None or http.credentials is not self._creds:
+            http = AuthorizedHttp(self._creds, http=httplib2.Http())
+            self._local.http = http
+        return request.execute(http=http)
+
+
+_calendar_client = _GoogleClient('calendar', 'v3', CALENDAR_SCOPES)
+_chat_client = _GoogleClient('chat', 'v1', CHAT_SCOPES)
+
+
+# ---------------------------------------------------------------------------
+# 取得・整形
+# ---------------------------------------------------------------------------
+
+def _parse_google_datetime(value):
+    if not value:
+        return None
+
+    try:
+        normalized = value.replace('Z', '+00:00')
+        parsed = datetime.fromisoformat(normalized)
+    except ValueError:
+        return None
+
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_current_timezone())
+
+    return timezone.localtime(parsed)
+
+
+def _extract_http_error_message(error):
+    try:
+        payload = json.loads(error.content.decode('utf-8'))
+        return payload.get('error', {}).get('message') or str(error)
+    except Exception:
+        return str(error)
+
+
+def _fetch_calendar_events(limit):
+    service, error_message = _calendar_client.get()
+    if not service:
+        raise FeedUnavailable({
+            'success': False,
+            'message': error_message,
+            'items': [],
+        })
+
+    try:
+        response = _calendar_client.execute(service.events().list(
+            calendarId='primary',
+            timeMin=timezone.now().isoformat(),
+            maxResults=limit,
+            singleEvents=True,
+            orderBy='startTime',
+        ))
+    except HttpError as error:
+        raise FeedUnavailable({
+            'success': False,
+            'message': f'カレンダー取得に失敗しました: {_extract_http_error_message(error)}',
+            'items': [],
+        })
+
+    items = []
+    for event in response.get('items', []):
+        start_info = event.get('start', {})
+        date_time_value = start_info.get('dateTime')
+        date_value = start_info.get('date')
+
+        if date_time_value:
+            local_dt = _parse_google_datetime(date_time_value)
+            start_label = local_dt.strftime('%m/%d %H:%M') if local_dt else date_time_value
+        elif date_value:
+            try:
+                start_label = datetime.fromisoformat(date_value).strftime('%m/%d 終日')
+            except ValueError:
+                start_label = f'{date_value} 終日'
+        else:
+            start_label = '-'
+
+        items.append({
+            'summary': event.get('summary') or '(タイトル未設定)',
+            'start': start_label,
+            'location': event.get('location') or '-',
+            'link': event.get('htmlLink') or 'https://calendar.google.com/',
+        })
+
+    return {
+        'success': True,
+        'message': '',
+        'items': items,
+    }
+
+
+def _fetch_chat_messages(limit_spaces, messages_per_space):
+    service, error_message = _chat_client.get()
+    if not service:
+        raise FeedUnavailable({
+            'success': False,
+            'message': error_message,
+            'items': [],
+        })
+
+    try:
+        spaces_response = _chat_client.execute(service.spaces().list(pageSize=limit_spaces))
+    except HttpError as error:
+        detailed = _extract_http_error_message(error)
+        if 'Google Chat app not found' in detailed:
+            detailed = 'Google Chat API の「Configuration」で Chat アプリを作成・有効化してください。'
+        raise FeedUnavailable({
+            'success': False,
+            'message': f'チャット取得に失敗しました: {detailed}',
+            'items': [],
+        })
+
+    space_items = [space for space in spaces_response.get('spaces', []) if space.get('name')]
+
+    def fetch_space_messages(space):
+        try:
+            return _chat_client.execute(service.spaces().messages().list(
+                parent=space['name'],
+                pageSize=messages_per_space,
+            ))
+        except HttpError:
+            return {}
+
+    # スペースごとのメッセージ取得は並行に行う（結果はスペースの順序のまま並べる）
+    message_responses = []
+    if space_items:
+        with ThreadPoolExecutor(max_workers=min(max(settings.GOOGLE_CHAT_FETCH_CONCURRENCY, 1), len(space_items))) as pool:
+            message_responses = list(pool.map(fetch_space_messages, space_items))
+
+    flattened_messages = []
+    for space, message_response in zip(space_items, message_responses):
+        space_label = space.get('displayName') or 'スペース'
+
+        for message in message_response.get('messages', []):
+            created_at = _parse_google_datetime(message.get('createTime'))
+            created_label = created_at.strftime('%m/%d %H:%M') if created_at else '-'
+            sender = message.get('sender', {}).get('displayName') or '-'
+
+            flattened_messages.append({
+                'space': space_label,
+                'text': message.get('text') or '(本文なし)',
+                'sender': sender,
+                'time': created_label,
+                'link': 'https://chat.google.com/',
+            })
+
+    if not flattened_messages:
+        return {
+            'success': True,
+            'message': '',
+            'items': [],
+        }
+
+    flattened_messages.sort(key=lambda item: item['time'], reverse=True)
+
+    return {
+        'success': True,
+        'message': '',
+        'items': flattened_messages[: max(messages_per_space * limit_spaces, 1)],
+    }
+
+
+# ---------------------------------------------------------------------------
+# キャッシュ付きの取得（ビューから呼ぶ）
+# ---------------------------------------------------------------------------
+
+def _cached_feed(name, params, fetch):
+    key = caching.make_key('google_feed', name, *params)
+    try:
+        return caching.get_or_compute(
+            key, fetch, settings.GOOGLE_FEED_TTL_SEC,
+            stale_timeout=settings.GOOGLE_FEED_STALE_SEC,
+            refresh_in_background=True,
+        )
+    except FeedUnavailable as e:
+        return e.result
+
+
+def get_upcoming_calendar_events(limit=10):
+    return _cached_feed('calendar', (limit,), lambda: _fetch_calendar_events(limit))
+
+
+def get_recent_chat_messages(limit_spaces=3, messages_per_space=3):
+    return _cached_feed(
+        'chat', (limit_spaces, messages_per_space),
+        lambda: _fetch_chat_messages(limit_spaces, messages_per_space),
+    )
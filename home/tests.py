@@ -0,0 +1,186 @@
+import json
+import threading
+from unittest import mock
+
+import httplib2
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from googleapiclient.errors import HttpError
+
+from . import google_feeds
+
+
+class _Request:
+    """API のリクエスト（execute すると response を返す）"""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class _Resource:
+    """service.events() / spaces() / messages() の代わり。list(**kwargs) を responder に渡す"""
+
+    def __init__(self, responder, **children):
+        self._responder = responder
+        self._children = children
+
+    def list(self, **kwargs):
+        return _Request(self._responder(**kwargs))
+
+    def __getattr__(self, name):
+        try:
+            return lambda: self._children[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class _StubClient:
+    """_GoogleClient の代わり。API は呼ばず、呼ばれた回数だけ数える"""
+
+    def __init__(self, service=None, error_message=''):
+        self.service = service
+        self.error_message = error_message
+        self.executed = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.service is None:
+            return None, self.error_message
+        return self.service, ''
+
+    def execute(self, request):
+        with self._lock:
+            self.executed += 1
+        if isinstance(request.response, Exception):
+            raise request.response
+        return request.response
+
+
+def _http_error(status, message):
+    return HttpError(httplib2.Response({'status': status}), json.dumps({'error': {'message': message}}).encode('utf-8'))
+
+
+class GoogleFeedTests(SimpleTestCase):
+    """Google カレンダー / Chat フィードの整形とキャッシュ（API クライアントはスタブに差し替える）"""
+
+    def setUp(self):
+        cache.clear()
+
+    def patch_client(self, name, client):
+        patcher = mock.patch.object(google_feeds, name, client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return client
+
+    def calendar_service(self, items):
+        return mock.Mock(events=lambda: _Resource(lambda **kwargs: {'items': items}))
+
+    def test_calendar_events_are_formatted_and_cached(self):
+        client = self.patch_client('_calendar_client', _StubClient(self.calendar_service([
+            {
+                'summary': '査定',
+                'start': {'dateTime': '2026-10-20T01:30:00Z'},
+                'location': 'つくば店',
+                'htmlLink': 'https://calendar.google.com/event?eid=1',
+            },
+            {'start': {'date': '2026-10-21'}},
+        ])))
+
+        result = google_feeds.get_upcoming_calendar_events(limit=5)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['items'], [
+            {
+                'summary': '査定',
+                'start': '10/20 10:30',
+                'location': 'つくば店',
+                'link': 'https://calendar.google.com/event?eid=1',
+            },
+            {
+                'summary': '(タイトル未設定)',
+                'start': '10/21 終日',
+                'location': '-',
+                'link': 'https://calendar.google.com/',
+            },
+        ])
+
+        # TTL 内は API を呼ばずキャッシュから返す
+        self.assertEqual(google_feeds.get_upcoming_calendar_events(limit=5), result)
+        self.assertEqual(client.executed, 1)
+
+    @override_settings(GOOGLE_FEED_TTL_SEC=0, GOOGLE_FEED_STALE_SEC=0)
+    def test_calendar_cache_follows_settings(self):
+        client = self.patch_client('_calendar_client', _StubClient(self.calendar_service([
+            {'summary': '査定', 'start': {'date': '2026-10-20'}},
+        ])))
+
+        # TTL 0 なら毎回 API から取り直す
+        google_feeds.get_upcoming_calendar_events()
+        google_feeds.get_upcoming_calendar_events()
+        self.assertEqual(client.executed, 2)
+
+    def test_calendar_failures_are_not_cached(self):
+        client = self.patch_client('_calendar_client', _StubClient(error_message='トークンがありません'))
+
+        result = google_feeds.get_upcoming_calendar_events()
+        self.assertEqual(result, {'success': False, 'message': 'トークンがありません', 'items': []})
+
+        # 認証が直ったら次の呼び出しで取り直す
+        client.service = self.calendar_service([{'summary': '商談', 'start': {}}])
+        result = google_feeds.get_upcoming_calendar_events()
+        self.assertTrue(result['success'])
+        self.assertEqual([item['summary'] for item in result['items']], ['商談'])
+
+    def test_calendar_http_error_message(self):
+        error = _http_error(403, 'Calendar API has not been used')
+        service = mock.Mock(events=lambda: _Resource(lambda **kwargs: error))
+        self.patch_client('_calendar_client', _StubClient(service))
+
+        result = google_feeds.get_upcoming_calendar_events()
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['message'], 'カレンダー取得に失敗しました: Calendar API has not been used')
+
+    def test_chat_messages_from_each_space(self):
+        messages_by_space = {
+            'spaces/a': {'messages': [
+                {'text': '入庫しました', 'sender': {'displayName': '佐藤'}, 'createTime': '2026-10-18T00:00:00Z'},
+            ]},
+            'spaces/b': _http_error(500, 'backend error'),
+            'spaces/c': {'messages': [
+                {'sender': {'displayName': '鈴木'}, 'createTime': '2026-10-18T02:00:00Z'},
+            ]},
+        }
+        spaces = [
+            {'name': 'spaces/a', 'displayName': '入庫'},
+            {'name': 'spaces/b', 'displayName': '障害'},
+            {'name': 'spaces/c'},
+            {'displayName': '名前なし'},
+        ]
+        service = mock.Mock(spaces=lambda: _Resource(
+            lambda **kwargs: {'spaces': spaces},
+            messages=_Resource(lambda parent, pageSize: messages_by_space[parent]),
+        ))
+        client = self.patch_client('_chat_client', _StubClient(service))
+
+        result = google_feeds.get_recent_chat_messages(limit_spaces=3, messages_per_space=2)
+
+        # 取得に失敗したスペースは飛ばし、新しい順に並べる
+        self.assertTrue(result['success'])
+        self.assertEqual(result['items'], [
+            {'space': 'スペース', 'text': '(本文なし)', 'sender': '鈴木', 'time': '10/18 11:00',
+             'link': 'https://chat.google.com/'},
+            {'space': '入庫', 'text': '入庫しました', 'sender': '佐藤', 'time': '10/18 09:00',
+             'link': 'https://chat.google.com/'},
+        ])
+        self.assertEqual(client.executed, 4)  # スペース一覧 + 名前のある 3 スペース
+
+    def test_chat_app_not_configured(self):
+        error = _http_error(404, 'Google Chat app not found.')
+        service = mock.Mock(spaces=lambda: _Resource(lambda **kwargs: error))
+        self.patch_client('_chat_client', _StubClient(service))
+
+        result = google_feeds.get_recent_chat_messages()
+
+        self.assertFalse(result['success'])
+        self.assertIn('Chat アプリを作成・有効化してください', result['message'])
@@ -21,9 +21,8 @@ from .services import (
     get_store_performance_summary,
     get_user_period_kpis,
     get_user_sales_process_next_steps,
-    get_upcoming_calendar_events,
-    get_recent_chat_messages,
 )
+from .google_feeds import get_recent_chat_messages, get_upcoming_calendar_events
 
 
 @login_required
@@ -0,0 +1,60 @@
+"""
+電話番号の正規化カラム（phone_digits）を埋め直す
+
+マイグレーション 0043 適用後の既存データ、および QuerySet.update() / bulk_create() で
+phone_number を書き換えた行（save() を通らないため phone_digits が更新されない）に使う。
+
+使い方:
+  python manage.py backfill_phone_digits
+  python manage.py backfill_phone_digits --all
+"""
+from django.core.management.base import BaseCommand
+
+from leads.models import CarAssessmentRequest, Customer, normalize_phone_digits
+
+_MODELS = [
+    ('customer', Customer),
+    ('assessment_request', CarAssessmentRequest),
+]
+
+
+class Command(BaseCommand):
+    help = '顧客・査定申込の電話番号から数字のみの正規化カラム（phone_digits）を埋めます。'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='phone_digits が入っている行も含めて全件を再計算する（既定: 未設定の行のみ）',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='一度に読み込む・書き込む件数（既定: 2000）',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        for label, model in _MODELS:
+            queryset = model.objects.order_by('pk').only('pk', 'phone_number', 'phone_digits')
+            if not options['all']:
+                queryset = queryset.filter(phone_digits='')
+
+            updated = 0
+            batch = []
+            for obj in queryset.iterator(chunk_size=chunk_size):
+                digits = normalize_phone_digits(obj.phone_number)
+                if digits == obj.phone_digits:
+                    continue
+                obj.phone_digits = digits
+                batch.append(obj)
+                if len(batch) >= chunk_size:
+                    model.objects.bulk_update(batch, ['phone_digits'])
+                    updated += len(batch)
+                    batch = []
+            if batch:
+                model.objects.bulk_update(batch, ['phone_digits'])
+                updated += len(batch)
+
+            self.stdout.write(self.style.SUCCESS(f'{label}: {updated:,} 件を更新しました'))
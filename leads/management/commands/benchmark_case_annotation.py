@@ -0,0 +1,152 @@
+"""
+査定申込一覧の案件情報（case_status / case_id）付与方式のベンチマーク
+
+旧方式（相関サブクエリ 2 本）と現方式（with_case_fields: LEFT JOIN 1 本）について、
+指定件数のダミーデータを投入した状態で実行計画とレイテンシを比較する。
+ダミーデータはトランザクション内で投入し、計測後にロールバックする。
+
+使い方:
+  python manage.py benchmark_case_annotation --rows 100000 1000000
+"""
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import CharField, IntegerField, OuterRef, Subquery
+from django.utils import timezone
+
+from leads.models import Assessment, CarAssessmentRequest, Customer, Vehicle
+
+_BATCH_SIZE = 5000
+
+
+def _legacy_case_fields(queryset):
+    """旧方式: Assessment への相関サブクエリを 2 本付与する"""
+    case_status_subq = Assessment.objects.filter(
+        assessment_request_id=OuterRef('pk')
+    ).values('status')[:1]
+    case_id_subq = Assessment.objects.filter(
+        assessment_request_id=OuterRef('pk')
+    ).values('pk')[:1]
+    return queryset.annotate(
+        case_status=Subquery(case_status_subq, output_field=CharField()),
+        case_id=Subquery(case_id_subq, output_field=IntegerField()),
+    )
+
+
+def _joined_case_fields(queryset):
+    """現方式: OneToOne 逆参照の LEFT JOIN 1 本"""
+    return queryset.with_case_fields()
+
+
+_STRATEGIES = [
+    ('subquery', _legacy_case_fields),
+    ('join',     _joined_case_fields),
+]
+
+_SCENARIOS = [
+    # (名前, クエリセット生成関数)
+    ('latest_100', lambda qs: qs.order_by('-application_datetime')[:100]),
+    ('search_page', lambda qs: qs.filter(address__icontains='東京').order_by('-application_datetime')[1000:1100]),
+]
+
+
+class Command(BaseCommand):
+    help = '査定申込一覧の案件情報付与（サブクエリ / JOIN）の実行計画とレイテンシを比較します（データはロールバック）。'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[100000, 1000000],
+            help='投入するダミー査定申込の件数（複数指定可。既定: 100000 1000000）',
+        )
+        parser.add_argument(
+            '--promoted-ratio',
+            type=float,
+            default=0.3,
+            help='案件に昇格済みとする割合（既定: 0.3）',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='各クエリの計測回数（既定: 5）',
+        )
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'=== {rows:,} 件 ==='))
+            with transaction.atomic():
+                self._seed(rows, options['promoted_ratio'])
+                self._run(options['repeat'])
+                transaction.set_rollback(True)
+
+    def _seed(self, rows, promoted_ratio):
+        User = get_user_model()
+        started = time.perf_counter()
+        user = User.objects.create(username=f'bench-{time.time_ns()}')
+        customer = Customer.objects.create(name='ベンチ 太郎', phone_number='0000000000')
+        vehicle = Vehicle.objects.create(maker='トヨタ', car_model='プリウス', year='2020年', mileage='3万Km')
+
+        base_dt = timezone.now()
+        addresses = ['東京都千代田区', '茨城県つくば市', '栃木県宇都宮市', '茨城県水戸市']
+        promote_every = max(1, round(1 / promoted_ratio)) if promoted_ratio > 0 else 0
+
+        for offset in range(0, rows, _BATCH_SIZE):
+            size = min(_BATCH_SIZE, rows - offset)
+            requests = CarAssessmentRequest.objects.bulk_create([
+                CarAssessmentRequest(
+                    application_number=f'BENCH-{offset + i:08d}',
+                    application_datetime=base_dt - timedelta(minutes=offset + i),
+                    customer_name='ベンチ 太郎',
+                    phone_number='0000000000',
+                    address=addresses[(offset + i) % len(addresses)],
+                )
+                for i in range(size)
+            ], batch_size=_BATCH_SIZE)
+
+            if promote_every:
+                if requests[0].pk is None:
+                    # pk を返さない DB バックエンド向け
+                    requests = list(
+                        CarAssessmentRequest.objects.filter(
+                            application_number__in=[r.application_number for r in requests],
+                        ).only('id')
+                    )
+                Assessment.objects.bulk_create([
+                    Assessment(
+                        assessment_request=req,
+                        customer=customer,
+                        vehicle=vehicle,
+                        assigned_to=user,
+                        status=Assessment.STATUS_IN_PROGRESS,
+                    )
+                    for idx, req in enumerate(requests) if idx % promote_every == 0
+                ], batch_size=_BATCH_SIZE)
+
+        self.stdout.write(f'  投入完了: {time.perf_counter() - started:.1f}s')
+
+    def _run(self, repeat):
+        base_qs = CarAssessmentRequest.objects.all()
+        for scenario_name, build in _SCENARIOS:
+            for strategy_name, annotate in _STRATEGIES:
+                queryset = build(annotate(base_qs)).values('id', 'case_status', 'case_id')
+
+                self.stdout.write(self.style.HTTP_INFO(f'--- {scenario_name} / {strategy_name} ---'))
+                self.stdout.write(queryset.explain())
+
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    list(queryset.all())  # 毎回クローンして結果キャッシュを使わない
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                self.stdout.write(
+                    f'  median={statistics.median(timings):.1f}ms '
+                    f'min={min(timings):.1f}ms max={max(timings):.1f}ms (n={repeat})'
+                )
@@ -0,0 +1,278 @@
+"""
+古物台帳 PDF（ledger_pdf）の生成ベンチマーク
+
+旧方式（全セル Paragraph の platypus Table）と現方式（services/pdf_report の canvas 直接描画）について、
+指定件数のダミー契約を投入した状態で生成時間とピークメモリ（tracemalloc）を比較する。
+ダミーデータはトランザクション内で投入し、計測後にロールバックする。
+任意の計測ツール（PDF が正しく生成されることの確認は leads/tests.py の VehicleExportPdfTests）。
+
+使い方:
+  python manage.py benchmark_ledger_pdf --rows 10000
+  python manage.py benchmark_ledger_pdf --rows 10000 --skip-legacy
+"""
+import io
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from leads.models import Assessment, CarAssessmentRequest, Customer, PurchaseContract, Vehicle
+from leads.services.vehicle_export import (
+    QUERY_CHUNK_SIZE, SCOPE_ALL, SEARCH_PARAM_KEYS, build_contract_queryset, render_ledger_pdf, tristate_label,
+)
+
+_BATCH_SIZE = 2000
+
+# ダミー顧客名（検索条件の customer_name でダミー分だけに絞り込む）
+_BENCH_NAME = 'ベンチ顧客'
+
+_ADDRESSES = [
+    '茨城県つくば市研究学園1丁目1番地1 ベンチマンション101号室',
+    '東京都千代田区丸の内1-1-1',
+    '栃木県小山市城山町3丁目',
+    '茨城県水戸市三の丸1-5-38 ベンチビル5F',
+]
+
+
+def _legacy_render_ledger_pdf(out, scope, params):
+    """旧方式: 全セルを Paragraph（CJK 折り返し）にした platypus Table を一括で組版する"""
+    import unicodedata
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import mm
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    pdfmetrics.registerFont(UnicodeCIDFont('HeiseiKakuGo-W5'))
+    FONT = 'HeiseiKakuGo-W5'
+
+    def n(text):
+        return unicodedata.normalize('NFC', str(text)) if text else ''
+
+    maker, car_model, chassis_number, customer_name, date_from, date_to = (params.get(k, '') for k in SEARCH_PARAM_KEYS)
+    qs = build_contract_queryset(scope, **params)
+
+    doc = SimpleDocTemplate(
+        out,
+        pagesize=landscape(A4),
+        rightMargin=8 * mm, leftMargin=8 * mm,
+        topMargin=12 * mm, bottomMargin=12 * mm,
+    )
+
+    title_style = ParagraphStyle('T', fontName=FONT, fontSize=13, spaceAfter=4)
+    sub_style   = ParagraphStyle('S', fontName=FONT, fontSize=8, spaceAfter=2,
+                                 textColor=colors.HexColor('#6c757d'))
+    cell_style  = ParagraphStyle('C', fontName=FONT, fontSize=6.5, leading=9,
+                                 wordWrap='CJK', spaceAfter=0, spaceBefore=0)
+    head_style  = ParagraphStyle('H', fontName=FONT, fontSize=7, leading=9,
+                                 wordWrap='CJK', textColor=colors.white,
+                                 spaceAfter=0, spaceBefore=0)
+
+    def cell(text):
+        return Paragraph(n(text), cell_style)
+
+    elements = []
+    elements.append(Paragraph(n('古物台帳'), title_style))
+
+    filter_parts = []
+    if date_from or date_to:
+        filter_parts.append(f'期間: {date_from} ～ {date_to}')
+    if maker:         filter_parts.append(f'メーカー: {n(maker)}')
+    if car_model:     filter_parts.append(f'車種: {n(car_model)}')
+    if customer_name: filter_parts.append(f'顧客名: {n(customer_name)}')
+    if filter_parts:
+        elements.append(Paragraph('  '.join(filter_parts), sub_style))
+    elements.append(Spacer(1, 4 * mm))
+
+    # 合計 281mm（余白込みで A4 横 = 297-16 = 281mm に収める）
+    headers_text = [
+        '車種名', '契約日', '車体番号', '車両\nナンバー', '買取金額\n（税込）',
+        '顧客名', '住所', '免許証番号', 'T\nナンバー', '職業', '生年月日',
+        '売却日', '売却金額', '売却先',
+    ]
+    col_widths = [
+        24*mm, 16*mm, 28*mm, 18*mm, 20*mm,
+        20*mm, 32*mm, 20*mm, 12*mm, 16*mm, 16*mm,
+        16*mm, 20*mm, 19*mm,
+    ]
+    # 合計: 277mm ✓
+
+    header_row = [Paragraph(n(h), head_style) for h in headers_text]
+    data = [header_row]
+
+    for c in qs.iterator(chunk_size=QUERY_CHUNK_SIZE):
+        v  = c.vehicle
+        cu = c.customer
+        sp = getattr(c, 'sales_process', None)
+        price = f'¥{int(c.purchase_price_incl_tax):,}' if c.purchase_price_incl_tax else ''
+        data.append([
+            cell(f'{n(v.maker)} {n(v.car_model)}'.strip()),
+            cell(str(c.contract_date) if c.contract_date else ''),
+            cell(n(v.chassis_number)),
+            cell(n(v.registration_number)),
+            cell(price),
+            cell(n(cu.name) if cu else ''),
+            cell(n(cu.address) if cu else ''),
+            cell(n(cu.license_number) if cu else ''),
+            cell(tristate_label(c.qualified_invoice_registered)),
+            cell(n(cu.occupation) if cu else ''),
+            cell(str(cu.birth_date) if cu and cu.birth_date else ''),
+            cell(str(sp.sold_at) if sp and sp.sold_at else ''),
+            cell(f'¥{int(sp.sold_price):,}' if sp and sp.sold_price else ''),
+            cell(n(sp.sold_destination.name) if sp and sp.sold_destination else ''),
+        ])
+
+    table = Table(data, colWidths=col_widths, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND',    (0, 0), (-1,  0), colors.HexColor('#343a40')),
+        ('ROWBACKGROUNDS',(0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+        ('ALIGN',         (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN',        (0, 0), (-1, -1), 'TOP'),
+        ('GRID',          (0, 0), (-1, -1), 0.4, colors.HexColor('#dee2e6')),
+        ('TOPPADDING',    (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+        ('LEFTPADDING',   (0, 0), (-1, -1), 3),
+        ('RIGHTPADDING',  (0, 0), (-1, -1), 3),
+    ]))
+    elements.append(table)
+
+    doc.build(elements)
+
+
+_STRATEGIES = [
+    ('legacy', _legacy_render_ledger_pdf),
+    ('fast',   render_ledger_pdf),
+]
+
+
+class Command(BaseCommand):
+    help = '古物台帳 PDF の生成時間とピークメモリを旧方式・現方式で比較します（データはロールバック）。'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[10000],
+            help='投入するダミー契約の件数（複数指定可。既定: 10000）',
+        )
+        parser.add_argument(
+            '--skip-legacy',
+            action='store_true',
+            help='旧方式の計測を省略する（件数が多いと数分かかるため）',
+        )
+
+    def handle(self, *args, **options):
+        strategies = [s for s in _STRATEGIES if not (options['skip_legacy'] and s[0] == 'legacy')]
+        for rows in options['rows']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'=== {rows:,} 件 ==='))
+            with transaction.atomic():
+                self._seed(rows)
+                for name, render in strategies:
+                    self._run(name, render)
+                transaction.set_rollback(True)
+
+    def _seed(self, rows):
+        User = get_user_model()
+        started = time.perf_counter()
+        tag = time.time_ns() % 10**8
+        user = User.objects.create(username=f'bench-{tag}', last_name='ベンチ', first_name='担当')
+
+        customers = Customer.objects.bulk_create([
+            Customer(
+                name=f'{_BENCH_NAME}{i:03d} 太郎',
+                phone_number=f'0900000{i:04d}',
+                address=_ADDRESSES[i % len(_ADDRESSES)],
+                license_number=f'1234567890{i:02d}',
+                occupation='会社員',
+                birth_date=date(1970, 1, 1) + timedelta(days=i * 97),
+            )
+            for i in range(100)
+        ])
+        vehicles = Vehicle.objects.bulk_create([
+            Vehicle(
+                maker='トヨタ', car_model=f'プリウス Sツーリングセレクション {i}', year='2020年', mileage='3万Km',
+                chassis_number=f'ZVW30-{i:07d}', registration_number=f'つくば 300 あ {i:02d}-{i:02d}',
+            )
+            for i in range(100)
+        ])
+        if customers[0].pk is None or vehicles[0].pk is None:
+            # pk を返さない DB バックエンド向け
+            customers = list(Customer.objects.filter(name__startswith=_BENCH_NAME).order_by('pk'))
+            vehicles = list(Vehicle.objects.filter(chassis_number__startswith='ZVW30-').order_by('pk'))
+
+        today = timezone.localdate()
+        for offset in range(0, rows, _BATCH_SIZE):
+            size = min(_BATCH_SIZE, rows - offset)
+            numbers = [f'BL{tag}-{offset + i:07d}' for i in range(size)]
+            CarAssessmentRequest.objects.bulk_create([
+                CarAssessmentRequest(
+                    application_number=number,
+                    application_datetime=timezone.now(),
+                    customer_name=_BENCH_NAME,
+                    phone_number='0000000000',
+                )
+                for number in numbers
+            ], batch_size=_BATCH_SIZE)
+            request_ids = list(
+                CarAssessmentRequest.objects.filter(application_number__in=numbers)
+                .order_by('application_number').values_list('pk', flat=True)
+            )
+            Assessment.objects.bulk_create([
+                Assessment(
+                    assessment_request_id=request_id,
+                    customer=customers[(offset + i) % len(customers)],
+                    vehicle=vehicles[(offset + i) % len(vehicles)],
+                    assigned_to=user,
+                    status=Assessment.STATUS_CONTRACTED,
+                )
+                for i, request_id in enumerate(request_ids)
+            ], batch_size=_BATCH_SIZE)
+            assessments = list(
+                Assessment.objects.filter(assessment_request_id__in=request_ids)
+                .order_by('assessment_request_id').values_list('pk', 'customer_id', 'vehicle_id')
+            )
+            PurchaseContract.objects.bulk_create([
+                PurchaseContract(
+                    assessment_id=assessment_id,
+                    customer_id=customer_id,
+                    vehicle_id=vehicle_id,
+                    assigned_to=user,
+                    approved_by=user,
+                    contract_date=today - timedelta(days=(offset + i) % 1000),
+                    purchase_price_excl_tax=Decimal(1000000),
+                    tax_amount=Decimal(100000),
+                    purchase_price_incl_tax=Decimal(1100000 + i),
+                    qualified_invoice_registered=(None, True, False)[i % 3],
+                )
+                for i, (assessment_id, customer_id, vehicle_id) in enumerate(assessments)
+            ], batch_size=_BATCH_SIZE)
+
+        self.stdout.write(f'  投入完了: {time.perf_counter() - started:.1f}s')
+
+    def _run(self, name, render):
+        params = {key: '' for key in SEARCH_PARAM_KEYS}
+        params['customer_name'] = _BENCH_NAME
+
+        out = io.BytesIO()
+        started = time.perf_counter()
+        render(out, SCOPE_ALL, params)
+        elapsed = time.perf_counter() - started
+
+        # tracemalloc は処理を遅くするため、時間とは別に計測する
+        tracemalloc.start()
+        render(io.BytesIO(), SCOPE_ALL, params)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(
+            f'  {name:<6} time={elapsed:.2f}s peak_memory={peak / 1024 / 1024:.1f}MiB '
+            f'size={len(out.getvalue()) / 1024:.0f}KiB'
+        )
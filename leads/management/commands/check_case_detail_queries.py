@@ -0,0 +1,102 @@
+"""
+案件詳細（case_detail）のクエリ数チェック
+
+指定した案件（既定: 明細が最も多い契約済み案件）の案件詳細を全タブについて描画し、
+1 回の描画で発行されるクエリ数が上限（--budget）以内で、タブによって変わらないことを確認する。
+集約の読み込みは _case_detail_queryset() の select_related / prefetch で固定件数になっているため、
+明細の追加やテンプレートの変更で N+1 が入り込むとここで検出できる。
+
+使い方:
+  python manage.py check_case_detail_queries
+  python manage.py check_case_detail_queries --case 123 --user admin --budget 11 -v 2
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from accounts import attendance
+from leads.models import Assessment
+from leads.views import case_detail
+
+_TABS = (
+    'assessment', 'customer', 'contract', 'documents', 'history',
+    'intake', 'repair', 'transport', 'listing', 'payment', 'sale', 'transfer',
+)
+
+# 案件の集約 1 + prefetch 9 + ログインユーザーのプロフィール 1
+# （ユーザー名簿・オークション会場はキャッシュから読む。勤怠表示は共有キャッシュでなければ DB から 1）
+_DEFAULT_BUDGET = 11 if attendance.uses_shared_cache() else 12
+
+
+class Command(BaseCommand):
+    help = '案件詳細を全タブで描画し、クエリ数が上限以内で全タブ一定であることを確認します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--case', type=int, help='対象の案件 ID（既定: 明細が最も多い契約済み案件）')
+        parser.add_argument('--user', help='描画するユーザー名（既定: 最初のスーパーユーザー）')
+        parser.add_argument('--budget', type=int, default=_DEFAULT_BUDGET, help=f'1 回の描画のクエリ数上限（既定: {_DEFAULT_BUDGET}）')
+
+    def handle(self, *args, **options):
+        assessment_id = options['case'] or self._pick_case()
+        user_id = self._pick_user(options['user']).pk
+        User = get_user_model()
+        factory = RequestFactory()
+
+        def build_request(tab):
+            request = factory.get(f'/cases/{assessment_id}/', {'tab': tab})
+            request.user = User.objects.get(pk=user_id)  # プロフィールのキャッシュを持ち越さない
+            request.session = SessionBase()
+            return request
+
+        # ユーザー名簿・マスタ・勤怠表示のキャッシュを温めてから計測する
+        case_detail(build_request(_TABS[0]), assessment_id)
+
+        counts = {}
+        for tab in _TABS:
+            request = build_request(tab)
+            with CaptureQueriesContext(connection) as queries:
+                response = case_detail(request, assessment_id)
+            if response.status_code != 200:
+                raise CommandError(f'tab={tab}: ステータス {response.status_code}')
+            counts[tab] = len(queries.captured_queries)
+
+            self.stdout.write(f'  {tab:<10} {counts[tab]:>3} クエリ')
+            if options['verbosity'] >= 2:
+                for query in queries.captured_queries:
+                    self.stdout.write(f'      {query["sql"][:160]}')
+
+        worst = max(counts.values())
+        self.stdout.write(f'案件 {assessment_id}: 最大 {worst} クエリ（上限 {options["budget"]}）')
+        if worst > options['budget']:
+            raise CommandError(f'クエリ数が上限を超えています: {worst} > {options["budget"]}')
+        if len(set(counts.values())) > 1:
+            raise CommandError(f'タブによってクエリ数が異なります: {counts}')
+        self.stdout.write(self.style.SUCCESS('クエリ数は上限以内・全タブで一定'))
+
+    def _pick_case(self):
+        assessment_id = (
+            Assessment.objects.filter(contract__isnull=False)
+            .annotate(
+                items=Count('check_items', distinct=True)
+                + Count('contract__file_uploads', distinct=True)
+                + Count('contract__advance_payments', distinct=True)
+            )
+            .order_by('-items', '-pk')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if assessment_id is None:
+            raise CommandError('契約済みの案件がありません。--case で案件 ID を指定してください')
+        return assessment_id
+
+    def _pick_user(self, username):
+        User = get_user_model()
+        users = User.objects.filter(username=username) if username else User.objects.filter(is_superuser=True).order_by('pk')
+        user = users.first()
+        if user is None:
+            raise CommandError('描画に使うユーザーが見つかりません。--user で指定してください')
+        return user
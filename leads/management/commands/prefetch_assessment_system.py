@@ -0,0 +1,42 @@
+"""
+査定システムの先読み（services/assessment_system_scraper.prefetch_pending）
+
+査定システムIDが保存済みで未取り込みの案件について、査定システムから車両情報を取得してキャッシュに入れる。
+取り込み操作（import_from_assessment_system）はキャッシュから返るため、画面で待たずに済む。
+キャッシュの有効期限（ASSESSMENT_SYSTEM_CACHE_TTL_SEC）より短い間隔で cron 等から実行する。
+ワーカー間でキャッシュを共有する設定（CACHE_BACKEND=redis / db / file）が必要で、locmem ではエラーにする。
+ログインは実行中だけで、終わったらログアウトする。
+
+使い方:
+  python manage.py prefetch_assessment_system
+  python manage.py prefetch_assessment_system --limit 50
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from leads.services.assessment_system_scraper import prefetch_pending
+
+
+class Command(BaseCommand):
+    help = '未取り込みの案件について査定システムの車両情報を先読みしてキャッシュします。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='先読みする査定IDの上限（更新日時の新しい案件から）')
+
+    def handle(self, *args, **options):
+        if settings.CACHE_BACKEND == 'locmem':
+            raise CommandError(
+                'CACHE_BACKEND=locmem では先読みした結果を Web のワーカーから参照できません。'
+                'redis / db / file のいずれかを設定してください'
+            )
+        summary = prefetch_pending(limit=options['limit'])
+
+        self.stdout.write(
+            f'対象 {summary["total"]} 件: 取得 {summary["fetched"]}, '
+            f'キャッシュ済み {summary["cached"]}, 失敗 {len(summary["failed"])}'
+        )
+        for assessment_system_id, error in summary['failed'].items():
+            self.stdout.write(f'  {assessment_system_id}: {error}')
+        if summary['failed'] and not (summary['fetched'] or summary['cached']):
+            raise CommandError('先読みがすべて失敗しました')
+        self.stdout.write(self.style.SUCCESS('先読み完了'))
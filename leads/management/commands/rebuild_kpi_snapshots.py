@@ -0,0 +1,33 @@
+"""
+ダッシュボード KPI スナップショット（UserKpiSnapshot）を元データから作り直す
+
+使い方:
+  python manage.py rebuild_kpi_snapshots
+  python manage.py rebuild_kpi_snapshots --since 2026-01-01
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from leads.services.kpi_snapshot import rebuild_all
+
+
+class Command(BaseCommand):
+    help = 'ダッシュボードの担当者別・期間別 KPI スナップショットを元データから作り直します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='この日を含む年以降のみ作り直す（YYYY-MM-DD。未指定時: 全期間）',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--since は YYYY-MM-DD 形式で指定してください')
+
+        created = rebuild_all(since=since)
+        self.stdout.write(self.style.SUCCESS(f'KPI スナップショットを {created:,} 件作成しました'))
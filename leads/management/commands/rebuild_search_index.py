@@ -0,0 +1,37 @@
+"""
+検索ドキュメント（SearchDocument）を全件作り直す
+
+使い方:
+  python manage.py rebuild_search_index
+  python manage.py rebuild_search_index --target customer --target case
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from leads.models import SearchDocument
+from leads.services.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = '一覧のフリーワード検索に使う検索ドキュメントを全件作り直します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            action='append',
+            choices=[value for value, _ in SearchDocument.TARGET_TYPE_CHOICES],
+            help='作り直す対象種別（複数指定可。未指定時: 全種別）',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='一度に読み込む・書き込む件数（既定: 2000）',
+        )
+
+    def handle(self, *args, **options):
+        targets = options['target'] or [value for value, _ in SearchDocument.TARGET_TYPE_CHOICES]
+        for target_type in targets:
+            with transaction.atomic():
+                created = rebuild_index(target_type, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f'{target_type}: {created:,} 件を作成しました'))
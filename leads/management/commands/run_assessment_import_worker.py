@@ -0,0 +1,68 @@
+"""
+査定システム取り込みジョブ（AssessmentImportJob）のワーカー
+
+待機中のジョブを古い順に 1 件ずつ取り出して査定システムから取得し、Vehicle / Assessment に保存する。
+複数プロセスで起動してもジョブは重複して実行されない（SELECT ... FOR UPDATE SKIP LOCKED）。
+時間内に終わらなかったジョブの失敗処理と、保持期間を過ぎたジョブの削除は 1 時間ごとに行う。
+画面はジョブの完了を待つため、常駐させておくこと（止まっている間の取り込みは JOB_TIMEOUT で失敗になる）。
+
+使い方:
+  python manage.py run_assessment_import_worker            # 常駐
+  python manage.py run_assessment_import_worker --once     # 待機中のジョブを処理したら終了
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from leads.services.assessment_import_jobs import claim_next_job, purge_expired, run_job, time_out_stale
+
+logger = logging.getLogger(__name__)
+
+_HOUSEKEEPING_INTERVAL_SECONDS = 3600
+
+
+class Command(BaseCommand):
+    help = '査定システムからの車両情報取り込みジョブを順に処理します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='待機中のジョブがなくなったら終了する',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='ジョブがないときの確認間隔（秒。既定: 1）',
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        last_housekeeping = float('-inf')
+        try:
+            while True:
+                close_old_connections()
+                if time.monotonic() - last_housekeeping >= _HOUSEKEEPING_INTERVAL_SECONDS:
+                    time_out_stale()
+                    purged = purge_expired()
+                    if purged:
+                        logger.info(f'[assessment_import] 期限切れジョブを {purged} 件削除しました')
+                    last_housekeeping = time.monotonic()
+
+                job = claim_next_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                self.stdout.write(f'ジョブ #{job.pk}（査定ID {job.assessment_system_id}）を処理中...')
+                run_job(job)
+                processed += 1
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'{processed} 件のジョブを処理しました'))
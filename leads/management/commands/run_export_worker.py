@@ -0,0 +1,66 @@
+"""
+PDF 出力ジョブ（ExportJob）のワーカー
+
+待機中のジョブを古い順に 1 件ずつ取り出して PDF を生成し、MEDIA_ROOT/exports/ に保存する。
+複数プロセスで起動してもジョブは重複して実行されない（SELECT ... FOR UPDATE SKIP LOCKED）。
+保持期間を過ぎたジョブと出力ファイルは 1 時間ごとに削除する。
+
+使い方:
+  python manage.py run_export_worker            # 常駐
+  python manage.py run_export_worker --once     # 待機中のジョブを処理したら終了（cron 用）
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from leads.services.export_jobs import claim_next_job, purge_expired, run_job
+
+logger = logging.getLogger(__name__)
+
+_PURGE_INTERVAL_SECONDS = 3600
+
+
+class Command(BaseCommand):
+    help = 'PDF 出力ジョブを順に処理します（車両一覧・在庫管理表・古物台帳）。'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='待機中のジョブがなくなったら終了する',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='ジョブがないときの確認間隔（秒。既定: 2）',
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        last_purged = float('-inf')
+        try:
+            while True:
+                close_old_connections()
+                if time.monotonic() - last_purged >= _PURGE_INTERVAL_SECONDS:
+                    purged = purge_expired()
+                    if purged:
+                        logger.info(f'[export] 期限切れジョブを {purged} 件削除しました')
+                    last_purged = time.monotonic()
+
+                job = claim_next_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                self.stdout.write(f'ジョブ #{job.pk}（{job.get_export_type_display()}）を処理中...')
+                run_job(job)
+                processed += 1
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'{processed} 件のジョブを処理しました'))
@@ -0,0 +1,214 @@
+"""
+ローカル検証用の査定システム（satei.u-car.co.jp）の代替サーバー
+
+ログイン・査定ID検索・詳細ページ・ログアウトを、assessment_system_scraper が解析する
+HTML 構造のまま返す。ASSESSMENT_SYSTEM_BASE_URL をこのサーバーに向けると、
+取り込みジョブ・先読み・セッションの再ログインを本番の査定システムに接続せずに確認できる。
+取り込みジョブのテスト（leads/tests.py）もこのサーバーをスレッドで起動して使う。
+
+  査定ID   : 10 桁の数字ならどれでも見つかる（車両情報は査定IDから決まる）。--missing の査定IDは該当なし
+  遅延     : --delay 秒だけ各応答を遅らせる（査定システムが遅いときの挙動確認）
+  セッション : --session-ttl 秒使われなかったセッションは切れてログインページを返す
+
+使い方:
+  python manage.py run_fake_assessment_system
+  python manage.py run_fake_assessment_system --port 8765 --delay 2 --session-ttl 60
+  ASSESSMENT_SYSTEM_BASE_URL=http://127.0.0.1:8765 python manage.py runserver
+"""
+import html
+import json
+import logging
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.management.base import BaseCommand
+
+logger = logging.getLogger(__name__)
+
+_LOGIN_PAGE = '''<html><head><link rel="stylesheet" href="/css/login.css"><title>ログイン</title></head>
+<body><form action="/index.do" method="post">
+<input type="hidden" name="token" value="fake">
+<input type="text" name="id"><input type="password" name="pwd">
+<input type="submit" name="Submit" value="ログイン">
+</form></body></html>'''
+
+_LANDING_PAGE = '''<html><head><title>査定一覧</title></head>
+<body><a href="/logout.do"><img src="/img/logout.png" alt="ログアウト"></a>
+<form action="/search.do" method="post">
+<input type="text" name="code"><input type="hidden" name="query_type" value="0">
+<select name="sort"><option value="1" selected>新しい順</option></select>
+</form></body></html>'''
+
+_RESULT_PAGE = '''<html><head><title>検索結果</title></head>
+<body><input type="hidden" id="hdnResultJsonCache" value="{cache}"></body></html>'''
+
+_DETAIL_PAGE = '''<html><head><title>査定詳細</title></head><body>
+<div id="DIV_MAKER">{maker}</div><div id="DIV_CARNAME">{car_model}</div><div id="DIV_GRADE">{grade}</div>
+<span id="CAR_ERA">令和</span><input name="car_year" value="{year}"><div id="DIV_CARMONTH">{month:02d}</div>
+<input name="distance" value="{mileage}"><input name="color_name" value="{color}">
+<input name="engine_displacement" value="{displacement}"><input name="syadai_no" value="{chassis}">
+<input name="reg_number1" value="品川"><input name="reg_number2" value="300">
+<input name="reg_number3" value="あ"><input name="reg_number4" value="{reg}">
+<input name="capacity" value="5"><span id="txtBodyType">{body_type}</span><input name="drive" value="2WD">
+<span id="INSPECTION_ERA">R</span><input name="inspection_date" value="{inspection}">
+<input name="nyuuko_price" value="{price}"><input name="result_recycling_price" value="{recycle}">
+<div id="EXTERIOR">{rating}</div>
+</body></html>'''
+
+_MAKERS = [('トヨタ', 'プリウス', 'S'), ('ホンダ', 'フィット', 'e:HEV HOME'), ('日産', 'ノート', 'X'), ('マツダ', 'CX-5', '20S')]
+_COLORS = ['パールホワイト', 'ブラック', 'シルバー', 'レッド']
+_BODY_TYPES = ['ハッチバック', 'セダン', 'SUV', 'ミニバン']
+
+
+def _record(code: str) -> dict:
+    """査定IDから決まる車両情報（同じ査定IDなら毎回同じ内容）"""
+    n = int(code)
+    maker, car_model, grade = _MAKERS[n % len(_MAKERS)]
+    return {
+        'maker': maker, 'car_model': car_model, 'grade': grade,
+        'year': 1 + n % 6, 'month': 1 + n % 12,
+        'mileage': 10000 + (n % 90) * 1000,
+        'color': _COLORS[n % len(_COLORS)],
+        'displacement': 1500 + (n % 4) * 500,
+        'chassis': f'FAKE-{code[-7:]}',
+        'reg': f'{n % 10000:04d}',
+        'body_type': _BODY_TYPES[n % len(_BODY_TYPES)],
+        'inspection': f'{8 + n % 3:02d}/{1 + n % 12:02d}/{1 + n % 28:02d}',
+        'price': f'{300000 + (n % 50) * 10000:,}',
+        'recycle': f'{9000 + (n % 10) * 100:,}',
+        'rating': f'{3 + (n % 3) * 0.5}',
+    }
+
+
+class _FakeAssessmentSystem:
+    """セッション（Cookie）と査定データの状態"""
+
+    def __init__(self, delay: float, session_ttl: float, missing: set[str]):
+        self.delay = delay
+        self.session_ttl = session_ttl
+        self.missing = missing
+        self.lock = threading.Lock()
+        self.sessions = {}   # セッション ID → 最終アクセス時刻（ログイン済みのみ）
+        self.logins = 0
+
+    def touch(self, session_id: str | None) -> bool:
+        """ログイン済みで期限内なら True（最終アクセス時刻を更新する）"""
+        now = time.monotonic()
+        with self.lock:
+            last = self.sessions.get(session_id)
+            if last is None:
+                return False
+            if self.session_ttl and now - last > self.session_ttl:
+                del self.sessions[session_id]
+                return False
+            self.sessions[session_id] = now
+            return True
+
+
+def _handler(state: _FakeAssessmentSystem):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            self._dispatch('GET', parse_qs(urlsplit(self.path).query, keep_blank_values=True))
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            self._dispatch('POST', parse_qs(self.rfile.read(length).decode('utf-8'), keep_blank_values=True))
+
+        def _dispatch(self, method, params):
+            if state.delay:
+                time.sleep(state.delay)
+            path = urlsplit(self.path).path
+            session_id = self._session_id()
+
+            if path == '/index.do' and method == 'POST':
+                self._login(params)
+            elif path == '/index.do':
+                self._send(_LOGIN_PAGE, session_id=session_id or secrets.token_hex(8))
+            elif path == '/logout.do':
+                with state.lock:
+                    state.sessions.pop(session_id, None)
+                self._send('<html><body>logged out</body></html>')
+            elif not state.touch(session_id):
+                self._send(_LOGIN_PAGE)
+            elif path == '/search.do':
+                self._search(params.get('code', [''])[0])
+            elif path == '/editDetail.do':
+                self._detail(params.get('id', [''])[0])
+            else:
+                self.send_error(404)
+
+        def _login(self, params):
+            session_id = self._session_id()
+            if not session_id or not params.get('id', [''])[0]:
+                self._send(_LOGIN_PAGE)
+                return
+            with state.lock:
+                state.sessions[session_id] = time.monotonic()
+                state.logins += 1
+                logins = state.logins
+            logger.info(f'[fake_assessment_system] ログイン #{logins} session={session_id}')
+            self._send(_LANDING_PAGE)
+
+        def _search(self, code):
+            datas = []
+            if code.isdigit() and len(code) == 10 and code not in state.missing:
+                datas.append({'id': f'9{code}', 'code': code})
+            cache = html.escape(json.dumps({'datas': datas}), quote=True)
+            self._send(_RESULT_PAGE.format(cache=cache))
+
+        def _detail(self, internal_id):
+            code = internal_id[1:]
+            if not (internal_id.startswith('9') and code.isdigit() and len(code) == 10):
+                self.send_error(404)
+                return
+            self._send(_DETAIL_PAGE.format(**_record(code)))
+
+        def _session_id(self):
+            for part in (self.headers.get('Cookie') or '').split(';'):
+                name, _, value = part.strip().partition('=')
+                if name == 'JSESSIONID':
+                    return value
+            return None
+
+        def _send(self, body, session_id=None):
+            encoded = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(encoded)))
+            if session_id:
+                self.send_header('Set-Cookie', f'JSESSIONID={session_id}; Path=/')
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        def log_message(self, format, *args):
+            logger.debug(f'[fake_assessment_system] {format % args}')
+
+    return Handler
+
+
+class Command(BaseCommand):
+    help = 'ローカル検証用に査定システムの代替サーバーを起動します（ASSESSMENT_SYSTEM_BASE_URL に指定して使う）。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='待ち受けアドレス（既定: 127.0.0.1）')
+        parser.add_argument('--port', type=int, default=8765, help='待ち受けポート（既定: 8765）')
+        parser.add_argument('--delay', type=float, default=0.0, help='各応答の遅延（秒。既定: 0）')
+        parser.add_argument('--session-ttl', type=float, default=0.0, help='セッションの有効期限（秒。既定: 0 = 切れない）')
+        parser.add_argument('--missing', nargs='*', default=['0000000000'], help='該当なしにする査定ID（既定: 0000000000）')
+
+    def handle(self, *args, **options):
+        state = _FakeAssessmentSystem(options['delay'], options['session_ttl'], set(options['missing']))
+        server = ThreadingHTTPServer((options['host'], options['port']), _handler(state))
+        self.stdout.write(f'査定システムの代替サーバー: http://{options["host"]}:{server.server_port}  （Ctrl+C で終了）')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f'終了しました（ログイン {state.logins} 回）')
@@ -0,0 +1,83 @@
+"""
+連番払い出し（services/sequence.allocate）の同時実行ストレステスト
+
+複数スレッド（それぞれ別の DB 接続）から同じ sequence_type × key に対して
+ランダムな件数の allocate() を繰り返し、払い出された番号に重複・欠番がないことを確認する。
+検証用の連番行は終了時に削除する。
+本番相当の DB で件数を増やして確認するための任意のツール（回帰テストは leads/tests.py の
+SequenceAllocateConcurrencyTests）。
+
+使い方:
+  python manage.py stress_sequence_allocator
+  python manage.py stress_sequence_allocator --workers 32 --iterations 500 --max-block 10
+"""
+import random
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from leads.models import NumberSequence
+from leads.services import sequence
+
+_SEQUENCE_TYPE = 'stress_test'
+
+
+class Command(BaseCommand):
+    help = '連番払い出しを複数スレッドから同時に実行し、重複・欠番がないことを確認します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='同時に払い出すスレッド数（既定: 16）')
+        parser.add_argument('--iterations', type=int, default=200, help='スレッドあたりの払い出し回数（既定: 200）')
+        parser.add_argument('--max-block', type=int, default=5, help='1 回に確保する最大件数（既定: 5）')
+
+    def handle(self, *args, **options):
+        key = f'stress-{uuid.uuid4().hex[:12]}'
+        results = [[] for _ in range(options['workers'])]
+        errors = []
+        start_barrier = threading.Barrier(options['workers'])
+
+        def worker(index):
+            rng = random.Random(index)
+            try:
+                start_barrier.wait()
+                for _ in range(options['iterations']):
+                    block = sequence.allocate(_SEQUENCE_TYPE, key, rng.randint(1, options['max_block']))
+                    results[index].extend(block)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['workers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        try:
+            issued = [number for numbers in results for number in numbers]
+            last_seq = (
+                NumberSequence.objects.filter(sequence_type=_SEQUENCE_TYPE, key=key)
+                .values_list('last_seq', flat=True).first()
+            ) or 0
+        finally:
+            NumberSequence.objects.filter(sequence_type=_SEQUENCE_TYPE, key=key).delete()
+
+        calls = options['workers'] * options['iterations']
+        duplicates = len(issued) - len(set(issued))
+        missing = len(set(range(1, last_seq + 1)) - set(issued))
+        self.stdout.write(
+            f'{options["workers"]} スレッド × {options["iterations"]} 回: '
+            f'{len(issued)} 番号 / {elapsed:.2f}s ({calls / elapsed:.0f} 回/s) — '
+            f'最終連番 {last_seq}, 重複 {duplicates}, 欠番 {missing}, エラー {len(errors)}'
+        )
+        if errors:
+            raise CommandError(f'払い出し中にエラーが発生しました: {errors[0]!r}')
+        if duplicates or missing or last_seq != len(issued):
+            raise CommandError('連番に重複または欠番があります')
+        self.stdout.write(self.style.SUCCESS('重複・欠番なし'))
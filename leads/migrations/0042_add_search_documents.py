@@ -0,0 +1,79 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+
+def create_fulltext_index(apps, schema_editor):
+    """DB ごとの全文検索インデックスを作成する
+
+    MySQL : ngram パーサの FULLTEXT インデックス。
+            既定のストップワード（a, i, com 等）を含む ngram は索引対象外になり
+            英数字の検索漏れが出るため、作成時のみストップワードを無効化する。
+    SQLite: FTS5（trigram）の外部コンテンツテーブル＋同期トリガー（テスト用）。
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute('SET SESSION innodb_ft_enable_stopword = OFF')
+        schema_editor.execute(
+            'ALTER TABLE search_documents '
+            'ADD FULLTEXT INDEX ftx_search_documents_body (body) WITH PARSER ngram'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE search_documents_fts USING fts5("
+            "body, content='search_documents', content_rowid='id', tokenize='trigram')"
+        )
+        schema_editor.execute(
+            'CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN '
+            'INSERT INTO search_documents_fts(rowid, body) VALUES (new.id, new.body); END'
+        )
+        schema_editor.execute(
+            'CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN '
+            "INSERT INTO search_documents_fts(search_documents_fts, rowid, body) VALUES ('delete', old.id, old.body); END"
+        )
+        schema_editor.execute(
+            'CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN '
+            "INSERT INTO search_documents_fts(search_documents_fts, rowid, body) VALUES ('delete', old.id, old.body); "
+            'INSERT INTO search_documents_fts(rowid, body) VALUES (new.id, new.body); END'
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE search_documents DROP INDEX ftx_search_documents_body')
+    elif vendor == 'sqlite':
+        for trigger in ('search_documents_ai', 'search_documents_ad', 'search_documents_au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        schema_editor.execute('DROP TABLE IF EXISTS search_documents_fts')
+
+
+class Migration(migrations.Migration):
+    """
+    検索ドキュメントテーブルを作成する。
+    既存データの検索ドキュメントは 0051_populate_search_documents で作成する。
+    """
+
+    dependencies = [
+        ('leads', '0041_add_appointment_getter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_type', models.CharField(choices=[('assessment_request', '査定申込'), ('customer', '顧客'), ('case', '案件'), ('vehicle', '車両')], max_length=30, verbose_name='対象種別')),
+                ('target_id', models.BigIntegerField(verbose_name='対象ID')),
+                ('body', models.TextField(blank=True, verbose_name='検索本文')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': '検索ドキュメント',
+                'verbose_name_plural': '検索ドキュメント',
+                'db_table': 'search_documents',
+                'unique_together': {('target_type', 'target_id')},
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
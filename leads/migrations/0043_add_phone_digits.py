@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0042_add_search_documents'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carassessmentrequest',
+            name='phone_digits',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20, verbose_name='電話番号（数字のみ）'),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='phone_digits',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20, verbose_name='電話番号（数字のみ）'),
+        ),
+        migrations.AddIndex(
+            model_name='carassessmentrequest',
+            index=models.Index(fields=['phone_digits'], name='idx_phone_digits'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['phone_digits'], name='idx_cust_phone_digits'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    ダッシュボード用 KPI スナップショットテーブルを作成する。
+    既存データの集計は 0047 のデータ移行で作成する。
+    """
+
+    dependencies = [
+        ('leads', '0043_add_phone_digits'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserKpiSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_type', models.CharField(choices=[('year', '年'), ('month', '月'), ('week', '週')], max_length=10, verbose_name='期間種別')),
+                ('period_start', models.DateField(verbose_name='期間開始日')),
+                ('appointments', models.PositiveIntegerField(default=0, verbose_name='商談数')),
+                ('contracts', models.PositiveIntegerField(default=0, verbose_name='成約数')),
+                ('lost_count', models.PositiveIntegerField(default=0, verbose_name='没数')),
+                ('managed_count', models.PositiveIntegerField(default=0, verbose_name='管理数')),
+                ('pre_cancel_count', models.PositiveIntegerField(default=0, verbose_name='査定前キャンセル数')),
+                ('sold_count', models.PositiveIntegerField(default=0, verbose_name='売却件数')),
+                ('sold_amount', models.BigIntegerField(default=0, verbose_name='売却金額')),
+                ('operating_profit', models.BigIntegerField(default=0, verbose_name='経常利益')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kpi_snapshots', to=settings.AUTH_USER_MODEL, verbose_name='担当者')),
+            ],
+            options={
+                'verbose_name': 'KPIスナップショット',
+                'verbose_name_plural': 'KPIスナップショット',
+                'db_table': 'user_kpi_snapshots',
+                'indexes': [models.Index(fields=['period_type', 'period_start'], name='idx_kpi_period')],
+                'unique_together': {('user', 'period_type', 'period_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0044_add_user_kpi_snapshots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('export_type', models.CharField(choices=[('vehicle_list', '車両一覧'), ('inventory', '在庫管理表'), ('ledger', '古物台帳')], max_length=20, verbose_name='出力種別')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='検索条件')),
+                ('access_scope', models.CharField(max_length=30, verbose_name='閲覧範囲')),
+                ('data_version', models.CharField(blank=True, max_length=255, verbose_name='データの版')),
+                ('cache_key', models.CharField(db_index=True, max_length=64, verbose_name='キャッシュキー')),
+                ('status', models.CharField(choices=[('queued', '待機中'), ('running', '作成中'), ('done', '完了'), ('failed', '失敗')], default='queued', max_length=10, verbose_name='状態')),
+                ('file', models.FileField(blank=True, upload_to='exports/%Y/%m/', verbose_name='出力ファイル')),
+                ('error_message', models.TextField(blank=True, verbose_name='エラー内容')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='登録日時')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='開始日時')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完了日時')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL, verbose_name='依頼者')),
+            ],
+            options={
+                'verbose_name': '出力ジョブ',
+                'verbose_name_plural': '出力ジョブ',
+                'db_table': 'export_jobs',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='idx_export_job_status')],
+            },
+        ),
+    ]
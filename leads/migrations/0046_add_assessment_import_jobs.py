@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0045_add_export_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assessment_system_id', models.CharField(max_length=10, verbose_name='査定システムID')),
+                ('status', models.CharField(choices=[('queued', '待機中'), ('running', '取り込み中'), ('done', '完了'), ('failed', '失敗')], default='queued', max_length=10, verbose_name='状態')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='取り込み結果')),
+                ('error_message', models.TextField(blank=True, verbose_name='エラー内容')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='登録日時')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='開始日時')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完了日時')),
+                ('assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to='leads.assessment', verbose_name='査定')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assessment_import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='依頼者')),
+            ],
+            options={
+                'verbose_name': '査定システム取り込みジョブ',
+                'verbose_name_plural': '査定システム取り込みジョブ',
+                'db_table': 'assessment_import_jobs',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='idx_import_job_status')],
+            },
+        ),
+    ]
@@ -0,0 +1,97 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+_PERIOD_TYPES = ('year', 'month', 'week')
+
+# Assessment.status → KPI 項目（商談数 appointments は全件）
+_STATUS_FIELDS = {
+    'contracted': 'contracts',
+    'lost':       'lost_count',
+    'managed':    'managed_count',
+    'pre_cancel': 'pre_cancel_count',
+}
+
+_KPI_FIELDS = (
+    'appointments', 'contracts', 'lost_count', 'managed_count', 'pre_cancel_count',
+    'sold_count', 'sold_amount', 'operating_profit',
+)
+
+
+def _period_start(period_type, day):
+    if period_type == 'year':
+        return day.replace(month=1, day=1)
+    if period_type == 'month':
+        return day.replace(day=1)
+    return day - timedelta(days=day.weekday())
+
+
+def populate_snapshots(apps, schema_editor):
+    """既存データから KPI スナップショットを作成する
+
+    kpi_snapshot.rebuild_all と同じ集計を履歴モデルで行う（サービスは最新のモデルを参照するため、
+    後から列が追加されると新規 DB の migrate がこの時点で失敗する）。
+    元データを 1 回ずつ読み、担当者 × 期間ごとに Python で合算する。新規 DB では何もしない。
+    """
+    Assessment      = apps.get_model('leads', 'Assessment')
+    SalesProcess    = apps.get_model('leads', 'SalesProcess')
+    UserKpiSnapshot = apps.get_model('leads', 'UserKpiSnapshot')
+
+    totals = defaultdict(lambda: dict.fromkeys(_KPI_FIELDS, 0))
+
+    for user_id, created_at, status in Assessment.objects.values_list('assigned_to_id', 'created_at', 'status').iterator():
+        day = timezone.localdate(created_at)
+        for period_type in _PERIOD_TYPES:
+            row = totals[(user_id, period_type, _period_start(period_type, day))]
+            row['appointments'] += 1
+            if status in _STATUS_FIELDS:
+                row[_STATUS_FIELDS[status]] += 1
+
+    sales = SalesProcess.objects.filter(sale_done=True, sold_price__isnull=False, sold_at__isnull=False).values_list(
+        'contract__assigned_to_id', 'sold_at', 'sold_price',
+        'contract__amount_correction_flag', 'contract__corrected_price', 'contract__purchase_price_excl_tax',
+        'sold_destination__entry_fee', 'sold_destination__contract_fee',
+        'transport_fee_personal', 'transport_fee_auction', 'other_fee',
+    )
+    for (user_id, sold_at, sold_price, corrected, corrected_price, purchase_price,
+         entry_fee, contract_fee, transport_personal, transport_auction, other_fee) in sales.iterator():
+        if not user_id:
+            continue
+        purchase = corrected_price if corrected and corrected_price is not None else purchase_price
+        cost = sum(value or 0 for value in (
+            purchase, entry_fee, contract_fee, transport_personal, transport_auction, other_fee,
+        ))
+        for period_type in _PERIOD_TYPES:
+            row = totals[(user_id, period_type, _period_start(period_type, sold_at))]
+            row['sold_count'] += 1
+            row['sold_amount'] += sold_price
+            row['operating_profit'] += sold_price - cost
+
+    UserKpiSnapshot.objects.all().delete()
+    UserKpiSnapshot.objects.bulk_create(
+        [
+            UserKpiSnapshot(
+                user_id=user_id, period_type=period_type, period_start=start,
+                **{field: int(value) for field, value in values.items()},
+            )
+            for (user_id, period_type, start), values in sorted(totals.items())
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    """
+    0044 で作成した KPI スナップショットテーブルに既存データの集計を入れる。
+    空のままだとダッシュボードが過去分を 0 件と表示するため。
+    """
+
+    dependencies = [
+        ('leads', '0046_add_assessment_import_jobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_snapshots, migrations.RunPython.noop),
+    ]
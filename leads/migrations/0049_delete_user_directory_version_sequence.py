@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def delete_version_rows(apps, schema_editor):
+    """ユーザー名簿のバージョンに使っていた NumberSequence の行を削除する（キャッシュの世代番号に移行済み）"""
+    NumberSequence = apps.get_model('leads', 'NumberSequence')
+    NumberSequence.objects.filter(sequence_type='cache_version').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0048_export_job_claim_token_and_audit_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_version_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0049_delete_user_directory_version_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessmentimportjob',
+            name='claim_token',
+            field=models.CharField(blank=True, max_length=32, verbose_name='実行トークン'),
+        ),
+        migrations.AddField(
+            model_name='assessmentimportjob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='更新日時'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='assessmentimportjob',
+            name='updated_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='updated_assessment_import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='更新者'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+import re
+
+from django.db import migrations
+
+# 対象種別 → (モデル名, [(検索本文に入れる項目, 電話番号か)])。leads.services.search の各 _*_body と同じ並び
+_TARGETS = {
+    'assessment_request': ('CarAssessmentRequest', [
+        ('application_number', False), ('external_service_id', False), ('customer_name', False),
+        ('phone_number', True), ('email', False), ('postal_code', False), ('address', False),
+        ('maker', False), ('car_model', False),
+    ]),
+    'customer': ('Customer', [
+        ('name', False), ('furigana', False), ('phone_number', True),
+        ('email', False), ('postal_code', False), ('address', False),
+    ]),
+    'case': ('Assessment', [
+        ('case_number', False), ('customer__name', False), ('customer__furigana', False),
+        ('customer__phone_number', True), ('vehicle__maker', False), ('vehicle__car_model', False),
+        ('vehicle__chassis_number', False),
+    ]),
+    'vehicle': ('Vehicle', [
+        ('maker', False), ('car_model', False), ('grade', False), ('color', False),
+        ('chassis_number', False), ('registration_number', False),
+    ]),
+}
+
+_CHUNK_SIZE = 2000
+_SPACES_RE = re.compile(r'\s+')
+
+
+def _body(values, phone_flags):
+    from leads.models import normalize_phone_digits
+    from leads.services.search import normalize_search_text
+
+    tokens = []
+    for value, is_phone in zip(values, phone_flags):
+        if is_phone:
+            digits = normalize_phone_digits(value)
+            if digits:
+                tokens.extend([digits, digits[-4:]] if len(digits) > 4 else [digits])
+        else:
+            token = _SPACES_RE.sub('', normalize_search_text(value))
+            if token:
+                tokens.append(token)
+    return ' '.join(tokens)
+
+
+def populate_search_documents(apps, schema_editor):
+    """検索ドキュメントがまだない既存データの分を作成する
+
+    履歴モデルから項目を指定して読み（後から追加された列を参照しない）、
+    正規化はサービスの純粋関数（normalize_search_text / normalize_phone_digits）だけを使う。
+    rebuild_search_index を実行済みの環境では作成済みの分を飛ばすため何もしない。
+    """
+    SearchDocument = apps.get_model('leads', 'SearchDocument')
+    for target_type, (model_name, fields) in _TARGETS.items():
+        model = apps.get_model('leads', model_name)
+        names = [name for name, _ in fields]
+        phone_flags = [is_phone for _, is_phone in fields]
+        indexed = SearchDocument.objects.filter(target_type=target_type).values('target_id')
+        queryset = model.objects.exclude(pk__in=indexed).order_by('pk')
+
+        last_pk = 0
+        while True:
+            rows = list(queryset.filter(pk__gt=last_pk).values_list('pk', *names)[:_CHUNK_SIZE])
+            if not rows:
+                break
+            SearchDocument.objects.bulk_create([
+                SearchDocument(target_type=target_type, target_id=row[0], body=_body(row[1:], phone_flags))
+                for row in rows
+            ])
+            last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+    """
+    0042 で作成した検索ドキュメントに既存データの分を入れる。
+    空のままだと一覧のフリーワード検索が既存データを 0 件と返すため。
+    """
+
+    dependencies = [
+        ('leads', '0050_assessment_import_job_claim_token_and_audit_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
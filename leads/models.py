@@ -1,18 +1,66 @@
+import re
+import unicodedata
+
 from django.conf import settings
 from django.db import models
-from django.db.models import Q
+from django.db.models import F, Q
+
+
+_NON_DIGIT_RE = re.compile(r'\D')
+
+# 完全一致で引く桁数（国内の固定電話・携帯は 10〜11 桁）。これ未満は前方一致で引く
+PHONE_EXACT_MIN_DIGITS = 10
+
+# これ以下の桁数の検索語は下4桁での照合とみなす（前方一致ではなく部分一致で引く）
+PHONE_SUFFIX_MAX_DIGITS = 4
+
+
+def normalize_phone_digits(value) -> str:
+    """電話番号を数字のみに正規化する（全角数字・ハイフン・括弧・空白を除去）"""
+    return _NON_DIGIT_RE.sub('', unicodedata.normalize('NFKC', str(value or '')))
+
+
+class PhoneLookupQuerySet(models.QuerySet):
+    """正規化済み電話番号（phone_digits）で引くクエリセット"""
+
+    def by_phone(self, value, prefix=None):
+        """電話番号で絞り込む（phone_digits のインデックスを使う）
+
+        prefix=None のときは桁数で判定し、10 桁以上は完全一致、未満は前方一致にする。
+        数字を含まない値の場合は空のクエリセットを返す。
+        """
+        digits = normalize_phone_digits(value)
+        if not digits:
+            return self.none()
+        if prefix is None:
+            prefix = len(digits) < PHONE_EXACT_MIN_DIGITS
+        if prefix:
+            return self.filter(phone_digits__startswith=digits)
+        return self.filter(phone_digits=digits)
+
+
+class PhoneDigitsMixin:
+    """save() 時に phone_number から phone_digits を導出する"""
+
+    def save(self, *args, **kwargs):
+        self.phone_digits = normalize_phone_digits(self.phone_number)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone_number' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_digits'}
+        super().save(*args, **kwargs)
 
 
 # ---------------------------------------------------------------------------
 # 顧客
 # ---------------------------------------------------------------------------
 
-class Customer(models.Model):
+class Customer(PhoneDigitsMixin, models.Model):
     """顧客"""
 
     name             = models.CharField(max_length=100, verbose_name='氏名')
     furigana         = models.CharField(max_length=100, blank=True, verbose_name='フリガナ')
     phone_number     = models.CharField(max_length=20, verbose_name='電話番号')
+    phone_digits     = models.CharField(max_length=20, blank=True, default='', editable=False, verbose_name='電話番号（数字のみ）')
     email            = models.EmailField(max_length=255, blank=True, verbose_name='メールアドレス')
     postal_code      = models.CharField(max_length=10, blank=True, verbose_name='郵便番号')
     address          = models.CharField(max_length=255, blank=True, verbose_name='住所')
@@ -34,6 +82,8 @@ class Customer(models.Model):
         verbose_name='更新者',
     )
 
+    objects = PhoneLookupQuerySet.as_manager()
+
     class Meta:
         db_table = 'customers'
         verbose_name = '顧客'
@@ -42,6 +92,7 @@ class Customer(models.Model):
         indexes = [
             models.Index(fields=['name'], name='idx_cust_name'),
             models.Index(fields=['phone_number'], name='idx_cust_phone'),
+            models.Index(fields=['phone_digits'], name='idx_cust_phone_digits'),
         ]
 
     def __str__(self):
@@ -195,7 +246,22 @@ class NumberSequence(models.Model):
 # 査定申込（既存 CarAssessmentRequest を拡張）
 # ---------------------------------------------------------------------------
 
-class CarAssessmentRequest(models.Model):
+class CarAssessmentRequestQuerySet(PhoneLookupQuerySet):
+    """査定申込の共通クエリ"""
+
+    def with_case_fields(self):
+        """昇格先の案件（Assessment）のステータスと ID を case_status / case_id として付与する
+
+        Assessment.assessment_request は OneToOne なので、逆参照 1 本の LEFT OUTER JOIN で
+        両方の値が取れる（行ごとに相関サブクエリを 2 本走らせない）。未昇格の行は NULL。
+        """
+        return self.annotate(
+            case_status=F('assessment__status'),
+            case_id=F('assessment__id'),
+        )
+
+
+class CarAssessmentRequest(PhoneDigitsMixin, models.Model):
     """査定申込（全チャネル統合）"""
 
     # 対応ステータス
@@ -250,6 +316,7 @@ class CarAssessmentRequest(models.Model):
     mileage    = models.CharField(max_length=100, blank=True, verbose_name='走行距離')
     customer_name = models.CharField(max_length=100, verbose_name='お名前')
     phone_number  = models.CharField(max_length=20, verbose_name='電話番号')
+    phone_digits  = models.CharField(max_length=20, blank=True, default='', editable=False, verbose_name='電話番号（数字のみ）')
     call_count    = models.PositiveIntegerField(default=0, verbose_name='通話数')
     postal_code   = models.CharField(max_length=10, blank=True, verbose_name='郵便番号')
     address       = models.CharField(max_length=255, blank=True, verbose_name='住所')
@@ -281,6 +348,8 @@ class CarAssessmentRequest(models.Model):
     reservation_datetime = models.DateTimeField(null=True, blank=True, verbose_name='査定予約日時')
     cancel_reason        = models.CharField(max_length=255, blank=True, verbose_name='キャンセル理由')
 
+    objects = CarAssessmentRequestQuerySet.as_manager()
+
     class Meta:
         db_table = 'car_assessment_requests'
         verbose_name = '査定申込'
@@ -290,6 +359,7 @@ class CarAssessmentRequest(models.Model):
             models.Index(fields=['-application_datetime'], name='idx_app_datetime'),
             models.Index(fields=['customer_name'], name='idx_customer_name'),
             models.Index(fields=['phone_number'], name='idx_phone_number'),
+            models.Index(fields=['phone_digits'], name='idx_phone_digits'),
             models.Index(fields=['channel_type', 'external_service_id'], name='idx_channel_external_id'),
         ]
         # external_service_id の重複排除はアプリ層で
@@ -614,6 +684,10 @@ class PurchaseContract(models.Model):
     @property
     def contract_signed_attached(self):
         """契約書（お客様署名後）が添付済みか"""
+        uploads = getattr(self, '_prefetched_objects_cache', {}).get('file_uploads')
+        if uploads is not None:
+            # 案件詳細などで file_uploads を prefetch 済みならクエリを発行しない
+            return any(f.doc_type == 'contract_signed' for f in uploads)
         return self.file_uploads.filter(doc_type='contract_signed').exists()
 
     DEBT_REPAID_STATUSES = ('debt_transferred', 'docs_returned')
@@ -1063,3 +1137,239 @@ class SalesProcess(models.Model):
 
     def __str__(self):
         return f"{self.contract.customer} / {self.contract.vehicle}"
+
+
+# ---------------------------------------------------------------------------
+# 全文検索ドキュメント
+# ---------------------------------------------------------------------------
+
+class SearchDocument(models.Model):
+    """一覧画面のフリーワード検索用に正規化したテキスト（非正規化テーブル）
+
+    body は leads.services.search.normalize_search_text で正規化済み
+    （全角半角・カナかな・異体字・ハイフンを統一し、電話番号は数字のみ＋下4桁）。
+    MySQL では ngram パーサの FULLTEXT インデックス、SQLite では FTS5 テーブルで検索する。
+    元データの保存・削除時に leads.signals で同期される。
+    """
+
+    TARGET_ASSESSMENT_REQUEST = 'assessment_request'
+    TARGET_CUSTOMER           = 'customer'
+    TARGET_CASE               = 'case'
+    TARGET_VEHICLE            = 'vehicle'
+
+    TARGET_TYPE_CHOICES = [
+        (TARGET_ASSESSMENT_REQUEST, '査定申込'),
+        (TARGET_CUSTOMER,           '顧客'),
+        (TARGET_CASE,               '案件'),
+        (TARGET_VEHICLE,            '車両'),
+    ]
+
+    target_type = models.CharField(max_length=30, choices=TARGET_TYPE_CHOICES, verbose_name='対象種別')
+    target_id   = models.BigIntegerField(verbose_name='対象ID')
+    body        = models.TextField(blank=True, verbose_name='検索本文')
+    updated_at  = models.DateTimeField(auto_now=True, verbose_name='更新日時')
+
+    class Meta:
+        db_table = 'search_documents'
+        verbose_name = '検索ドキュメント'
+        verbose_name_plural = '検索ドキュメント'
+        unique_together = [('target_type', 'target_id')]
+
+    def __str__(self):
+        return f'{self.get_target_type_display()} #{self.target_id}'
+
+
+# ---------------------------------------------------------------------------
+# KPI スナップショット
+# ---------------------------------------------------------------------------
+
+class UserKpiSnapshot(models.Model):
+    """担当者 × 期間（年・月・週）の KPI 集計値（ダッシュボード表示用の非正規化テーブル）
+
+    Assessment（商談数・ステータス別件数）は created_at、売却・経常利益は SalesProcess.sold_at で期間を判定する。
+    元データの保存・削除時に leads.signals から該当期間だけ再集計される。
+    全件の作り直しは `python manage.py rebuild_kpi_snapshots`。
+    店舗別の値は保持せず、参照時に担当者の現在の所属店舗で合算する。
+    """
+
+    PERIOD_YEAR  = 'year'
+    PERIOD_MONTH = 'month'
+    PERIOD_WEEK  = 'week'
+
+    PERIOD_TYPE_CHOICES = [
+        (PERIOD_YEAR,  '年'),
+        (PERIOD_MONTH, '月'),
+        (PERIOD_WEEK,  '週'),
+    ]
+
+    user         = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='kpi_snapshots',
+        verbose_name='担当者',
+    )
+    period_type  = models.CharField(max_length=10, choices=PERIOD_TYPE_CHOICES, verbose_name='期間種別')
+    period_start = models.DateField(verbose_name='期間開始日')
+
+    appointments     = models.PositiveIntegerField(default=0, verbose_name='商談数')
+    contracts        = models.PositiveIntegerField(default=0, verbose_name='成約数')
+    lost_count       = models.PositiveIntegerField(default=0, verbose_name='没数')
+    managed_count    = models.PositiveIntegerField(default=0, verbose_name='管理数')
+    pre_cancel_count = models.PositiveIntegerField(default=0, verbose_name='査定前キャンセル数')
+    sold_count       = models.PositiveIntegerField(default=0, verbose_name='売却件数')
+    sold_amount      = models.BigIntegerField(default=0, verbose_name='売却金額')
+    operating_profit = models.BigIntegerField(default=0, verbose_name='経常利益')
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
+
+    class Meta:
+        db_table = 'user_kpi_snapshots'
+        verbose_name = 'KPIスナップショット'
+        verbose_name_plural = 'KPIスナップショット'
+        unique_together = [('user', 'period_type', 'period_start')]
+        indexes = [
+            models.Index(fields=['period_type', 'period_start'], name='idx_kpi_period'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.get_period_type_display()} {self.period_start}"
+
+
+# ---------------------------------------------------------------------------
+# 出力ジョブ
+# ---------------------------------------------------------------------------
+
+class ExportJob(models.Model):
+    """車両一覧・在庫管理表・古物台帳の PDF 出力ジョブ（バックグラウンド生成）
+
+    画面から登録し、`python manage.py run_export_worker` が MEDIA_ROOT/exports/ に生成する。
+    cache_key は（出力種別・検索条件・閲覧範囲・データの版）のハッシュで、
+    同じキーの完了済みジョブがあればファイルを再利用する。
+    claim_token は取り出したワーカーごとの値で、止まったジョブを別のワーカーが取り直した後に
+    元のワーカーが結果を書き込まないようにする。
+    """
+
+    TYPE_VEHICLE_LIST = 'vehicle_list'
+    TYPE_INVENTORY    = 'inventory'
+    TYPE_LEDGER       = 'ledger'
+
+    EXPORT_TYPE_CHOICES = [
+        (TYPE_VEHICLE_LIST, '車両一覧'),
+        (TYPE_INVENTORY,    '在庫管理表'),
+        (TYPE_LEDGER,       '古物台帳'),
+    ]
+
+    STATUS_QUEUED  = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE    = 'done'
+    STATUS_FAILED  = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED,  '待機中'),
+        (STATUS_RUNNING, '作成中'),
+        (STATUS_DONE,    '完了'),
+        (STATUS_FAILED,  '失敗'),
+    ]
+
+    export_type   = models.CharField(max_length=20, choices=EXPORT_TYPE_CHOICES, verbose_name='出力種別')
+    params        = models.JSONField(default=dict, blank=True, verbose_name='検索条件')
+    access_scope  = models.CharField(max_length=30, verbose_name='閲覧範囲')
+    data_version  = models.CharField(max_length=255, blank=True, verbose_name='データの版')
+    cache_key     = models.CharField(max_length=64, db_index=True, verbose_name='キャッシュキー')
+    status        = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, verbose_name='状態')
+    claim_token   = models.CharField(max_length=32, blank=True, verbose_name='実行トークン')
+    file          = models.FileField(upload_to='exports/%Y/%m/', blank=True, verbose_name='出力ファイル')
+    error_message = models.TextField(blank=True, verbose_name='エラー内容')
+    requested_by  = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='export_jobs',
+        verbose_name='依頼者',
+    )
+    created_at    = models.DateTimeField(auto_now_add=True, verbose_name='登録日時')
+    started_at    = models.DateTimeField(null=True, blank=True, verbose_name='開始日時')
+    finished_at   = models.DateTimeField(null=True, blank=True, verbose_name='完了日時')
+    updated_at    = models.DateTimeField(auto_now=True, verbose_name='更新日時')
+    updated_by    = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='updated_export_jobs',
+        verbose_name='更新者',
+    )
+
+    class Meta:
+        db_table = 'export_jobs'
+        verbose_name = '出力ジョブ'
+        verbose_name_plural = '出力ジョブ'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='idx_export_job_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_export_type_display()} #{self.pk} ({self.get_status_display()})"
+
+
+class AssessmentImportJob(models.Model):
+    """査定システムからの車両情報取り込みジョブ（バックグラウンド実行）
+
+    取り込み API で登録し、`python manage.py run_assessment_import_worker` が
+    査定システムから取得して Vehicle / Assessment に保存する。画面は状態 API をポーリングし、
+    完了したら result（取り込んだ内容）を確認ダイアログに表示する。
+    claim_token は取り出したワーカーごとの値で、タイムアウトで失敗にしたジョブに
+    ワーカーが後から結果を書き込まないようにする。
+    """
+
+    STATUS_QUEUED  = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE    = 'done'
+    STATUS_FAILED  = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED,  '待機中'),
+        (STATUS_RUNNING, '取り込み中'),
+        (STATUS_DONE,    '完了'),
+        (STATUS_FAILED,  '失敗'),
+    ]
+
+    assessment           = models.ForeignKey(
+        Assessment,
+        on_delete=models.CASCADE,
+        related_name='import_jobs',
+        verbose_name='査定',
+    )
+    assessment_system_id = models.CharField(max_length=10, verbose_name='査定システムID')
+    status               = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, verbose_name='状態')
+    claim_token          = models.CharField(max_length=32, blank=True, verbose_name='実行トークン')
+    result               = models.JSONField(default=dict, blank=True, verbose_name='取り込み結果')
+    error_message        = models.TextField(blank=True, verbose_name='エラー内容')
+    requested_by         = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='assessment_import_jobs',
+        verbose_name='依頼者',
+    )
+    created_at           = models.DateTimeField(auto_now_add=True, verbose_name='登録日時')
+    started_at           = models.DateTimeField(null=True, blank=True, verbose_name='開始日時')
+    finished_at          = models.DateTimeField(null=True, blank=True, verbose_name='完了日時')
+    updated_at           = models.DateTimeField(auto_now=True, verbose_name='更新日時')
+    updated_by           = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='updated_assessment_import_jobs',
+        verbose_name='更新者',
+    )
+
+    class Meta:
+        db_table = 'assessment_import_jobs'
+        verbose_name = '査定システム取り込みジョブ'
+        verbose_name_plural = '査定システム取り込みジョブ'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='idx_import_job_status'),
+        ]
+
+    def __str__(self):
+        return f"査定システム取り込み #{self.pk} {self.assessment_system_id} ({self.get_status_display()})"
@@ -0,0 +1,116 @@
+"""
+新着査定申込の通知フィード（サイドバーの新着通知 SSE / ロングポーリング用）
+
+査定申込の最大 ID（ウォーターマーク）をプロセス内で共有し、接続数に関係なく
+DB への問い合わせはプロセスあたり REFRESH_SECONDS に 1 回までに抑える。
+同一プロセスで登録された申込（スクレイパー取り込み・手動登録）は
+publish_new_assessment() により commit 時点で即座にウォーターマークへ反映される。
+"""
+import asyncio
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ..models import CarAssessmentRequest
+
+logger = logging.getLogger(__name__)
+
+# 他プロセス（別ワーカー）で登録された申込を拾うための DB 再確認間隔（秒）
+REFRESH_SECONDS = 2.0
+
+# 待機中の接続がウォーターマークを確認する間隔（秒）。メモリ参照のみで DB には触れない
+WAIT_STEP_SECONDS = 0.5
+
+# 1 回の通知で返す最大件数（それを超える分は次の通知で続きから返す）
+MAX_RECORDS = 50
+
+
+class _Watermark:
+    """査定申込の最大 ID をプロセス内でキャッシュする（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock       = threading.Lock()
+        self._latest_id  = 0
+        self._checked_at = float('-inf')
+
+    def cached(self):
+        """キャッシュが有効ならその値、期限切れなら None を返す（DB には触れない）"""
+        with self._lock:
+            if time.monotonic() - self._checked_at < REFRESH_SECONDS:
+                return self._latest_id
+            return None
+
+    def current(self) -> int:
+        """最大 ID を返す。キャッシュが期限切れなら DB から取り直す"""
+        latest = self.cached()
+        if latest is not None:
+            return latest
+        max_id = CarAssessmentRequest.objects.aggregate(max_id=Max('id')).get('max_id') or 0
+        with self._lock:
+            # ID は単調増加なので、削除で最大値が下がっても巻き戻さない
+            self._latest_id  = max(self._latest_id, max_id)
+            self._checked_at = time.monotonic()
+            return self._latest_id
+
+    def advance(self, pk: int) -> None:
+        with self._lock:
+            if pk > self._latest_id:
+                self._latest_id = pk
+
+
+_watermark = _Watermark()
+
+
+def latest_assessment_id() -> int:
+    """最新の査定申込 ID（キャッシュ経由）"""
+    return _watermark.current()
+
+
+def publish_new_assessment(obj: CarAssessmentRequest) -> None:
+    """査定申込の新規登録を通知フィードに反映する（トランザクション commit 後）"""
+    pk = obj.pk
+    transaction.on_commit(lambda: _watermark.advance(pk))
+
+
+def fetch_new_records(last_id: int, limit: int = MAX_RECORDS) -> list[dict]:
+    """last_id の直後から古い順に最大 limit 件の査定申込を返す（通知表示用の項目のみ）
+
+    呼び出し側は返した最後の行の ID を次の last_id にして読み進める（一度に大量に登録されても取りこぼさない）。
+    """
+    rows = CarAssessmentRequest.objects.filter(id__gt=last_id).order_by('id').values(
+        'id', 'application_number', 'application_datetime', 'customer_name', 'maker', 'car_model',
+    )[:limit]
+    return [
+        {
+            'id':                   row['id'],
+            'application_number':   row['application_number'],
+            'application_datetime': (
+                timezone.localtime(row['application_datetime']).strftime('%Y-%m-%d %H:%M')
+                if row.get('application_datetime') else ''
+            ),
+            'customer_name': row['customer_name'],
+            'maker':         row['maker'],
+            'car_model':     row['car_model'],
+        }
+        for row in rows
+    ]
+
+
+async def wait_for_new(last_id: int, timeout: float) -> int:
+    """最新 ID が last_id を超えるか timeout 秒経過するまで待ち、その時点の最新 ID を返す"""
+    deadline = time.monotonic() + timeout
+    while True:
+        latest = _watermark.cached()
+        if latest is None:
+            latest = await sync_to_async(_watermark.current)()
+        if latest > last_id:
+            return latest
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return latest
+        await asyncio.sleep(min(WAIT_STEP_SECONDS, remaining))
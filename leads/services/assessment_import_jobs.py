@@ -0,0 +1,228 @@
+"""
+査定システム取り込みジョブ（AssessmentImportJob）の登録・実行
+
+査定システムの参照はログイン・検索・詳細取得の複数往復（各 30 秒タイムアウト）になるため、
+リクエスト内では行わず DB のジョブキューに積み、ワーカー（`python manage.py run_assessment_import_worker`）が
+実行する。画面は状態 API をポーリングし、完了したら取り込み結果を表示する。
+
+  登録: enqueue()  … 同じ案件・査定IDの待機中 / 実行中ジョブがあればそれを返す
+  実行: claim_next_job() → run_job()  … 取得（assessment_system_scraper のキャッシュを使う）→ Vehicle / Assessment に保存。
+        取り出すたびに claim_token を振り、結果は実行中・同じトークンのときだけ書き込む
+  状態: get_job()  … JOB_TIMEOUT を過ぎても終わらないジョブ（ワーカー停止中・異常終了など）は失敗にする
+  掃除: time_out_stale() / purge_expired() … ワーカーが 1 時間ごとに実行する
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Assessment, AssessmentImportJob
+from . import assessment_system_scraper
+
+logger = logging.getLogger(__name__)
+
+# 待機中・実行中のまま終わらないジョブを失敗とみなすまでの時間（画面で待つ上限）
+JOB_TIMEOUT = timedelta(minutes=10)
+
+# 完了・失敗したジョブの保持期間
+RETENTION = timedelta(days=7)
+
+_ACTIVE_STATUSES = [AssessmentImportJob.STATUS_QUEUED, AssessmentImportJob.STATUS_RUNNING]
+
+
+def enqueue(assessment: Assessment, assessment_system_id: str, user) -> AssessmentImportJob:
+    """取り込みジョブを登録する。同じ案件・査定IDの待機中・実行中ジョブがあればそれを返す"""
+    existing = (
+        AssessmentImportJob.objects
+        .filter(
+            assessment=assessment,
+            assessment_system_id=assessment_system_id,
+            status__in=_ACTIVE_STATUSES,
+            created_at__gte=timezone.now() - JOB_TIMEOUT,
+        )
+        .order_by('-created_at')
+        .first()
+    )
+    if existing:
+        return existing
+
+    return AssessmentImportJob.objects.create(
+        assessment=assessment,
+        assessment_system_id=assessment_system_id,
+        requested_by=user,
+        updated_by=user,
+    )
+
+
+def get_job(job_id: int) -> AssessmentImportJob | None:
+    """ジョブを返す。JOB_TIMEOUT を過ぎても終わっていなければ失敗にしてから返す"""
+    job = AssessmentImportJob.objects.filter(pk=job_id).first()
+    if job is None or job.status not in _ACTIVE_STATUSES:
+        return job
+    if job.created_at >= timezone.now() - JOB_TIMEOUT:
+        return job
+    time_out_stale(AssessmentImportJob.objects.filter(pk=job.pk))
+    job.refresh_from_db()
+    return job
+
+
+def time_out_stale(queryset=None) -> int:
+    """JOB_TIMEOUT を過ぎた待機中・実行中ジョブを失敗にする。件数を返す
+
+    実行中のワーカーは結果を書き込む時点で失敗になっていることに気づき、保存を取り消す（run_job）。
+    """
+    if queryset is None:
+        queryset = AssessmentImportJob.objects.all()
+    updated = (
+        queryset
+        .filter(status__in=_ACTIVE_STATUSES, created_at__lt=timezone.now() - JOB_TIMEOUT)
+        .update(
+            status=AssessmentImportJob.STATUS_FAILED,
+            error_message='取り込みが時間内に完了しませんでした。再度お試しください',
+            finished_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+    )
+    if updated:
+        logger.warning(f'[assessment_import] タイムアウト: {updated} 件')
+    return updated
+
+
+def claim_next_job() -> AssessmentImportJob | None:
+    """待機中のジョブを古い順に 1 件取り出して実行中にする。なければ None
+
+    JOB_TIMEOUT を過ぎた待機中ジョブは画面が待つのをやめているため取り出さない（time_out_stale で失敗にする）。
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            AssessmentImportJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=AssessmentImportJob.STATUS_QUEUED, created_at__gte=now - JOB_TIMEOUT)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status      = AssessmentImportJob.STATUS_RUNNING
+        job.started_at  = now
+        job.claim_token = uuid.uuid4().hex
+        job.save(update_fields=['status', 'started_at', 'claim_token', 'updated_at'])
+    return job
+
+
+def _finish(job: AssessmentImportJob, **fields) -> bool:
+    """job を取り出したときのまま実行中なら結果を書き込む。
+
+    タイムアウトで失敗になった（get_job / time_out_stale）場合は書き込まず False を返す。
+    """
+    updated = (
+        AssessmentImportJob.objects
+        .filter(pk=job.pk, status=AssessmentImportJob.STATUS_RUNNING, claim_token=job.claim_token)
+        .update(updated_at=timezone.now(), **fields)
+    )
+    if not updated:
+        logger.warning(f'[assessment_import] タイムアウト済みのため結果を破棄: job_id={job.pk}')
+        return False
+    for field, value in fields.items():
+        setattr(job, field, value)
+    return True
+
+
+def _fail(job: AssessmentImportJob, message: str) -> bool:
+    return _finish(
+        job,
+        status=AssessmentImportJob.STATUS_FAILED,
+        error_message=message[:1000],
+        finished_at=timezone.now(),
+    )
+
+
+def run_job(job: AssessmentImportJob) -> None:
+    """査定システムから取得して保存し、ジョブを完了（失敗）にする"""
+    try:
+        data = assessment_system_scraper.scrape_vehicle_data(job.assessment_system_id)
+    except ValueError as exc:
+        _fail(job, str(exc))
+        return
+    except Exception as exc:
+        logger.exception(f'[assessment_import] 取得失敗: job_id={job.pk} code={job.assessment_system_id}')
+        _fail(job, f'取り込みに失敗しました: {exc}')
+        return
+
+    try:
+        with transaction.atomic():
+            assessment = (
+                Assessment.objects
+                .select_for_update()
+                .select_related('vehicle')
+                .get(pk=job.assessment_id)
+            )
+            result = apply_import(assessment, job.assessment_system_id, data, job.requested_by)
+            finished = _finish(job, result=result, status=AssessmentImportJob.STATUS_DONE, finished_at=timezone.now())
+            if not finished:
+                transaction.set_rollback(True)   # 画面には失敗と返したため保存しない
+    except Exception as exc:
+        logger.exception(f'[assessment_import] 保存失敗: job_id={job.pk} assessment_id={job.assessment_id}')
+        _fail(job, f'取り込んだ内容の保存に失敗しました: {exc}')
+        return
+    if not finished:
+        return
+
+    assessment_system_scraper.discard_cached(job.assessment_system_id)  # 再取り込みは査定システムから取り直す
+    logger.info(
+        f'[assessment_import] 取り込み完了: job_id={job.pk} assessment_id={job.assessment_id} '
+        f'elapsed={(job.finished_at - job.started_at).total_seconds():.1f}s'
+    )
+
+
+def apply_import(assessment: Assessment, assessment_system_id: str, data: dict, user) -> dict:
+    """取得した車両情報を Vehicle / Assessment に保存し、画面に返す取り込み結果を返す"""
+    # 車両情報を保存
+    vehicle = assessment.vehicle
+    for field, value in data['vehicle'].items():
+        if field == 'inspection_expiry':
+            vehicle.inspection_expiry = value
+        elif value:
+            setattr(vehicle, field, value)
+    vehicle.updated_by = user
+    vehicle.save()
+
+    # Assessment に査定システム情報を保存
+    assessment.assessment_system_id          = assessment_system_id
+    assessment.assessment_system_imported_at = timezone.now()
+    if data.get('assessment_price') is not None:
+        assessment.assessment_price = data['assessment_price']
+    if data.get('recycle_amount') is not None:
+        assessment.assessment_system_recycle_amount = data['recycle_amount']
+    if data.get('overall_rating') is not None:
+        assessment.overall_rating = data['overall_rating']
+    assessment.save(update_fields=[
+        'assessment_system_id', 'assessment_system_imported_at',
+        'assessment_price', 'assessment_system_recycle_amount', 'overall_rating', 'updated_at',
+    ])
+
+    return {
+        'assessment_price': data.get('assessment_price'),
+        'recycle_amount':   data.get('recycle_amount'),
+        'overall_rating':   data.get('overall_rating'),
+        'vehicle':          {
+            k: str(v) if v is not None else ''
+            for k, v in data['vehicle'].items()
+            if k != 'inspection_expiry'
+        } | {
+            'inspection_expiry': data['vehicle']['inspection_expiry'].strftime('%Y-%m-%d')
+            if data['vehicle'].get('inspection_expiry') else ''
+        },
+    }
+
+
+def purge_expired() -> int:
+    """保持期間を過ぎた完了・失敗ジョブを削除する。削除件数を返す"""
+    deleted, _ = AssessmentImportJob.objects.filter(
+        status__in=[AssessmentImportJob.STATUS_DONE, AssessmentImportJob.STATUS_FAILED],
+        created_at__lt=timezone.now() - RETENTION,
+    ).delete()
+    return deleted
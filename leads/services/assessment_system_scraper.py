@@ -6,15 +6,31 @@
     2. 査定IDで検索（code フィールド）
     3. 検索結果から内部IDを取得
     4. 詳細ページ（/editDetail.do?id=...）から車両情報を抽出
+
+  セッション : 取り込み 1 回・先読み 1 回の間だけログインし、終わったらログアウトする
+               （AssessmentSystemClient を with ブロックで使う）。先読みは ASSESSMENT_SYSTEM_POOL_SIZE 本の
+               セッションを並行に使い回す。検索でセッション切れを検知したら再ログインする
+  キャッシュ : 抽出結果を査定IDごとに ASSESSMENT_SYSTEM_CACHE_TTL_SEC の間キャッシュする（該当なしはキャッシュしない）
+  先読み     : prefetch_pending() — 査定システムIDが保存済みで未取り込みの案件のキャッシュを温める
+               （python manage.py prefetch_assessment_system）
+
+プロセスやスレッドをまたいでセッションは持ち越さないため、プロセスが強制終了されても
+残るログインは実行中だった取り込み・先読みの分だけになる。
 """
 import re
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date
 
 import requests
 from bs4 import BeautifulSoup
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from . import caching
 
 logger = logging.getLogger(__name__)
 
@@ -89,71 +105,78 @@ def _parse_rating(value: str) -> float | None:
 
 
 # ---------------------------------------------------------------------------
-# メイン処理
+# ログイン済みセッション
 # ---------------------------------------------------------------------------
 
-def scrape_vehicle_data(assessment_system_id: str) -> dict:
-    """
-    査定システムにログインし、指定の査定ID（10桁）の車両情報を返す。
-
-    Returns:
-        {
-            'vehicle':          { maker, car_model, year, mileage, grade, color,
-                                  displacement, chassis_number, registration_number,
-                                  passenger_count, body_type, drive_type, inspection_expiry },
-            'assessment_price': int | None,
-            'recycle_amount':   int | None,
-            'overall_rating':   float | None,
-        }
-    Raises:
-        requests.HTTPError, ValueError
-    """
-    base_url = settings.ASSESSMENT_SYSTEM_BASE_URL
-    session  = requests.Session()
-    session.headers.update({'User-Agent': 'Mozilla/5.0 (compatible; internal-system)'})
-
-    # 1. GETでログインページを取得してセッショントークンを確立
-    logger.info('査定システム: ログインページ取得中')
-    login_page_resp = session.get(f'{base_url}/index.do', timeout=30)
-    login_page_resp.raise_for_status()
-
-    # ログインフォームの hidden フィールドをすべて収集
-    login_page_soup = BeautifulSoup(login_page_resp.text, 'html.parser')
-    login_form_data = _get_form_data(login_page_soup, 'id') or _get_form_data(login_page_soup, 'pwd') or {}
-    login_form_data.update({
-        'id':     settings.ASSESSMENT_SYSTEM_USER,
-        'pwd':    settings.ASSESSMENT_SYSTEM_PASSWORD,
-        'Submit': 'ログイン',
-    })
-
-    # ログインフォームの action を動的解決
-    login_url = _resolve_form_url(base_url, login_page_soup, 'id') or f'{base_url}/index.do'
-
-    # 2. ログイン POST
-    logger.info('査定システム: ログイン中 (%s)', assessment_system_id)
-    login_resp = session.post(
-        login_url,
-        data=login_form_data,
-        headers={'Referer': login_page_resp.url},
-        timeout=30,
-    )
-    login_resp.raise_for_status()
-
-    # 3. 検索フォームを探してサブミット
-    landing_soup = BeautifulSoup(login_resp.text, 'html.parser')
-    search_url   = _resolve_search_url(base_url, landing_soup)
-    logout_url   = _resolve_logout_url(base_url, landing_soup)
-
-    search_form_data = _get_form_data(landing_soup, 'code')
-    search_form_data['code']       = assessment_system_id
-    search_form_data['query_type'] = '1'   # 直接検索（査定IDで絞り込み）
-
-    try:
-        logger.info('査定システム: 検索中 (url=%s, code=%s)', search_url, assessment_system_id)
-        search_resp = session.post(
-            search_url,
+class _SessionExpired(RuntimeError):
+    """検索結果の代わりにログインページが返った（セッション切れ）"""
+
+
+class _Session:
+    """査定システムにログインした 1 本のセッション（同時に 1 スレッドからだけ使う）"""
+
+    def __init__(self, base_url: str):
+        self.base_url    = base_url
+        self.http        = None
+        self.landing_url = None
+        self.search_url  = None
+        self.search_form = {}
+        self.logout_url  = None
+
+    def login(self) -> None:
+        """ログインし直して、検索フォーム・ログアウト URL を取り直す"""
+        if self.http is not None:
+            self.http.close()
+        self.http = requests.Session()
+        self.http.headers.update({'User-Agent': 'Mozilla/5.0 (compatible; internal-system)'})
+
+        # 1. GETでログインページを取得してセッショントークンを確立
+        logger.info('査定システム: ログインページ取得中')
+        login_page_resp = self.http.get(f'{self.base_url}/index.do', timeout=30)
+        login_page_resp.raise_for_status()
+
+        # ログインフォームの hidden フィールドをすべて収集
+        login_page_soup = BeautifulSoup(login_page_resp.text, 'html.parser')
+        login_form_data = _get_form_data(login_page_soup, 'id') or _get_form_data(login_page_soup, 'pwd') or {}
+        login_form_data.update({
+            'id':     settings.ASSESSMENT_SYSTEM_USER,
+            'pwd':    settings.ASSESSMENT_SYSTEM_PASSWORD,
+            'Submit': 'ログイン',
+        })
+
+        # ログインフォームの action を動的解決
+        login_url = _resolve_form_url(self.base_url, login_page_soup, 'id') or f'{self.base_url}/index.do'
+
+        # 2. ログイン POST
+        logger.info('査定システム: ログイン中')
+        login_resp = self.http.post(
+            login_url,
+            data=login_form_data,
+            headers={'Referer': login_page_resp.url},
+            timeout=30,
+        )
+        login_resp.raise_for_status()
+
+        # 検索フォーム・ログアウトリンクはログイン後ページから解決して使い回す
+        landing_soup     = BeautifulSoup(login_resp.text, 'html.parser')
+        self.landing_url = login_resp.url
+        self.search_url  = _resolve_search_url(self.base_url, landing_soup)
+        self.search_form = _get_form_data(landing_soup, 'code')
+        self.logout_url  = _resolve_logout_url(self.base_url, landing_soup)
+
+    def lookup(self, assessment_system_id: str) -> dict:
+        """査定IDで検索し、詳細ページから抽出した車両情報を返す"""
+
+        # 3. 検索フォームをサブミット
+        search_form_data = dict(self.search_form)
+        search_form_data['code']       = assessment_system_id
+        search_form_data['query_type'] = '1'   # 直接検索（査定IDで絞り込み）
+
+        logger.info('査定システム: 検索中 (url=%s, code=%s)', self.search_url, assessment_system_id)
+        search_resp = self.http.post(
+            self.search_url,
             data=search_form_data,
-            headers={'Referer': login_resp.url},
+            headers={'Referer': self.landing_url},
             timeout=30,
         )
         search_resp.raise_for_status()
@@ -161,39 +184,216 @@ def scrape_vehicle_data(assessment_system_id: str) -> dict:
         # ログインページへリダイレクトされた場合はGETで再試行
         if _is_login_page(search_resp):
             logger.warning('査定システム: POST検索でセッション切れ → GETで再試行')
-            search_resp = session.get(
-                search_url,
+            search_resp = self.http.get(
+                self.search_url,
                 params={'code': assessment_system_id},
-                headers={'Referer': login_resp.url},
+                headers={'Referer': self.landing_url},
                 timeout=30,
             )
             search_resp.raise_for_status()
-
+            if _is_login_page(search_resp):
+                raise _SessionExpired('査定システムのセッションを確立できませんでした')
 
         # 4. 検索結果から内部IDを取得
         result_soup = BeautifulSoup(search_resp.text, 'html.parser')
         # ログアウトURLが未取得の場合、検索結果ページから再試行
-        if not logout_url:
-            logout_url = _resolve_logout_url(base_url, result_soup)
+        if not self.logout_url:
+            self.logout_url = _resolve_logout_url(self.base_url, result_soup)
 
         internal_id = _find_internal_id(result_soup, assessment_system_id)
         if not internal_id:
             raise ValueError(f'査定ID {assessment_system_id} のレコードが見つかりませんでした')
 
-        # 4. 詳細ページ取得
+        # 5. 詳細ページ取得
         timestamp  = int(time.time() * 1000)
-        detail_url = f'{base_url}/editDetail.do?id={internal_id}&{timestamp}'
+        detail_url = f'{self.base_url}/editDetail.do?id={internal_id}&{timestamp}'
         logger.info('査定システム: 詳細ページ取得 (%s)', detail_url)
-        detail_resp = session.get(detail_url, timeout=30)
+        detail_resp = self.http.get(detail_url, timeout=30)
         detail_resp.raise_for_status()
 
-        # 5. データ抽出
+        # 6. データ抽出
         detail_soup = BeautifulSoup(detail_resp.text, 'html.parser')
         return _extract_data(detail_soup)
 
-    finally:
-        # 6. 必ずログアウト（セッション残留によるログインエラーを防ぐ）
-        _logout(session, base_url, logout_url)
+    def close(self) -> None:
+        """ログアウトしてセッションを破棄する（セッション残留によるログインエラーを防ぐ）"""
+        if self.http is None:
+            return
+        _logout(self.http, self.base_url, self.logout_url)
+        self.http.close()
+        self.http = None
+
+
+# ---------------------------------------------------------------------------
+# クライアント（セッションプール）
+# ---------------------------------------------------------------------------
+
+class AssessmentSystemClient:
+    """ログイン済みセッションを使い回して査定システムを参照するクライアント
+
+    with ブロックの間だけ使う。セッションは最初の fetch でログインし、同時に使うのは pool_size 本まで
+    （超えた呼び出しは空きを待つ）。ブロックを抜けるとすべてのセッションをログアウトする
+    （査定システムに同じアカウントのログインを残さない）。
+    使用中にセッション切れを検知した場合は、同じセッションで 1 回だけログインし直して再試行する。
+    """
+
+    def __init__(self, base_url: str, pool_size: int):
+        self.base_url = base_url
+        self._slots = threading.BoundedSemaphore(max(pool_size, 1))
+        self._lock  = threading.Lock()
+        self._idle: list[_Session] = []   # ログイン済みで未使用のセッション
+
+    def __enter__(self) -> 'AssessmentSystemClient':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def fetch(self, assessment_system_id: str) -> dict:
+        """査定ID（10桁）の車両情報を取得する（キャッシュなし）
+
+        Raises:
+            requests.RequestException, ValueError（該当なし）
+        """
+        with self._slots:
+            session = self._checkout()
+            try:
+                try:
+                    data = session.lookup(assessment_system_id)
+                except _SessionExpired:
+                    logger.info('査定システム: セッション切れのため再ログイン')
+                    session.login()
+                    data = session.lookup(assessment_system_id)
+            except ValueError:
+                self._checkin(session)   # 該当なしはセッションの異常ではない
+                raise
+            except Exception:
+                session.close()
+                raise
+            self._checkin(session)
+            return data
+
+    def close(self) -> None:
+        """ログイン済みのセッションをすべてログアウトする"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            session.close()
+
+    def _checkout(self) -> _Session:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        session = _Session(self.base_url)
+        try:
+            session.login()
+        except Exception:
+            session.close()
+            raise
+        return session
+
+    def _checkin(self, session: _Session) -> None:
+        with self._lock:
+            self._idle.append(session)
+
+
+def open_client(pool_size: int = 1) -> AssessmentSystemClient:
+    """ASSESSMENT_SYSTEM_BASE_URL のクライアント（with ブロックで使い、抜けたらログアウトする）"""
+    return AssessmentSystemClient(settings.ASSESSMENT_SYSTEM_BASE_URL, pool_size=pool_size)
+
+
+# ---------------------------------------------------------------------------
+# メイン処理
+# ---------------------------------------------------------------------------
+
+def _cache_key(assessment_system_id: str) -> str:
+    return caching.make_key('assessment_system', assessment_system_id)
+
+
+def _get(client: AssessmentSystemClient, assessment_system_id: str) -> tuple[dict, bool]:
+    """(車両情報, 査定システムから取得したか)。キャッシュが有効ならそれを返す"""
+    fetched = []
+
+    def compute():
+        fetched.append(True)
+        return client.fetch(assessment_system_id)
+
+    data = caching.get_or_compute(
+        _cache_key(assessment_system_id), compute, settings.ASSESSMENT_SYSTEM_CACHE_TTL_SEC,
+    )
+    return data, bool(fetched)
+
+
+def scrape_vehicle_data(assessment_system_id: str) -> dict:
+    """
+    指定の査定ID（10桁）の車両情報を返す。
+    ASSESSMENT_SYSTEM_CACHE_TTL_SEC 以内に取得済み（prefetch_pending を含む）ならキャッシュから返す。
+
+    Returns:
+        {
+            'vehicle':          { maker, car_model, year, mileage, grade, color,
+                                  displacement, chassis_number, registration_number,
+                                  passenger_count, body_type, drive_type, inspection_expiry },
+            'assessment_price': int | None,
+            'recycle_amount':   int | None,
+            'overall_rating':   float | None,
+        }
+    Raises:
+        requests.HTTPError, ValueError
+    """
+    with open_client() as client:   # キャッシュになければログインし、取得後にログアウトする
+        return _get(client, assessment_system_id)[0]
+
+
+def discard_cached(assessment_system_id: str) -> None:
+    """キャッシュした車両情報を捨てる（取り込み済みの査定IDを次回は取り直す）"""
+    cache.delete(_cache_key(assessment_system_id))
+
+
+def prefetch_pending(limit: int | None = None) -> dict:
+    """
+    査定システムIDが保存済みで未取り込みの案件について、車両情報を取得してキャッシュを温める。
+    同時取得数（= 同時ログイン数）は ASSESSMENT_SYSTEM_POOL_SIZE まで。終わったらすべてログアウトする。
+
+    Returns:
+        {'total': 対象の査定ID数, 'fetched': 取得した数, 'cached': キャッシュ済みだった数,
+         'failed': {査定ID: エラー内容}}
+    """
+    from ..models import Assessment
+
+    ids = (
+        Assessment.objects
+        .filter(assessment_system_imported_at__isnull=True)
+        .exclude(assessment_system_id='')
+        .order_by('-updated_at')
+        .values_list('assessment_system_id', flat=True)
+    )
+    ids = list(dict.fromkeys(ids))[:limit]
+
+    def warm(assessment_system_id):
+        try:
+            return _get(client, assessment_system_id)[1]
+        finally:
+            connections.close_all()   # このスレッドで開いた DB 接続（db キャッシュなど）を閉じる
+
+    pool_size = max(settings.ASSESSMENT_SYSTEM_POOL_SIZE, 1)
+    summary = {'total': len(ids), 'fetched': 0, 'cached': 0, 'failed': {}}
+    with open_client(pool_size) as client, ThreadPoolExecutor(max_workers=pool_size) as executor:
+        futures = {executor.submit(warm, assessment_system_id): assessment_system_id for assessment_system_id in ids}
+        for future in as_completed(futures):
+            assessment_system_id = futures[future]
+            try:
+                fetched = future.result()
+            except Exception as e:
+                logger.warning('査定システム: 先読み失敗 (%s): %s', assessment_system_id, e)
+                summary['failed'][assessment_system_id] = str(e)
+                continue
+            summary['fetched' if fetched else 'cached'] += 1
+    logger.info(
+        '査定システム: 先読み完了 (対象=%d, 取得=%d, キャッシュ済み=%d, 失敗=%d)',
+        summary['total'], summary['fetched'], summary['cached'], len(summary['failed']),
+    )
+    return summary
 
 
 def _resolve_form_url(base_url: str, soup: BeautifulSoup, anchor_field: str) -> str | None:
@@ -0,0 +1,158 @@
+"""
+キャッシュアサイド（参照時にキャッシュになければ計算して保存する）の共通処理
+
+バックエンドは settings.CACHES['default']（locmem / file / db / redis）。
+
+  キー       : make_key(namespace, *parts) — 名前空間の世代番号を含む。bump_namespace() で名前空間ごと無効化
+  取得       : get_or_compute(key, compute, timeout, tags=..., stale_timeout=...)
+  多重計算防止 : キャッシュの add() を計算ロックにして、同じキーの再計算は 1 つのリクエスト（ワーカー）だけが行う。
+               ロックを取れなかった側は、期限切れでも stale_timeout 内の古い値があればそれを返し、
+               なければ計算結果が入るまで少し待つ（待ちきれなければ自分で計算する）
+  裏で再計算 : refresh_in_background=True なら、古い値がある間はロックを取った側も古い値をすぐ返し、
+               再計算は別スレッドで行う（失敗時はロックの期限まで再計算しない）
+  タグ       : 値を保存するときにタグの世代番号を一緒に記録し、invalidate_tags() で世代を進めると
+               以後の参照ではその値を使わない（古い値としても返さない）
+
+世代番号は消えても過去の値と重ならないよう、初期値を時刻（ナノ秒）にしている。
+無効化はトランザクション内で呼ばれた場合コミット後に行う（コミット前のデータで再計算されないように）。
+"""
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from functools import partial
+
+from django.core.cache import cache
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_LOCK_TIMEOUT_SEC = 30     # 計算ロックの有効期限（計算中にプロセスが落ちた場合の解放）
+_WAIT_SEC = 3.0            # ロックを取れず古い値もないとき、他の計算結果を待つ最大時間
+_WAIT_STEP_SEC = 0.05
+
+
+# ---------------------------------------------------------------------------
+# 世代番号
+# ---------------------------------------------------------------------------
+
+def _generations(names) -> dict:
+    """世代番号のキー → 現在の世代（なければ作る）"""
+    if not names:
+        return {}
+    found = cache.get_many(names)
+    for name in names:
+        if name not in found:
+            cache.add(name, time.time_ns(), None)
+            found[name] = cache.get(name)
+    return {name: found[name] for name in names}
+
+
+def _bump(names) -> None:
+    for name in names:
+        try:
+            cache.incr(name)
+        except ValueError:
+            cache.add(name, time.time_ns(), None)  # 未作成（または追い出された）なら新しい世代で作る
+
+
+def _namespace_key(namespace: str) -> str:
+    return f'cache:ns:{namespace}'
+
+
+def _tag_key(tag: str) -> str:
+    return f'cache:tag:{tag}'
+
+
+# ---------------------------------------------------------------------------
+# 公開 API
+# ---------------------------------------------------------------------------
+
+def make_key(namespace: str, *parts) -> str:
+    """名前空間の世代番号を含むキー（parts は str() できる値）"""
+    generation = _generations([_namespace_key(namespace)])[_namespace_key(namespace)]
+    digest = hashlib.sha1('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:16]
+    return f'{namespace}:{generation}:{digest}'
+
+
+def bump_namespace(namespace: str) -> None:
+    """名前空間の全キーを無効にする"""
+    transaction.on_commit(partial(_bump, [_namespace_key(namespace)]))
+
+
+def invalidate_tags(*tags: str) -> None:
+    """タグを付けて保存した値を無効にする"""
+    transaction.on_commit(partial(_bump, [_tag_key(tag) for tag in tags]))
+
+
+def get_or_compute(key: str, compute, timeout: float, *, tags=(), stale_timeout: float = 0,
+                   refresh_in_background: bool = False):
+    """key の値を返す。なければ（または timeout を過ぎていれば）compute() の結果を保存して返す
+
+    stale_timeout > 0 のとき、timeout を過ぎた値もさらに stale_timeout の間は保持し、
+    他のリクエストが再計算している間はその古い値を返す。
+    refresh_in_background=True なら、古い値を返したうえで再計算を別スレッドで行う
+    （呼び出し側が待つのは古い値もない初回だけになる）。
+    """
+    tag_generations = _generations([_tag_key(tag) for tag in tags])
+    entry = cache.get(key)
+    stale = None
+    if entry is not None and entry['tags'] == tag_generations:
+        if time.time() < entry['fresh_until']:
+            return entry['value']
+        stale = entry
+
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, _LOCK_TIMEOUT_SEC):
+        if stale is not None and refresh_in_background:
+            threading.Thread(
+                target=_refresh,
+                args=(key, lock_key, token, compute, timeout, stale_timeout, tag_generations),
+                name=f'cache-refresh:{key}',
+                daemon=True,
+            ).start()
+            return stale['value']
+        try:
+            return _compute_and_store(key, compute, timeout, stale_timeout, tag_generations)
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    if stale is not None:
+        return stale['value']
+
+    deadline = time.monotonic() + _WAIT_SEC
+    while time.monotonic() < deadline:
+        time.sleep(_WAIT_STEP_SEC)
+        entry = cache.get(key)
+        if entry is not None and entry['tags'] == tag_generations:
+            return entry['value']
+    logger.warning(f'[caching] 他の再計算を待ちきれませんでした: {key}')
+    return _compute_and_store(key, compute, timeout, stale_timeout, tag_generations)
+
+
+def _refresh(key, lock_key, token, compute, timeout, stale_timeout, tag_generations):
+    try:
+        try:
+            _compute_and_store(key, compute, timeout, stale_timeout, tag_generations)
+        except Exception as e:
+            # ロックは期限まで残し、その間は古い値を返し続ける（失敗した再計算をすぐに繰り返さない）
+            logger.warning(f'[caching] バックグラウンド再計算に失敗しました: {key}: {e}')
+            return
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+    finally:
+        connections.close_all()  # このスレッドで開いた DB 接続（db キャッシュなど）を閉じる
+
+
+def _compute_and_store(key, compute, timeout, stale_timeout, tag_generations):
+    value = compute()
+    entry = {
+        'value': value,
+        'tags': tag_generations,  # 計算前の世代（計算中に無効化されれば次の参照で再計算される）
+        'fresh_until': time.time() + timeout,
+    }
+    cache.set(key, entry, timeout + stale_timeout)
+    return value
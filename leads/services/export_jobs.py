@@ -0,0 +1,161 @@
+"""
+PDF 出力ジョブ（ExportJob）の登録・実行
+
+大きな台帳の PDF 生成をリクエスト内で行わず、DB のジョブキューに積んで
+ワーカー（`python manage.py run_export_worker`）が MEDIA_ROOT/exports/ に書き出す。
+画面は状態 API をポーリングし、完了したらダウンロード URL へ遷移する。
+
+  登録: enqueue()  … 同じ（種別・条件・閲覧範囲・データの版）の完了済み / 実行中ジョブがあればそれを返す
+  実行: claim_next_job() → run_job()  … 取り出すたびに claim_token を振り、結果は同じトークンのときだけ書き込む
+  掃除: purge_expired()
+"""
+import hashlib
+import json
+import logging
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import ExportJob
+from . import vehicle_export
+
+logger = logging.getLogger(__name__)
+
+# 出力種別 → (PDF 生成関数, ダウンロード時のファイル名)
+RENDERERS = {
+    ExportJob.TYPE_VEHICLE_LIST: (vehicle_export.render_vehicle_list_pdf,    'vehicle_list.pdf'),
+    ExportJob.TYPE_INVENTORY:    (vehicle_export.render_inventory_table_pdf, 'inventory_table.pdf'),
+    ExportJob.TYPE_LEDGER:       (vehicle_export.render_ledger_pdf,          'ledger.pdf'),
+}
+
+# 実行中のまま止まったジョブ（ワーカー異常終了など）を再実行するまでの時間
+RUNNING_TIMEOUT = timedelta(minutes=30)
+
+# 完了・失敗したジョブと出力ファイルの保持期間
+RETENTION = timedelta(days=7)
+
+
+def _cache_key(export_type: str, params: dict, scope: str, version: str) -> str:
+    payload = json.dumps([export_type, params, scope, version], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def download_filename(job: ExportJob) -> str:
+    return RENDERERS[job.export_type][1]
+
+
+def enqueue(user, export_type: str, params: dict) -> ExportJob:
+    """出力ジョブを登録する。同じ内容のジョブが完了済み・待機中・実行中ならそれを返す"""
+    scope   = vehicle_export.access_scope(user)
+    version = vehicle_export.data_version(export_type, scope, params)
+    key     = _cache_key(export_type, params, scope, version)
+
+    existing = (
+        ExportJob.objects
+        .filter(cache_key=key, status__in=[ExportJob.STATUS_QUEUED, ExportJob.STATUS_RUNNING, ExportJob.STATUS_DONE])
+        .order_by('-created_at')
+        .first()
+    )
+    if existing:
+        if existing.status != ExportJob.STATUS_DONE:
+            return existing
+        if existing.file and existing.file.storage.exists(existing.file.name):
+            return existing
+
+    return ExportJob.objects.create(
+        export_type=export_type,
+        params=params,
+        access_scope=scope,
+        data_version=version,
+        cache_key=key,
+        requested_by=user,
+        updated_by=user,
+    )
+
+
+def claim_next_job():
+    """待機中（または実行が止まった）ジョブを 1 件取り出して実行中にする。なければ None"""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            ExportJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=ExportJob.STATUS_QUEUED)
+                | Q(status=ExportJob.STATUS_RUNNING, started_at__lt=now - RUNNING_TIMEOUT)
+            )
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status      = ExportJob.STATUS_RUNNING
+        job.started_at  = now
+        job.claim_token = uuid.uuid4().hex
+        job.save(update_fields=['status', 'started_at', 'claim_token', 'updated_at'])
+    return job
+
+
+def _finish(job: ExportJob, **fields) -> bool:
+    """job を取り出したときのまま実行中なら結果を書き込む。
+
+    RUNNING_TIMEOUT を過ぎて別のワーカーが取り直した（claim_token が変わった）場合は書き込まず False を返す。
+    """
+    updated = (
+        ExportJob.objects
+        .filter(pk=job.pk, status=ExportJob.STATUS_RUNNING, claim_token=job.claim_token)
+        .update(updated_at=timezone.now(), **fields)
+    )
+    if not updated:
+        logger.warning(f'[export] 別のワーカーが取り直したため結果を破棄: job_id={job.pk}')
+        return False
+    for field, value in fields.items():
+        setattr(job, field, value)
+    return True
+
+
+def run_job(job: ExportJob) -> None:
+    """PDF を一時ファイルに生成してから MEDIA_ROOT に保存し、ジョブを完了にする"""
+    render, _ = RENDERERS[job.export_type]
+    try:
+        with tempfile.TemporaryFile() as tmp:
+            render(tmp, job.access_scope, job.params)
+            tmp.seek(0)
+            job.file.save(f'{job.export_type}_{job.pk}.pdf', File(tmp), save=False)
+    except Exception as exc:
+        logger.exception(f'[export] PDF 生成失敗: job_id={job.pk} type={job.export_type}')
+        _finish(
+            job,
+            status=ExportJob.STATUS_FAILED,
+            error_message=str(exc)[:1000],
+            finished_at=timezone.now(),
+        )
+        return
+
+    if not _finish(job, file=job.file.name, status=ExportJob.STATUS_DONE, finished_at=timezone.now()):
+        job.file.delete(save=False)
+        return
+    logger.info(
+        f'[export] PDF 生成完了: job_id={job.pk} type={job.export_type} '
+        f'elapsed={(job.finished_at - job.started_at).total_seconds():.1f}s'
+    )
+
+
+def purge_expired() -> int:
+    """保持期間を過ぎた完了・失敗ジョブを出力ファイルごと削除する。削除件数を返す"""
+    expired = ExportJob.objects.filter(
+        status__in=[ExportJob.STATUS_DONE, ExportJob.STATUS_FAILED],
+        created_at__lt=timezone.now() - RETENTION,
+    )
+    count = 0
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
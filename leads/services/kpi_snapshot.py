@@ -0,0 +1,281 @@
+"""
+ダッシュボード KPI スナップショット（UserKpiSnapshot）の集計・更新・参照
+
+担当者 × 期間（年・月・週）ごとに、商談数・ステータス別件数・売却件数・売却金額・経常利益を
+事前集計しておき、ダッシュボードは集計済みの行を読むだけにする。
+
+  更新: 元データの保存・削除時に mark_dirty(user_id, 日付) → commit 後に該当期間のみ再集計
+  全件: rebuild_all()（rebuild_kpi_snapshots コマンド）
+  参照: get_user_period_snapshots()（1 クエリ）/ get_store_month_snapshots()（1 クエリ）
+"""
+import logging
+from datetime import date, datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import Assessment, SalesProcess, UserKpiSnapshot
+
+logger = logging.getLogger(__name__)
+
+PERIOD_TYPES = (UserKpiSnapshot.PERIOD_YEAR, UserKpiSnapshot.PERIOD_MONTH, UserKpiSnapshot.PERIOD_WEEK)
+
+KPI_FIELDS = (
+    'appointments', 'contracts', 'lost_count', 'managed_count', 'pre_cancel_count',
+    'sold_count', 'sold_amount', 'operating_profit',
+)
+
+
+# ---------------------------------------------------------------------------
+# 期間
+# ---------------------------------------------------------------------------
+
+def period_start(period_type: str, day: date) -> date:
+    """day を含む期間の開始日（週は月曜始まり）"""
+    if period_type == UserKpiSnapshot.PERIOD_YEAR:
+        return day.replace(month=1, day=1)
+    if period_type == UserKpiSnapshot.PERIOD_MONTH:
+        return day.replace(day=1)
+    return day - timedelta(days=day.weekday())
+
+
+def period_end(period_type: str, start: date) -> date:
+    """期間の終了日（この日を含まない）"""
+    if period_type == UserKpiSnapshot.PERIOD_YEAR:
+        return start.replace(year=start.year + 1)
+    if period_type == UserKpiSnapshot.PERIOD_MONTH:
+        return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start + timedelta(days=7)
+
+
+def current_period_starts(today: date = None) -> dict:
+    today = today or timezone.localdate()
+    return {period_type: period_start(period_type, today) for period_type in PERIOD_TYPES}
+
+
+def _local_midnight(day: date):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+# ---------------------------------------------------------------------------
+# 集計
+# ---------------------------------------------------------------------------
+
+def build_sales_financial_kpis(qs):
+    """SalesProcess クエリセットから売却・経常利益集計を返す（int 値で返す）"""
+    _dec = DecimalField(max_digits=14, decimal_places=0)
+    effective_purchase = Case(
+        When(
+            contract__amount_correction_flag=True,
+            contract__corrected_price__isnull=False,
+            then=F('contract__corrected_price'),
+        ),
+        default=F('contract__purchase_price_excl_tax'),
+        output_field=_dec,
+    )
+    totals = qs.aggregate(
+        sold_count=Count('id'),
+        sold_amount=Coalesce(Sum('sold_price'), Value(0), output_field=_dec),
+        purchase_amount=Coalesce(Sum(effective_purchase), Value(0), output_field=_dec),
+        total_entry_fee=Coalesce(Sum('sold_destination__entry_fee'), Value(0), output_field=_dec),
+        total_contract_fee=Coalesce(Sum('sold_destination__contract_fee'), Value(0), output_field=_dec),
+        total_transport_personal=Coalesce(Sum('transport_fee_personal'), Value(0), output_field=_dec),
+        total_transport_auction=Coalesce(Sum('transport_fee_auction'), Value(0), output_field=_dec),
+        total_other_fee=Coalesce(Sum('other_fee'), Value(0), output_field=_dec),
+    )
+    sold_amount = int(totals['sold_amount'] or 0)
+    total_cost = int(
+        (totals['purchase_amount'] or 0) +
+        (totals['total_entry_fee'] or 0) +
+        (totals['total_contract_fee'] or 0) +
+        (totals['total_transport_personal'] or 0) +
+        (totals['total_transport_auction'] or 0) +
+        (totals['total_other_fee'] or 0)
+    )
+    return {
+        'sold_count': totals['sold_count'],
+        'sold_amount': sold_amount,
+        'operating_profit': sold_amount - total_cost,
+    }
+
+
+def compute_user_period(user_id: int, period_type: str, start: date) -> dict:
+    """担当者 1 名・1 期間の KPI を元データから集計する（2 クエリ）"""
+    end = period_end(period_type, start)
+    counts = Assessment.objects.filter(
+        assigned_to_id=user_id,
+        created_at__gte=_local_midnight(start),
+        created_at__lt=_local_midnight(end),
+    ).aggregate(
+        appointments=Count('id'),
+        contracts=Count('id', filter=Q(status=Assessment.STATUS_CONTRACTED)),
+        lost_count=Count('id', filter=Q(status=Assessment.STATUS_LOST)),
+        managed_count=Count('id', filter=Q(status=Assessment.STATUS_MANAGED)),
+        pre_cancel_count=Count('id', filter=Q(status=Assessment.STATUS_PRE_CANCEL)),
+    )
+    financial = build_sales_financial_kpis(SalesProcess.objects.filter(
+        sale_done=True,
+        sold_price__isnull=False,
+        contract__assigned_to_id=user_id,
+        sold_at__gte=start,
+        sold_at__lt=end,
+    ))
+    return {**counts, **financial}
+
+
+def refresh_user_period(user_id: int, period_type: str, start: date) -> None:
+    for attempt in range(2):
+        values = compute_user_period(user_id, period_type, start)
+        if not any(values.values()):
+            UserKpiSnapshot.objects.filter(user_id=user_id, period_type=period_type, period_start=start).delete()
+            return
+        try:
+            UserKpiSnapshot.objects.update_or_create(
+                user_id=user_id, period_type=period_type, period_start=start, defaults=values,
+            )
+            return
+        except IntegrityError:
+            # 同じ期間の行を並行して作成された。集計し直して既存行を更新する
+            if attempt:
+                raise
+
+
+def refresh_user_day(user_id: int, day: date) -> None:
+    """day を含む年・月・週の 3 期間を再集計する"""
+    for period_type in PERIOD_TYPES:
+        refresh_user_period(user_id, period_type, period_start(period_type, day))
+
+
+def _refresh_after_commit(user_id: int, day: date) -> None:
+    try:
+        refresh_user_day(user_id, day)
+    except Exception:
+        # 集計失敗で元の更新処理を失敗させない（rebuild_kpi_snapshots で復旧できる）
+        logger.exception(f'[kpi] スナップショット更新失敗: user_id={user_id} day={day}')
+
+
+def mark_dirty(user_id, day) -> None:
+    """担当者・日付の KPI を再集計対象にする（commit 後に実行される）"""
+    if not user_id or day is None:
+        return
+    if isinstance(day, datetime):
+        day = timezone.localdate(day)
+    transaction.on_commit(lambda: _refresh_after_commit(user_id, day))
+
+
+def mark_sales_process_dirty(sales_process) -> None:
+    """売却実績（SalesProcess）の変更を再集計対象にする"""
+    if sales_process.sold_at is None:
+        return
+    assigned_to_id = (
+        SalesProcess.objects.filter(pk=sales_process.pk)
+        .values_list('contract__assigned_to_id', flat=True)
+        .first()
+    )
+    mark_dirty(assigned_to_id, sales_process.sold_at)
+
+
+def _refresh_periods_after_commit(keys) -> None:
+    for user_id, period_type, start in sorted(keys):
+        try:
+            refresh_user_period(user_id, period_type, start)
+        except Exception:
+            logger.exception(f'[kpi] スナップショット更新失敗: user_id={user_id} {period_type}={start}')
+
+
+def mark_auction_venue_dirty(venue_id) -> None:
+    """オークション会場（出品・成約費用）の変更を、その会場での売却実績の再集計対象にする
+
+    売却日が多くても同じ期間は 1 回だけ集計するよう、担当者 × 期間にまとめて commit 後に実行する。
+    """
+    sold = (
+        SalesProcess.objects
+        .filter(sold_destination_id=venue_id, sale_done=True, sold_at__isnull=False)
+        .values_list('contract__assigned_to_id', 'sold_at')
+        .distinct()
+    )
+    keys = set()
+    for user_id, sold_at in sold:
+        if user_id:
+            keys.update((user_id, pt, period_start(pt, sold_at)) for pt in PERIOD_TYPES)
+    if keys:
+        transaction.on_commit(lambda: _refresh_periods_after_commit(keys))
+
+
+def rebuild_all(since: date = None) -> int:
+    """スナップショットを元データから作り直す。since 指定時はその日を含む年以降のみ。作成件数を返す"""
+    assessments = Assessment.objects.all()
+    sales = SalesProcess.objects.filter(sale_done=True, sold_price__isnull=False, sold_at__isnull=False)
+    snapshots = UserKpiSnapshot.objects.all()
+    rebuild_from = None
+    if since:
+        # 週は年をまたぐことがあるため、年初を含む週の開始日（前年末）から作り直す
+        rebuild_from = period_start(UserKpiSnapshot.PERIOD_WEEK, period_start(UserKpiSnapshot.PERIOD_YEAR, since))
+        assessments = assessments.filter(created_at__gte=_local_midnight(rebuild_from))
+        sales = sales.filter(sold_at__gte=rebuild_from)
+        snapshots = snapshots.filter(period_start__gte=rebuild_from)
+
+    keys = set()
+    for user_id, created_at in assessments.values_list('assigned_to_id', 'created_at').iterator():
+        day = timezone.localdate(created_at)
+        keys.update((user_id, pt, period_start(pt, day)) for pt in PERIOD_TYPES)
+    for user_id, sold_at in sales.values_list('contract__assigned_to_id', 'sold_at').iterator():
+        if user_id:
+            keys.update((user_id, pt, period_start(pt, sold_at)) for pt in PERIOD_TYPES)
+    if rebuild_from:
+        # 前年末の分から出る前年・12 月の期間は削除対象外のため作り直さない
+        keys = {key for key in keys if key[2] >= rebuild_from}
+
+    rows = []
+    for user_id, period_type, start in sorted(keys):
+        values = compute_user_period(user_id, period_type, start)
+        if any(values.values()):
+            rows.append(UserKpiSnapshot(user_id=user_id, period_type=period_type, period_start=start, **values))
+
+    with transaction.atomic():
+        snapshots.delete()
+        UserKpiSnapshot.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+# ---------------------------------------------------------------------------
+# 参照
+# ---------------------------------------------------------------------------
+
+def _empty_kpis() -> dict:
+    return {field: 0 for field in KPI_FIELDS}
+
+
+def get_user_period_snapshots(user_id: int, today: date = None) -> dict:
+    """担当者の当年・当月・当週の KPI を {期間種別: dict} で返す（1 クエリ）"""
+    starts = current_period_starts(today)
+    condition = Q()
+    for period_type, start in starts.items():
+        condition |= Q(period_type=period_type, period_start=start)
+
+    result = {period_type: _empty_kpis() for period_type in PERIOD_TYPES}
+    for row in UserKpiSnapshot.objects.filter(condition, user_id=user_id).values('period_type', *KPI_FIELDS):
+        result[row.pop('period_type')] = row
+    return result
+
+
+def get_store_month_snapshots(store_ids, today: date = None) -> dict:
+    """店舗ごとの当月 KPI（在籍中の所属社員の合計）を {store_id: dict} で返す（1 クエリ）"""
+    month_start = period_start(UserKpiSnapshot.PERIOD_MONTH, today or timezone.localdate())
+    rows = UserKpiSnapshot.objects.filter(
+        period_type=UserKpiSnapshot.PERIOD_MONTH,
+        period_start=month_start,
+        user__is_active=True,
+        user__profile__is_active_employee=True,
+        user__profile__store_id__in=store_ids,
+    ).values('user__profile__store_id').annotate(
+        **{f'total_{field}': Sum(field) for field in KPI_FIELDS}
+    )
+
+    result = {store_id: _empty_kpis() for store_id in store_ids}
+    for row in rows:
+        store_id = row.pop('user__profile__store_id')
+        result[store_id] = {field: int(row[f'total_{field}'] or 0) for field in KPI_FIELDS}
+    return result
@@ -0,0 +1,31 @@
+"""
+マスタデータ（オークション会場など）の参照用キャッシュ
+
+画面のプルダウンなどで毎リクエスト読んでいたマスタを caching.get_or_compute() でキャッシュする。
+マスタの保存・削除時に leads/signals.py からタグを無効化する。
+キャッシュした値は全リクエストで共有するため、読み取り専用として扱うこと。
+"""
+import logging
+
+from ..models import AuctionVenue
+from . import caching
+
+logger = logging.getLogger(__name__)
+
+TAG_AUCTION_VENUES = 'master:auction_venues'
+
+_TIMEOUT_SEC = 3600
+
+
+def auction_venues() -> list:
+    """オークション会場（名前順）"""
+    return caching.get_or_compute(
+        caching.make_key('master', 'auction_venues'),
+        lambda: list(AuctionVenue.objects.order_by('name')),
+        _TIMEOUT_SEC,
+        tags=(TAG_AUCTION_VENUES,),
+    )
+
+
+def invalidate_auction_venues() -> None:
+    caching.invalidate_tags(TAG_AUCTION_VENUES)
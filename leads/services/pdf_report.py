@@ -0,0 +1,235 @@
+"""
+表形式の帳票 PDF（車両一覧・在庫管理表・古物台帳）のレンダラー
+
+platypus の Table + セルごとの Paragraph はレイアウト計算が行数に対して重く、
+全行を保持してから組版するためメモリも行数に比例する。ここでは canvas に直接描画する。
+
+  - フォント登録はプロセスで 1 回だけ
+  - 列幅は固定（mm 指定）で、セル内の有効幅は最初に 1 回だけ計算する
+  - 1 行に収まるセルは文字列のまま描画し、はみ出すセルだけ文字単位（CJK）で折り返す
+  - 行は 1 ページ分ずつ描画して showPage() するため、行データを溜め込まない
+  - ヘッダー行は各ページの先頭に繰り返す
+"""
+import logging
+import threading
+import unicodedata
+from dataclasses import dataclass
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfgen import canvas
+
+logger = logging.getLogger(__name__)
+
+FONT_NAME = 'HeiseiKakuGo-W5'
+
+_HEAD_BG    = colors.HexColor('#343a40')
+_STRIPE_BG  = colors.HexColor('#f8f9fa')
+_GRID_COLOR = colors.HexColor('#dee2e6')
+_SUB_COLOR  = colors.HexColor('#6c757d')
+_GRID_WIDTH = 0.4
+
+_TITLE_SIZE    = 13
+_SUBTITLE_SIZE = 8
+
+_font_lock = threading.Lock()
+_font = None
+
+
+def get_font():
+    """帳票用 CID フォント（初回のみ登録する）"""
+    global _font
+    if _font is None:
+        with _font_lock:
+            if _font is None:
+                pdfmetrics.registerFont(UnicodeCIDFont(FONT_NAME))
+                _font = pdfmetrics.getFont(FONT_NAME)
+    return _font
+
+
+def normalize_text(value) -> str:
+    """NFD（分解済み）文字を NFC（合成済み）に正規化する（PDF で濁点が分離しないように）"""
+    return unicodedata.normalize('NFC', str(value)) if value else ''
+
+
+@dataclass(frozen=True)
+class Column:
+    label: str
+    width_mm: float
+
+
+@dataclass(frozen=True)
+class TableLayout:
+    """帳票ごとの余白・文字サイズ（単位: 余白は mm、それ以外は pt）"""
+    margin_x_mm: float
+    margin_y_mm: float
+    font_size: float
+    leading: float
+    head_font_size: float
+    head_leading: float
+    padding: float
+
+
+class _TextWrapper:
+    """文字幅を測ってセル幅で折り返す（文字幅は文字ごとにキャッシュする）"""
+
+    def __init__(self, font, font_size: float):
+        self._font = font
+        self._font_size = font_size
+        self._char_widths = {}
+
+    def _char_width(self, ch: str) -> float:
+        width = self._char_widths.get(ch)
+        if width is None:
+            width = self._char_widths[ch] = self._font.stringWidth(ch, self._font_size)
+        return width
+
+    def wrap(self, text: str, max_width: float) -> list[str]:
+        lines = []
+        for part in text.split('\n'):
+            if self._font.stringWidth(part, self._font_size) <= max_width:
+                lines.append(part)
+                continue
+            start, width = 0, 0.0
+            for idx, ch in enumerate(part):
+                ch_width = self._char_width(ch)
+                if width + ch_width > max_width and idx > start:
+                    lines.append(part[start:idx])
+                    start, width = idx, 0.0
+                width += ch_width
+            lines.append(part[start:])
+        return lines
+
+
+class _TableRenderer:
+    def __init__(self, out, title: str, subtitle: str, columns: list[Column], layout: TableLayout):
+        self._font = get_font()
+        self._layout = layout
+        self._title = title
+        self._subtitle = subtitle
+
+        self._page_width, self._page_height = landscape(A4)
+        self._left   = layout.margin_x_mm * mm
+        self._bottom = layout.margin_y_mm * mm
+        self._top    = self._page_height - layout.margin_y_mm * mm
+
+        self._widths = [col.width_mm * mm for col in columns]
+        # 表は印刷可能幅の中央に配置する（見出しは左余白に揃える）
+        table_left = self._left + max(0.0, (self._page_width - self._left * 2 - sum(self._widths)) / 2)
+        self._x = [table_left]
+        for width in self._widths:
+            self._x.append(self._x[-1] + width)
+        self._text_widths = [width - layout.padding * 2 for width in self._widths]
+
+        self._body_wrapper = _TextWrapper(self._font, layout.font_size)
+        self._head_wrapper = _TextWrapper(self._font, layout.head_font_size)
+        self._head_lines = [self._head_wrapper.wrap(normalize_text(col.label), w)
+                            for col, w in zip(columns, self._text_widths)]
+        self._head_height = self._row_height(self._head_lines, layout.head_leading)
+
+        self._canvas = canvas.Canvas(out, pagesize=(self._page_width, self._page_height))
+        self._canvas.setTitle(title)
+        self.pages = 0
+        self.rows = 0
+
+    def _row_height(self, cell_lines, leading: float) -> float:
+        return max(len(lines) for lines in cell_lines) * leading + self._layout.padding * 2
+
+    # --- ページ ---
+
+    def _start_page(self) -> float:
+        """ページを開始してヘッダー行を描き、表本体の描画開始位置（y）を返す"""
+        c = self._canvas
+        y = self._top
+        if self.pages == 0:
+            c.setFont(FONT_NAME, _TITLE_SIZE)
+            c.setFillColor(colors.black)
+            c.drawString(self._left, y - _TITLE_SIZE, self._title)
+            y -= _TITLE_SIZE + 6
+            if self._subtitle:
+                c.setFont(FONT_NAME, _SUBTITLE_SIZE)
+                c.setFillColor(_SUB_COLOR)
+                c.drawString(self._left, y - _SUBTITLE_SIZE, self._subtitle)
+                y -= _SUBTITLE_SIZE + 6
+            y -= 4 * mm
+        self.pages += 1
+        self._table_top = y
+
+        c.setFillColor(_HEAD_BG)
+        c.rect(self._x[0], y - self._head_height, self._x[-1] - self._x[0], self._head_height, stroke=0, fill=1)
+        c.setFillColor(colors.white)
+        self._draw_cells(self._head_lines, y, self._layout.head_font_size, self._layout.head_leading)
+        self._stripe = 0
+        return y - self._head_height
+
+    def _finish_page(self, y: float) -> None:
+        """罫線を引いてページを確定する"""
+        c = self._canvas
+        c.setStrokeColor(_GRID_COLOR)
+        c.setLineWidth(_GRID_WIDTH)
+        for x in self._x:
+            c.line(x, self._table_top, x, y)
+        for row_y in self._row_lines:
+            c.line(self._x[0], row_y, self._x[-1], row_y)
+        c.showPage()
+
+    def _draw_cells(self, cell_lines, top: float, font_size: float, leading: float) -> None:
+        c = self._canvas
+        c.setFont(FONT_NAME, font_size)
+        padding = self._layout.padding
+        for x, lines in zip(self._x, cell_lines):
+            baseline = top - padding - font_size
+            for line in lines:
+                if line:
+                    c.drawString(x + padding, baseline, line)
+                baseline -= leading
+
+    # --- 本体 ---
+
+    def render(self, rows) -> None:
+        layout = self._layout
+        max_lines = max(1, int((self._top - self._bottom - self._head_height - layout.padding * 2) // layout.leading))
+
+        y = self._start_page()
+        self._row_lines = [self._table_top, y]
+        rows_on_page = 0
+        for row in rows:
+            cell_lines = []
+            for value, text_width in zip(row, self._text_widths):
+                text = normalize_text(value)
+                if '\n' not in text and self._font.stringWidth(text, layout.font_size) <= text_width:
+                    cell_lines.append((text,))
+                else:
+                    cell_lines.append(self._body_wrapper.wrap(text, text_width)[:max_lines])
+            height = self._row_height(cell_lines, layout.leading)
+
+            if y - height < self._bottom and rows_on_page:
+                self._finish_page(y)
+                y = self._start_page()
+                self._row_lines = [self._table_top, y]
+                rows_on_page = 0
+
+            if self._stripe:
+                self._canvas.setFillColor(_STRIPE_BG)
+                self._canvas.rect(self._x[0], y - height, self._x[-1] - self._x[0], height, stroke=0, fill=1)
+            self._canvas.setFillColor(colors.black)
+            self._draw_cells(cell_lines, y, layout.font_size, layout.leading)
+
+            y -= height
+            self._row_lines.append(y)
+            self._stripe ^= 1
+            self.rows += 1
+            rows_on_page += 1
+
+        self._finish_page(y)
+        self._canvas.save()
+
+
+def render_table_pdf(out, title: str, subtitle: str, columns: list[Column], rows, layout: TableLayout) -> int:
+    """表形式の帳票 PDF（A4 横）を out に書き出す。rows は各列の値のリストを順に返すイテラブル。ページ数を返す"""
+    renderer = _TableRenderer(out, normalize_text(title), normalize_text(subtitle), columns, layout)
+    renderer.render(rows)
+    return renderer.pages
@@ -0,0 +1,259 @@
+"""
+一覧画面のフリーワード検索サービス。
+
+検索対象（査定申込・顧客・案件・車両）ごとに正規化済みテキストを SearchDocument に持ち、
+DB ごとの全文検索インデックスで対象 ID を絞り込む。
+
+  MySQL  : search_documents.body の FULLTEXT インデックス（WITH PARSER ngram）
+  SQLite : FTS5 仮想テーブル search_documents_fts（tokenize='trigram'、テスト用）
+  その他 : body の部分一致（インデックスなし）
+
+ngram / trigram は一定文字数未満の語を引けないため、短い語だけは body の部分一致で補う。
+正規化（全角半角・カタカナ→ひらがな・異体字・ハイフン除去）はドキュメントと検索語の両方に同じものを適用する。
+"""
+import logging
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+
+from ..models import (
+    Assessment, CarAssessmentRequest, Customer, SearchDocument, Vehicle, normalize_phone_digits,
+)
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'search_documents_fts'
+
+# 全文検索インデックスで引ける最短の語長（MySQL: ngram_token_size の既定値 2 / SQLite: trigram）
+_MIN_TERM_LENGTH = {'mysql': 2, 'sqlite': 3}
+
+
+# ---------------------------------------------------------------------------
+# 正規化
+# ---------------------------------------------------------------------------
+
+# 人名・地名で表記ゆれの多い異体字 → 常用字
+_KANJI_VARIANTS = str.maketrans({
+    '髙': '高', '﨑': '崎', '嵜': '崎', '邊': '辺', '邉': '辺',
+    '澤': '沢', '濱': '浜', '齋': '斎', '齊': '斉', '櫻': '桜',
+    '廣': '広', '國': '国', '德': '徳', '眞': '真', '惠': '恵',
+    '瀨': '瀬', '冨': '富', '籠': '篭',
+    'ヶ': 'ケ', 'ヵ': 'カ',
+})
+
+# 長音「ー」（U+30FC）は残し、ハイフン・ダッシュ類のみ除去する
+_DASHES_RE = re.compile('[-‐‑‒–—―−]')
+_SPACES_RE = re.compile(r'\s+')
+
+
+def _katakana_to_hiragana(text: str) -> str:
+    return ''.join(chr(ord(ch) - 0x60) if 'ァ' <= ch <= 'ヶ' else ch for ch in text)
+
+
+def normalize_search_text(value) -> str:
+    """検索用に文字列を正規化する（空白は保持する）"""
+    text = unicodedata.normalize('NFKC', str(value or ''))
+    text = text.translate(_KANJI_VARIANTS).lower()
+    text = _katakana_to_hiragana(text)
+    return _DASHES_RE.sub('', text)
+
+
+def _field_token(value) -> str:
+    """1 項目を 1 トークンにする（氏名の姓名間スペース等は詰める）"""
+    return _SPACES_RE.sub('', normalize_search_text(value))
+
+
+def _phone_tokens(value) -> list[str]:
+    digits = normalize_phone_digits(value)
+    if not digits:
+        return []
+    # 下4桁は電話口で最も使われる照合キー
+    return [digits, digits[-4:]] if len(digits) > 4 else [digits]
+
+
+def _join_tokens(*parts) -> str:
+    tokens = []
+    for part in parts:
+        if isinstance(part, list):
+            tokens.extend(part)
+        else:
+            token = _field_token(part)
+            if token:
+                tokens.append(token)
+    return ' '.join(tokens)
+
+
+# ---------------------------------------------------------------------------
+# ドキュメント生成
+# ---------------------------------------------------------------------------
+
+def _assessment_request_body(req: CarAssessmentRequest) -> str:
+    return _join_tokens(
+        req.application_number,
+        req.external_service_id,
+        req.customer_name,
+        _phone_tokens(req.phone_number),
+        req.email,
+        req.postal_code,
+        req.address,
+        req.maker,
+        req.car_model,
+    )
+
+
+def _customer_body(customer: Customer) -> str:
+    return _join_tokens(
+        customer.name,
+        customer.furigana,
+        _phone_tokens(customer.phone_number),
+        customer.email,
+        customer.postal_code,
+        customer.address,
+    )
+
+
+def _vehicle_body(vehicle: Vehicle) -> str:
+    return _join_tokens(
+        vehicle.maker,
+        vehicle.car_model,
+        vehicle.grade,
+        vehicle.color,
+        vehicle.chassis_number,
+        vehicle.registration_number,
+    )
+
+
+def _case_body(assessment: Assessment) -> str:
+    customer = assessment.customer
+    vehicle  = assessment.vehicle
+    return _join_tokens(
+        assessment.case_number,
+        customer.name,
+        customer.furigana,
+        _phone_tokens(customer.phone_number),
+        vehicle.maker,
+        vehicle.car_model,
+        vehicle.chassis_number,
+    )
+
+
+_BODY_BUILDERS = {
+    SearchDocument.TARGET_ASSESSMENT_REQUEST: (CarAssessmentRequest, _assessment_request_body),
+    SearchDocument.TARGET_CUSTOMER:           (Customer, _customer_body),
+    SearchDocument.TARGET_CASE:               (Assessment, _case_body),
+    SearchDocument.TARGET_VEHICLE:            (Vehicle, _vehicle_body),
+}
+
+# 保存時に再インデックスが必要な項目（update_fields がこれと重ならなければスキップする）
+INDEXED_FIELDS = {
+    SearchDocument.TARGET_ASSESSMENT_REQUEST: {
+        'application_number', 'external_service_id', 'customer_name', 'phone_number',
+        'email', 'postal_code', 'address', 'maker', 'car_model',
+    },
+    SearchDocument.TARGET_CUSTOMER: {
+        'name', 'furigana', 'phone_number', 'email', 'postal_code', 'address',
+    },
+    SearchDocument.TARGET_CASE: {'case_number', 'customer', 'customer_id', 'vehicle', 'vehicle_id'},
+    SearchDocument.TARGET_VEHICLE: {
+        'maker', 'car_model', 'grade', 'color', 'chassis_number', 'registration_number',
+    },
+}
+
+
+def build_search_body(target_type: str, obj) -> str:
+    _, builder = _BODY_BUILDERS[target_type]
+    return builder(obj)
+
+
+def index_object(target_type: str, obj) -> None:
+    """1 件分の検索ドキュメントを作成・更新する"""
+    SearchDocument.objects.update_or_create(
+        target_type=target_type,
+        target_id=obj.pk,
+        defaults={'body': build_search_body(target_type, obj)},
+    )
+
+
+def index_new_objects(target_type: str, objs) -> None:
+    """bulk_create で登録した（検索ドキュメントが未作成の）オブジェクトをまとめて登録する"""
+    _, builder = _BODY_BUILDERS[target_type]
+    SearchDocument.objects.bulk_create(
+        [SearchDocument(target_type=target_type, target_id=obj.pk, body=builder(obj)) for obj in objs]
+    )
+
+
+def remove_object(target_type: str, pk) -> None:
+    SearchDocument.objects.filter(target_type=target_type, target_id=pk).delete()
+
+
+def rebuild_index(target_type: str, chunk_size: int = 2000) -> int:
+    """対象種別の検索ドキュメントを全件作り直す。作成件数を返す"""
+    model, builder = _BODY_BUILDERS[target_type]
+    queryset = model.objects.order_by('pk')
+    if target_type == SearchDocument.TARGET_CASE:
+        queryset = queryset.select_related('customer', 'vehicle')
+
+    SearchDocument.objects.filter(target_type=target_type).delete()
+
+    created = 0
+    batch = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        batch.append(SearchDocument(target_type=target_type, target_id=obj.pk, body=builder(obj)))
+        if len(batch) >= chunk_size:
+            SearchDocument.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    if batch:
+        SearchDocument.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+# ---------------------------------------------------------------------------
+# 検索
+# ---------------------------------------------------------------------------
+
+def split_query_terms(query: str) -> list[str]:
+    return [term for term in _SPACES_RE.split(normalize_search_text(query)) if term]
+
+
+def _fulltext_condition(vendor: str, terms: list[str]):
+    if vendor == 'mysql':
+        # 各語をフレーズ指定（+"..."）にし、ngram 列が連続一致する行だけを AND で引く
+        boolean_query = ' '.join('+"{}"'.format(term.replace('"', '')) for term in terms)
+        return RawSQL(
+            'MATCH (body) AGAINST (%s IN BOOLEAN MODE)',
+            [boolean_query],
+            output_field=BooleanField(),
+        )
+    if vendor == 'sqlite':
+        match_query = ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        return RawSQL(
+            f'id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+            [match_query],
+            output_field=BooleanField(),
+        )
+    return None
+
+
+def search_target_ids(target_type: str, query: str):
+    """フリーワードに全語一致する対象の ID を返す（pk__in= にそのまま渡せるクエリセット）"""
+    terms = split_query_terms(query)
+    docs = SearchDocument.objects.filter(target_type=target_type)
+
+    vendor = connection.vendor
+    min_length = _MIN_TERM_LENGTH.get(vendor)
+    indexed_terms = [t for t in terms if min_length and len(t) >= min_length]
+    short_terms   = [t for t in terms if t not in indexed_terms]
+
+    if indexed_terms:
+        condition = _fulltext_condition(vendor, indexed_terms)
+        if condition is not None:
+            docs = docs.filter(condition)
+    for term in short_terms:
+        docs = docs.filter(body__contains=term)
+
+    return docs.values('target_id')
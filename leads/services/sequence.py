@@ -0,0 +1,74 @@
+"""
+連番（NumberSequence）の払い出し
+
+申込番号・社内管理番号などの連番を、sequence_type × key の 1 行に対する
+1 本の UPDATE（last_seq = last_seq + n）で払い出す。
+
+  - MySQL : UPDATE ... SET last_seq = LAST_INSERT_ID(last_seq + n) → SELECT LAST_INSERT_ID()
+            （接続ごとの値なので、autocommit なら行ロックは UPDATE 1 文の間だけ）
+  - その他 : 同じ UPDATE の後に同一トランザクション内で読み直す
+
+get_or_create + select_for_update の 2 段階より往復が少なく、allocate(n) で n 件をまとめて確保できる。
+プロセスごとに番号をまとめて先取りする方式（hi/lo）は再起動で欠番が出るため採らない。
+呼び出し側のトランザクション内で呼ぶと、行ロックはそのトランザクションの終了まで続く代わりに
+ロールバック時は確保も取り消される（欠番が出ない）。番号を使うレコードの登録と同じトランザクションで呼ぶこと。
+"""
+import logging
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from ..models import NumberSequence
+
+logger = logging.getLogger(__name__)
+
+
+def _quoted_names():
+    qn = connection.ops.quote_name
+    return qn(NumberSequence._meta.db_table), qn('last_seq'), qn('sequence_type'), qn('key')
+
+
+def _increment(sequence_type: str, key: str, count: int) -> int | None:
+    """last_seq を count 進めて新しい値を返す。行がなければ None"""
+    if connection.vendor == 'mysql':
+        table, last_seq, type_col, key_col = _quoted_names()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET {last_seq} = LAST_INSERT_ID({last_seq} + %s) '
+                f'WHERE {type_col} = %s AND {key_col} = %s',
+                [count, sequence_type, key],
+            )
+            if cursor.rowcount == 0:
+                return None
+            cursor.execute('SELECT LAST_INSERT_ID()')
+            return cursor.fetchone()[0]
+
+    rows = NumberSequence.objects.filter(sequence_type=sequence_type, key=key)
+    with transaction.atomic():
+        if not rows.update(last_seq=F('last_seq') + count):
+            return None
+        return rows.values_list('last_seq', flat=True).get()
+
+
+def _create_row(sequence_type: str, key: str) -> None:
+    try:
+        with transaction.atomic():
+            NumberSequence.objects.get_or_create(sequence_type=sequence_type, key=key, defaults={'last_seq': 0})
+    except IntegrityError:
+        pass  # 同時に別の処理が作成した
+
+
+def allocate(sequence_type: str, key: str, count: int = 1) -> range:
+    """sequence_type × key の連番を count 件確保し、確保した番号の range を返す（欠番・重複なし）"""
+    if count < 1:
+        raise ValueError('count must be >= 1')
+    last = _increment(sequence_type, key, count)
+    if last is None:
+        _create_row(sequence_type, key)
+        last = _increment(sequence_type, key, count)
+    return range(last - count + 1, last + 1)
+
+
+def next_value(sequence_type: str, key: str) -> int:
+    """連番を 1 件確保する"""
+    return allocate(sequence_type, key, 1)[0]
@@ -0,0 +1,123 @@
+"""
+ユーザー名簿（担当者・承認者のプルダウン用）のプロセス内キャッシュ
+
+案件詳細・売掛管理・売却情報・店舗別実績などで毎リクエスト組み立てていたユーザー一覧を、
+プロセスごとに 1 回だけ読み込んで使い回す。
+
+  参照       : get_directory() → UserDirectory（氏名順のユーザー一覧・承認者・店舗別）
+  無効化     : User / UserProfile / Store の保存・削除時に bump_version()（leads/signals.py）
+  バージョン : caching の名前空間 'user_directory' の世代番号（make_key / bump_namespace）。
+               共有キャッシュ（redis 等）なら別プロセス・別サーバーでの更新も次の参照で検知できる。
+               世代はコミット後に進むので、ロールバックされた更新では無効化されない。
+               locmem などワーカー間で共有しないキャッシュでは他プロセスの更新を検知できないため、
+               読み込みから _MAX_AGE_SEC 経った名簿は読み直す。
+
+QuerySet.update() / bulk_create() はシグナルが発火しないため、それらでユーザー・プロフィールを
+書き換えた場合は bump_version() を呼ぶこと。
+キャッシュしたユーザーは全リクエストで共有するため、読み取り専用として扱うこと。
+"""
+import logging
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+
+from accounts.models import UserProfile
+from . import caching
+
+logger = logging.getLogger(__name__)
+
+_NAMESPACE = 'user_directory'
+
+# 世代番号で検知できない更新（共有しないキャッシュでの他プロセスの更新）を反映するまでの最大時間
+_MAX_AGE_SEC = 300
+
+_APPROVER_ROLES = (UserProfile.ROLE_SUB_LEADER, UserProfile.ROLE_MANAGER, UserProfile.ROLE_SUPERUSER)
+
+
+def ja_full_name_parts(last_name, first_name, username) -> str:
+    """姓名順のフルネーム（日本語表示用）を各項目から組み立てる。未設定時は username にフォールバック"""
+    full = f'{(last_name or "").strip()} {(first_name or "").strip()}'.strip()
+    return full or (username or '')
+
+
+def _profile(user):
+    return getattr(user, 'profile', None)
+
+
+class UserDirectory:
+    """ある時点のユーザー名簿（すべて姓・名順）
+
+    users           : 全ユーザー（退職者・無効ユーザーを含む）
+    active_users    : 有効ユーザー
+    approvers       : 有効ユーザーのうち承認権限者（次席以上・スーパーユーザー）
+    active_by_store : 店舗 ID → 有効ユーザー
+    """
+
+    def __init__(self, version: str, users):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.users = tuple(users)
+        self.by_id = {u.pk: u for u in self.users}
+        self.active_users = tuple(u for u in self.users if u.is_active)
+        self.approvers = tuple(
+            u for u in self.active_users
+            if u.is_superuser or (_profile(u) and _profile(u).role in _APPROVER_ROLES)
+        )
+        by_store = {}
+        for user in self.active_users:
+            profile = _profile(user)
+            if profile and profile.store_id:
+                by_store.setdefault(profile.store_id, []).append(user)
+        self.active_by_store = {store_id: tuple(members) for store_id, members in by_store.items()}
+
+    def store_users(self, store_id) -> tuple:
+        """店舗に所属する有効ユーザー"""
+        return self.active_by_store.get(store_id, ())
+
+    def pick(self, user_ids, *, active_only=False, store_id=None) -> list:
+        """user_ids に含まれるユーザーを氏名順で返す（store_id 指定時はその店舗の所属者のみ）"""
+        wanted = set(user_ids)
+        return [
+            u for u in self.users
+            if u.pk in wanted
+            and (not active_only or u.is_active)
+            and (store_id is None or (_profile(u) and _profile(u).store_id == store_id))
+        ]
+
+
+_lock = threading.Lock()
+_directory: UserDirectory | None = None
+
+
+def _load(version: str) -> UserDirectory:
+    User = get_user_model()
+    users = User.objects.select_related('profile__store').order_by('last_name', 'first_name', 'pk')
+    return UserDirectory(version, users)
+
+
+def _is_current(directory: UserDirectory | None, version: str) -> bool:
+    return (
+        directory is not None
+        and directory.version == version
+        and time.monotonic() - directory.loaded_at < _MAX_AGE_SEC
+    )
+
+
+def get_directory() -> UserDirectory:
+    """現在のユーザー名簿。バージョンが変わっていれば読み直す"""
+    global _directory
+    version = caching.make_key(_NAMESPACE)
+    directory = _directory
+    if _is_current(directory, version):
+        return directory
+    with _lock:
+        if not _is_current(_directory, version):
+            _directory = _load(version)
+            logger.debug(f'[user_directory] 読み込み: version={version} users={len(_directory.users)}')
+        return _directory
+
+
+def bump_version() -> None:
+    """名簿のバージョンを進め、全プロセスのキャッシュを無効にする（トランザクション内ならコミット後）"""
+    caching.bump_namespace(_NAMESPACE)
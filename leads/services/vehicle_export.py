@@ -0,0 +1,381 @@
+"""
+車両一覧・在庫管理表・古物台帳の出力（検索クエリ・PDF 生成）
+
+CSV / PDF ビューと PDF 出力ジョブ（services/export_jobs.py）の両方から使う。
+リクエストに依存しないよう、ユーザーの閲覧範囲は access_scope() の文字列で受け渡す。
+
+  all        : 全件（本部・全権限）
+  user:<id>  : 本人担当分のみ（一般社員）
+  store:<id> : 所属店舗メンバー担当分のみ（次席・マネージャー）
+"""
+import hashlib
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db.models import (
+    CharField, Count, DateField, DecimalField, F, IntegerField, Max, Q, Subquery, OuterRef,
+)
+
+from accounts.models import UserProfile
+from ..models import Assessment, AuctionVenue, ExportJob, PurchaseContract, SalesProcess, SearchDocument, Vehicle
+from .pdf_report import Column, TableLayout, normalize_text, render_table_pdf
+from .search import search_target_ids
+from .user_directory import ja_full_name_parts
+
+logger = logging.getLogger(__name__)
+
+# 検索条件のキー（views.vehicle._parse_search_params の戻り値の順）
+SEARCH_PARAM_KEYS = ('maker', 'car_model', 'chassis_number', 'customer_name', 'date_from', 'date_to')
+
+# CSV / PDF 出力で DB から 1 回に読み込む行数
+QUERY_CHUNK_SIZE = 2000
+
+SCOPE_ALL = 'all'
+
+
+def _unpack_params(params: dict) -> tuple:
+    return tuple(params.get(key, '') for key in SEARCH_PARAM_KEYS)
+
+
+# ---------------------------------------------------------------------------
+# 閲覧範囲
+# ---------------------------------------------------------------------------
+
+def access_scope(user) -> str:
+    """ユーザーの出力対象範囲を文字列で返す（出力ジョブのキャッシュキーにも使う）"""
+    profile = getattr(user, 'profile', None)
+    if not profile or profile.has_global_access:
+        return SCOPE_ALL
+    if profile.role == profile.ROLE_GENERAL:
+        return f'user:{user.pk}'
+    return f'store:{profile.store_id or 0}'
+
+
+def _scope_user_ids(scope: str):
+    """閲覧範囲に含まれる担当者 ID（全件なら None）"""
+    kind, _, value = scope.partition(':')
+    if kind == 'user':
+        return [int(value)]
+    if kind == 'store':
+        store_id = int(value or 0)
+        if not store_id:
+            return []
+        return UserProfile.objects.filter(store_id=store_id).values_list('user_id', flat=True)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# 検索クエリ
+# ---------------------------------------------------------------------------
+
+def build_vehicle_queryset(scope: str, maker, car_model, chassis_number, customer_name, date_from, date_to):
+    """
+    Vehicle を主軸に、成約済み案件の顧客名・契約日・買取金額をアノテーション。
+    手動登録車両（案件なし）も含む。
+    """
+    contracted_assessment_sq = (
+        Assessment.objects
+        .filter(vehicle_id=OuterRef('pk'), status=Assessment.STATUS_CONTRACTED)
+        .order_by('-created_at')
+    )
+
+    qs = Vehicle.objects.annotate(
+        assessment_pk=Subquery(
+            contracted_assessment_sq.values('pk')[:1],
+            output_field=IntegerField(),
+        ),
+        ann_customer_name=Subquery(
+            contracted_assessment_sq.values('customer__name')[:1],
+            output_field=CharField(max_length=200),
+        ),
+        ann_assigned_last=Subquery(
+            contracted_assessment_sq.values('assigned_to__last_name')[:1],
+            output_field=CharField(max_length=50),
+        ),
+        ann_assigned_first=Subquery(
+            contracted_assessment_sq.values('assigned_to__first_name')[:1],
+            output_field=CharField(max_length=50),
+        ),
+        ann_contract_date=Subquery(
+            PurchaseContract.objects
+            .filter(assessment__vehicle_id=OuterRef('pk'))
+            .values('contract_date')[:1],
+            output_field=DateField(),
+        ),
+        ann_purchase_price=Subquery(
+            PurchaseContract.objects
+            .filter(assessment__vehicle_id=OuterRef('pk'))
+            .values('purchase_price_incl_tax')[:1],
+            output_field=DecimalField(max_digits=12, decimal_places=0),
+        ),
+    )
+
+    # ロールによるアクセス制御（案件連携車両のみ絞り込み。手動登録は全員閲覧可）
+    user_ids = _scope_user_ids(scope)
+    if user_ids is not None:
+        qs = qs.filter(
+            Q(assessment_pk__isnull=True)  # 手動登録
+            | Q(assessments__assigned_to__in=user_ids, assessments__status=Assessment.STATUS_CONTRACTED)
+        ).distinct()
+
+    vehicle_text = ' '.join(value for value in (maker, car_model, chassis_number) if value)
+    if vehicle_text:
+        qs = qs.filter(pk__in=search_target_ids(SearchDocument.TARGET_VEHICLE, vehicle_text))
+    if customer_name:
+        qs = qs.filter(ann_customer_name__icontains=customer_name)
+
+    # 日付フィルタ：案件連携は契約日、手動登録は登録日で絞る
+    if date_from:
+        qs = qs.filter(
+            Q(ann_contract_date__gte=date_from)
+            | Q(ann_contract_date__isnull=True, created_at__date__gte=date_from)
+        )
+    if date_to:
+        qs = qs.filter(
+            Q(ann_contract_date__lte=date_to)
+            | Q(ann_contract_date__isnull=True, created_at__date__lte=date_to)
+        )
+
+    return qs.order_by(
+        F('ann_contract_date').desc(nulls_last=True),
+        '-created_at',
+    )
+
+
+def build_contract_queryset(scope: str, maker, car_model, chassis_number, customer_name, date_from, date_to):
+    """承認済み契約を主軸に在庫管理表・古物台帳向けのクエリを構築する。"""
+    qs = PurchaseContract.objects.select_related(
+        'vehicle',
+        'customer',
+        'assigned_to__profile__store',
+        'sales_process',
+        'sales_process__sold_destination',
+    ).filter(
+        approved_by__isnull=False,
+    ).order_by('-contract_date')
+
+    user_ids = _scope_user_ids(scope)
+    if user_ids is not None:
+        qs = qs.filter(assigned_to__in=user_ids)
+
+    vehicle_text = ' '.join(value for value in (maker, car_model, chassis_number) if value)
+    if vehicle_text:
+        qs = qs.filter(vehicle_id__in=search_target_ids(SearchDocument.TARGET_VEHICLE, vehicle_text))
+    if customer_name:
+        qs = qs.filter(customer__name__icontains=customer_name)
+    if date_from:
+        qs = qs.filter(contract_date__gte=date_from)
+    if date_to:
+        qs = qs.filter(contract_date__lte=date_to)
+
+    return qs
+
+
+def iter_values_in_chunks(queryset, fields, chunk_size=QUERY_CHUNK_SIZE):
+    """queryset の並び順のまま、fields の値タプルを chunk_size 行ずつ DB から読み込んで返す
+
+    MySQL（mysqlclient）の .iterator() はサーバーサイドカーソルを使わず結果全件を
+    クライアントに読み込むため、先に主キーだけを取得し、主キーで区切って取り直す。
+    """
+    pks = list(queryset.values_list('pk', flat=True))
+    for i in range(0, len(pks), chunk_size):
+        chunk = pks[i:i + chunk_size]
+        rows = {
+            row[0]: row[1:]
+            for row in queryset.filter(pk__in=chunk).order_by().values_list('pk', *fields)
+        }
+        for pk in chunk:
+            if pk in rows:  # 途中で削除された行は飛ばす
+                yield rows[pk]
+
+
+def tristate_label(value):
+    if value is True:
+        return 'あり'
+    if value is False:
+        return 'なし'
+    return ''
+
+
+def _label_rows(queryset) -> list:
+    """PDF に表示する名称（担当者名・店舗名・売却先名）の一覧。更新日時を持たないため値そのもので版を判定する"""
+    return list(queryset.order_by('pk'))
+
+
+def data_version(export_type: str, scope: str, params: dict) -> str:
+    """出力対象データの版（件数・最終更新日時・表示する名称のハッシュ）。内容が変わると値が変わる"""
+    User = get_user_model()
+    if export_type == ExportJob.TYPE_VEHICLE_LIST:
+        qs = build_vehicle_queryset(scope, **params)
+        totals = qs.aggregate(
+            rows=Count('pk', distinct=True),
+            vehicle=Max('updated_at'),
+            assessment=Max('assessments__updated_at'),
+            contract=Max('assessments__contract__updated_at'),
+            customer=Max('assessments__customer__updated_at'),
+        )
+        totals['users'] = _label_rows(
+            User.objects
+            .filter(assessments__pk__in=qs.order_by().values('assessment_pk'))
+            .distinct()
+            .values_list('pk', 'last_name', 'first_name')
+        )
+    else:
+        qs = build_contract_queryset(scope, **params)
+        totals = qs.aggregate(
+            rows=Count('pk'),
+            contract=Max('updated_at'),
+            vehicle=Max('vehicle__updated_at'),
+            customer=Max('customer__updated_at'),
+            sales_process=Max('sales_process__updated_at'),
+        )
+        totals['users'] = _label_rows(
+            User.objects
+            .filter(pk__in=qs.order_by().values('assigned_to'))
+            .values_list('pk', 'last_name', 'first_name', 'username', 'profile__store__name')
+        )
+        totals['sold_destinations'] = _label_rows(
+            AuctionVenue.objects
+            .filter(pk__in=qs.order_by().values('sales_process__sold_destination'))
+            .values_list('pk', 'name')
+        )
+    payload = '|'.join(f'{key}={totals[key]}' for key in sorted(totals))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# PDF
+# ---------------------------------------------------------------------------
+
+def _filter_summary(params: dict) -> str:
+    """PDF の見出し下に表示する検索条件"""
+    maker, car_model, _, customer_name, date_from, date_to = _unpack_params(params)
+    parts = []
+    if date_from or date_to:
+        parts.append(f'期間: {date_from} ～ {date_to}')
+    if maker:         parts.append(f'メーカー: {maker}')
+    if car_model:     parts.append(f'車種: {car_model}')
+    if customer_name: parts.append(f'顧客名: {customer_name}')
+    return '  '.join(parts)
+
+
+def _yen(value) -> str:
+    return f'¥{int(value):,}' if value else ''
+
+
+# 列幅は A4 横の印刷可能幅（297mm - 左右余白）に収まるよう設定
+_VEHICLE_LIST_COLUMNS = [
+    Column('区分', 16), Column('メーカー', 26), Column('車種', 30), Column('年式', 14),
+    Column('走行距離', 20), Column('カラー', 24), Column('車体番号', 32), Column('顧客名', 28),
+    Column('担当者', 16), Column('成約日', 20), Column('買取金額\n（税込）', 28),
+]  # 合計: 254mm ≤ 277mm
+_VEHICLE_LIST_LAYOUT = TableLayout(
+    margin_x_mm=10, margin_y_mm=14, font_size=7.5, leading=10, head_font_size=8, head_leading=10, padding=4,
+)
+
+_INVENTORY_COLUMNS = [
+    Column('車名', 52), Column('車体番号', 38), Column('買取金額（税込）', 34), Column('契約日', 22),
+    Column('区分', 18), Column('店舗名', 40), Column('担当営業', 34),
+]  # 合計: 238mm ≤ 277mm
+_INVENTORY_LAYOUT = TableLayout(
+    margin_x_mm=10, margin_y_mm=14, font_size=8, leading=11, head_font_size=8.5, head_leading=11, padding=4,
+)
+
+_LEDGER_COLUMNS = [
+    Column('車種名', 24), Column('契約日', 16), Column('車体番号', 28), Column('車両\nナンバー', 18),
+    Column('買取金額\n（税込）', 20), Column('顧客名', 20), Column('住所', 32), Column('免許証番号', 20),
+    Column('T\nナンバー', 12), Column('職業', 16), Column('生年月日', 16),
+    Column('売却日', 16), Column('売却金額', 20), Column('売却先', 19),
+]  # 合計: 277mm ≤ 281mm
+_LEDGER_LAYOUT = TableLayout(
+    margin_x_mm=8, margin_y_mm=12, font_size=6.5, leading=9, head_font_size=7, head_leading=9, padding=3,
+)
+
+
+def render_vehicle_list_pdf(out, scope: str, params: dict) -> int:
+    """車両一覧 PDF を out（バイナリのファイルオブジェクト）に書き出す。ページ数を返す"""
+    queryset = build_vehicle_queryset(scope, **params)
+    fields = (
+        'assessment_pk', 'maker', 'car_model', 'year', 'mileage', 'color', 'chassis_number',
+        'ann_customer_name', 'ann_assigned_last', 'ann_assigned_first',
+        'ann_contract_date', 'ann_purchase_price',
+    )
+
+    def rows():
+        for (assessment_pk, maker, car_model, year, mileage, color, chassis_number,
+             customer_name, assigned_last, assigned_first,
+             contract_date, purchase_price) in iter_values_in_chunks(queryset, fields):
+            yield [
+                '案件連携' if assessment_pk else '手動登録',
+                maker, car_model, year, mileage, color, chassis_number,
+                customer_name,
+                f'{assigned_last or ""}{assigned_first or ""}'.strip(),
+                contract_date or '',
+                _yen(purchase_price),
+            ]
+
+    return render_table_pdf(out, '車両一覧', _filter_summary(params), _VEHICLE_LIST_COLUMNS, rows(), _VEHICLE_LIST_LAYOUT)
+
+
+def render_inventory_table_pdf(out, scope: str, params: dict) -> int:
+    """在庫管理表 PDF を out（バイナリのファイルオブジェクト）に書き出す。ページ数を返す"""
+    queryset = build_contract_queryset(scope, **params)
+    fields = (
+        'vehicle__maker', 'vehicle__car_model', 'vehicle__chassis_number',
+        'purchase_price_incl_tax', 'contract_date',
+        'sales_process__vehicle_disposition',
+        'assigned_to__profile__store__name',
+        'assigned_to_id', 'assigned_to__last_name', 'assigned_to__first_name', 'assigned_to__username',
+    )
+    disposition_labels = dict(SalesProcess.DISPOSITION_CHOICES)
+
+    def rows():
+        for (maker, car_model, chassis_number, purchase_price, contract_date, disposition,
+             store_name, assigned_to_id, assigned_last, assigned_first,
+             assigned_username) in iter_values_in_chunks(queryset, fields):
+            yield [
+                f'{normalize_text(maker)} {normalize_text(car_model)}'.strip(),
+                chassis_number,
+                _yen(purchase_price),
+                contract_date or '',
+                disposition_labels.get(disposition, disposition) if disposition else '',
+                store_name,
+                ja_full_name_parts(assigned_last, assigned_first, assigned_username) if assigned_to_id else '',
+            ]
+
+    return render_table_pdf(out, '在庫管理表', _filter_summary(params), _INVENTORY_COLUMNS, rows(), _INVENTORY_LAYOUT)
+
+
+def render_ledger_pdf(out, scope: str, params: dict) -> int:
+    """古物台帳 PDF を out（バイナリのファイルオブジェクト）に書き出す。ページ数を返す"""
+    queryset = build_contract_queryset(scope, **params)
+    fields = (
+        'vehicle__maker', 'vehicle__car_model', 'contract_date',
+        'vehicle__chassis_number', 'vehicle__registration_number', 'purchase_price_incl_tax',
+        'customer__name', 'customer__address', 'customer__license_number',
+        'qualified_invoice_registered', 'customer__occupation', 'customer__birth_date',
+        'sales_process__sold_at', 'sales_process__sold_price', 'sales_process__sold_destination__name',
+    )
+
+    def rows():
+        for (maker, car_model, contract_date, chassis_number, registration_number, purchase_price,
+             customer_name, address, license_number, qualified_invoice_registered, occupation, birth_date,
+             sold_at, sold_price, sold_destination_name) in iter_values_in_chunks(queryset, fields):
+            yield [
+                f'{normalize_text(maker)} {normalize_text(car_model)}'.strip(),
+                contract_date or '',
+                chassis_number,
+                registration_number,
+                _yen(purchase_price),
+                customer_name,
+                address,
+                license_number,
+                tristate_label(qualified_invoice_registered),
+                occupation,
+                birth_date or '',
+                sold_at or '',
+                _yen(sold_price),
+                sold_destination_name,
+            ]
+
+    return render_table_pdf(out, '古物台帳', _filter_summary(params), _LEDGER_COLUMNS, rows(), _LEDGER_LAYOUT)
@@ -0,0 +1,245 @@
+"""
+leads/signals.py — モデル保存時の付随処理
+
+- 検索ドキュメント（SearchDocument）を元データの保存・削除に追従させる
+- KPI スナップショット（UserKpiSnapshot）の該当期間を再集計する
+- ユーザー名簿キャッシュ（services/user_directory）をユーザー・プロフィール・店舗の更新で無効にする
+- マスタデータのキャッシュ（services/master_data）をマスタの更新で無効にする
+
+QuerySet.update() / bulk_create() はシグナルが発火しないため、
+それらで対象項目を書き換えた場合は rebuild_search_index / rebuild_kpi_snapshots で作り直すこと。
+"""
+import logging
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Store, UserProfile
+
+from .models import (
+    Assessment,
+    AuctionVenue,
+    CarAssessmentRequest,
+    Customer,
+    PurchaseContract,
+    SalesProcess,
+    SearchDocument,
+    Vehicle,
+)
+from .services import kpi_snapshot, master_data, search, user_directory
+
+logger = logging.getLogger(__name__)
+
+
+def _needs_reindex(target_type, update_fields) -> bool:
+    return update_fields is None or bool(search.INDEXED_FIELDS[target_type] & set(update_fields))
+
+
+@receiver(post_save, sender=CarAssessmentRequest)
+def index_assessment_request(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _needs_reindex(SearchDocument.TARGET_ASSESSMENT_REQUEST, update_fields):
+        return
+    search.index_object(SearchDocument.TARGET_ASSESSMENT_REQUEST, instance)
+
+
+@receiver(post_save, sender=Customer)
+def index_customer(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _needs_reindex(SearchDocument.TARGET_CUSTOMER, update_fields):
+        return
+    search.index_object(SearchDocument.TARGET_CUSTOMER, instance)
+    # 案件ドキュメントは顧客名・電話番号を含むため追従させる
+    for assessment in instance.assessments.select_related('customer', 'vehicle'):
+        search.index_object(SearchDocument.TARGET_CASE, assessment)
+
+
+@receiver(post_save, sender=Vehicle)
+def index_vehicle(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _needs_reindex(SearchDocument.TARGET_VEHICLE, update_fields):
+        return
+    search.index_object(SearchDocument.TARGET_VEHICLE, instance)
+    # 案件ドキュメントはメーカー・車種・車台番号を含むため追従させる
+    for assessment in instance.assessments.select_related('customer', 'vehicle'):
+        search.index_object(SearchDocument.TARGET_CASE, assessment)
+
+
+@receiver(post_save, sender=Assessment)
+def index_case(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _needs_reindex(SearchDocument.TARGET_CASE, update_fields):
+        return
+    search.index_object(SearchDocument.TARGET_CASE, instance)
+
+
+@receiver(post_delete, sender=CarAssessmentRequest)
+def unindex_assessment_request(sender, instance, **kwargs):
+    search.remove_object(SearchDocument.TARGET_ASSESSMENT_REQUEST, instance.pk)
+
+
+@receiver(post_delete, sender=Customer)
+def unindex_customer(sender, instance, **kwargs):
+    search.remove_object(SearchDocument.TARGET_CUSTOMER, instance.pk)
+
+
+@receiver(post_delete, sender=Vehicle)
+def unindex_vehicle(sender, instance, **kwargs):
+    search.remove_object(SearchDocument.TARGET_VEHICLE, instance.pk)
+
+
+@receiver(post_delete, sender=Assessment)
+def unindex_case(sender, instance, **kwargs):
+    search.remove_object(SearchDocument.TARGET_CASE, instance.pk)
+
+
+# ---------------------------------------------------------------------------
+# KPI スナップショット
+# ---------------------------------------------------------------------------
+
+# 集計値に影響する項目（update_fields がこれと重ならなければ再集計しない）
+_ASSESSMENT_KPI_FIELDS = {'status', 'assigned_to', 'assigned_to_id', 'created_at'}
+_CONTRACT_KPI_FIELDS = {
+    'assigned_to', 'assigned_to_id',
+    'purchase_price_excl_tax', 'corrected_price', 'amount_correction_flag',
+}
+_SALES_PROCESS_KPI_FIELDS = {
+    'sale_done', 'sold_at', 'sold_price', 'sold_destination', 'sold_destination_id',
+    'transport_fee_personal', 'transport_fee_auction', 'other_fee',
+}
+_AUCTION_VENUE_KPI_FIELDS = {'entry_fee', 'contract_fee'}
+
+
+def _affects_kpi(fields, update_fields) -> bool:
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+def _remember_previous(instance, update_fields, fields, *values):
+    """担当者・日付が変わる場合に備え、保存前の値を instance._kpi_previous に控える"""
+    instance._kpi_previous = None
+    if instance.pk and _affects_kpi(fields, update_fields):
+        instance._kpi_previous = (
+            type(instance).objects.filter(pk=instance.pk).values_list(*values).first()
+        )
+
+
+@receiver(pre_save, sender=Assessment)
+def remember_assessment_kpi_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        _remember_previous(instance, update_fields, _ASSESSMENT_KPI_FIELDS, 'assigned_to_id', 'created_at')
+
+
+@receiver(post_save, sender=Assessment)
+def refresh_assessment_kpis(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _affects_kpi(_ASSESSMENT_KPI_FIELDS, update_fields):
+        return
+    kpi_snapshot.mark_dirty(instance.assigned_to_id, instance.created_at)
+    previous = getattr(instance, '_kpi_previous', None)
+    if previous and previous != (instance.assigned_to_id, instance.created_at):
+        kpi_snapshot.mark_dirty(*previous)
+
+
+@receiver(post_delete, sender=Assessment)
+def refresh_deleted_assessment_kpis(sender, instance, **kwargs):
+    kpi_snapshot.mark_dirty(instance.assigned_to_id, instance.created_at)
+
+
+@receiver(pre_save, sender=PurchaseContract)
+def remember_contract_kpi_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        _remember_previous(instance, update_fields, _CONTRACT_KPI_FIELDS, 'assigned_to_id')
+
+
+@receiver(post_save, sender=PurchaseContract)
+def refresh_contract_kpis(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    # 契約は買取価格（経常利益の原価）と担当者を通じて、売却済み SalesProcess の集計に影響する
+    if raw or created or not _affects_kpi(_CONTRACT_KPI_FIELDS, update_fields):
+        return
+    sold_at = SalesProcess.objects.filter(contract=instance).values_list('sold_at', flat=True).first()
+    if sold_at is None:
+        return
+    kpi_snapshot.mark_dirty(instance.assigned_to_id, sold_at)
+    previous = getattr(instance, '_kpi_previous', None)
+    if previous and previous[0] != instance.assigned_to_id:
+        kpi_snapshot.mark_dirty(previous[0], sold_at)
+
+
+@receiver(pre_save, sender=SalesProcess)
+def remember_sales_process_kpi_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        _remember_previous(instance, update_fields, _SALES_PROCESS_KPI_FIELDS, 'sold_at')
+
+
+@receiver(post_save, sender=SalesProcess)
+def refresh_sales_process_kpis(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _affects_kpi(_SALES_PROCESS_KPI_FIELDS, update_fields):
+        return
+    kpi_snapshot.mark_sales_process_dirty(instance)
+    previous = getattr(instance, '_kpi_previous', None)
+    if previous and previous[0] and previous[0] != instance.sold_at:
+        kpi_snapshot.mark_dirty(instance.contract.assigned_to_id, previous[0])
+
+
+@receiver(post_delete, sender=SalesProcess)
+def refresh_deleted_sales_process_kpis(sender, instance, **kwargs):
+    # 振込完了時はレコードごと削除されるため、削除後の値で再集計する
+    if instance.sold_at is None:
+        return
+    assigned_to_id = (
+        PurchaseContract.objects.filter(pk=instance.contract_id).values_list('assigned_to_id', flat=True).first()
+    )
+    kpi_snapshot.mark_dirty(assigned_to_id, instance.sold_at)
+
+
+@receiver(pre_save, sender=AuctionVenue)
+def remember_auction_venue_fees(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        _remember_previous(instance, update_fields, _AUCTION_VENUE_KPI_FIELDS, 'entry_fee', 'contract_fee')
+
+
+@receiver(post_save, sender=AuctionVenue)
+def refresh_auction_venue_kpis(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    # 出品・成約費用は、その会場で売却した SalesProcess の経常利益に影響する
+    if raw or created:
+        return
+    previous = getattr(instance, '_kpi_previous', None)
+    if previous and previous != (instance.entry_fee, instance.contract_fee):
+        kpi_snapshot.mark_auction_venue_dirty(instance.pk)
+
+
+@receiver(pre_delete, sender=AuctionVenue)
+def refresh_deleted_auction_venue_kpis(sender, instance, **kwargs):
+    # 削除時は売却先が NULL になり費用が 0 になる。参照が外れる前に対象を控える
+    kpi_snapshot.mark_auction_venue_dirty(instance.pk)
+
+
+# ---------------------------------------------------------------------------
+# ユーザー名簿
+# ---------------------------------------------------------------------------
+
+# ログインのたびに保存される項目（名簿の表示に影響しない）
+_USER_DIRECTORY_IGNORED_FIELDS = {'last_login'}
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_save, sender=Store)
+def invalidate_user_directory(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and set(update_fields) <= _USER_DIRECTORY_IGNORED_FIELDS):
+        return
+    user_directory.bump_version()
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_delete, sender=Store)
+def invalidate_user_directory_on_delete(sender, instance, **kwargs):
+    user_directory.bump_version()
+
+
+# ---------------------------------------------------------------------------
+# マスタデータ
+# ---------------------------------------------------------------------------
+
+@receiver(post_save, sender=AuctionVenue)
+@receiver(post_delete, sender=AuctionVenue)
+def invalidate_auction_venues(sender, instance, raw=False, **kwargs):
+    if not raw:
+        master_data.invalidate_auction_venues()
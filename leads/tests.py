@@ -1,3 +1,516 @@
-from django.test import TestCase
+import importlib
+import io
+import re
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from http.server import ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Store, UserProfile
+
+from .management.commands.run_fake_assessment_system import _FakeAssessmentSystem, _handler
+from .models import (
+    AdvancePayment,
+    Assessment,
+    AssessmentImportJob,
+    AssessmentCheckItem,
+    AuctionVenue,
+    CarAssessmentRequest,
+    ContactHistory,
+    Customer,
+    CustomerBankAccount,
+    ExportJob,
+    NumberSequence,
+    OtherFeeItem,
+    PurchaseContract,
+    SalesProcess,
+    UserKpiSnapshot,
+    Vehicle,
+)
+from .services import assessment_import_jobs, export_jobs, kpi_snapshot, sequence, vehicle_export
+from .views.utils import _filter_by_phone
+
+
+class LeadsFixtureMixin:
+    """担当者・案件を作るテスト用ヘルパー"""
+
+    _STATUSES = [
+        Assessment.STATUS_IN_PROGRESS,
+        Assessment.STATUS_CONTRACTED,
+        Assessment.STATUS_LOST,
+        Assessment.STATUS_MANAGED,
+        Assessment.STATUS_PRE_CANCEL,
+    ]
+
+    @classmethod
+    def create_staff(cls, store, count):
+        users = []
+        for _ in range(count):
+            number = User.objects.count() + 1
+            user = User.objects.create_user(f'staff{number}', password='pw', last_name='担当', first_name=str(number))
+            UserProfile.objects.create(user=user, store=store, employee_number=f'E{number:04d}')
+            users.append(user)
+        return users
+
+    @classmethod
+    def create_assessment(cls, user, status, *, contracted_price=None):
+        number = CarAssessmentRequest.objects.count() + 1
+        request = CarAssessmentRequest.objects.create(
+            application_number=f'T{number:06d}',
+            application_datetime=timezone.now(),
+            customer_name=f'顧客{number}',
+            phone_number=f'0900000{number:04d}',
+        )
+        customer = Customer.objects.create(name=f'顧客{number}', phone_number=f'0900000{number:04d}')
+        vehicle = Vehicle.objects.create(maker='トヨタ', car_model='プリウス')
+        assessment = Assessment.objects.create(
+            assessment_request=request,
+            customer=customer,
+            vehicle=vehicle,
+            assigned_to=user,
+            assessment_datetime=timezone.now(),
+            status=status,
+        )
+        if contracted_price is not None:
+            PurchaseContract.objects.create(
+                assessment=assessment,
+                customer=customer,
+                vehicle=vehicle,
+                assigned_to=user,
+                contract_date=timezone.localdate(),
+                purchase_price_excl_tax=Decimal(contracted_price),
+                tax_amount=0,
+                purchase_price_incl_tax=Decimal(contracted_price),
+            )
+        return assessment
+
+    @classmethod
+    def create_cases_for(cls, users, per_user=5):
+        for user in users:
+            for i in range(per_user):
+                status = cls._STATUSES[i % len(cls._STATUSES)]
+                price = 1000000 + i if status == Assessment.STATUS_CONTRACTED else None
+                cls.create_assessment(user, status, contracted_price=price)
+
+
+class StorePerformanceQueryTests(LeadsFixtureMixin, TestCase):
+    """店舗別実績のクエリ数が担当者数・案件数に比例しないこと"""
+
+    # セッション・ユーザー・店舗・個人別集計・名簿・件数・勤怠表示・ナビ（プロフィール・店舗）・案件一覧
+    QUERY_COUNT = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store, _ = Store.objects.get_or_create(code=Store.TSUKUBA, defaults={'name': 'つくば店'})
+        Store.objects.get_or_create(code=Store.CC, defaults={'name': 'CC'})
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.create_cases_for(cls.create_staff(cls.store, 3))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.url = reverse('leads:store_performance', args=[Store.TSUKUBA])
+
+    def test_query_count_is_constant(self):
+        with self.assertNumQueries(self.QUERY_COUNT):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['per_person']), 3)
+        self.assertEqual(response.context['total_all'], 15)
+        self.assertEqual(response.context['contracted_all'], 3)
+
+        # 担当者・案件が増えてもクエリ数は変わらない
+        self.create_cases_for(self.create_staff(self.store, 5))
+        cache.clear()
+        with self.assertNumQueries(self.QUERY_COUNT):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.context['per_person']), 8)
+        self.assertEqual(response.context['total_all'], 40)
+        self.assertEqual(response.context['purchase_all'], 8 * 1000001)
+
+
+class CaseDetailQueryTests(LeadsFixtureMixin, TestCase):
+    """案件詳細のクエリ数が全タブで一定で、明細の件数に比例しないこと"""
+
+    TABS = (
+        'assessment', 'customer', 'contract', 'documents', 'history',
+        'intake', 'repair', 'transport', 'listing', 'payment', 'sale', 'transfer',
+    )
+
+    # セッション・ユーザー + 案件の集約 1・prefetch 9・ログインユーザーのプロフィール・勤怠表示
+    # （テストのキャッシュは locmem なので勤怠表示は毎回 DB から読む。
+    #   check_case_detail_queries の locmem での上限 12 にセッション・ユーザーの 2 を足した数）
+    QUERY_COUNT = 14
+
+    @classmethod
+    def setUpTestData(cls):
+        store, _ = Store.objects.get_or_create(code=Store.TSUKUBA, defaults={'name': 'つくば店'})
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.staff, = cls.create_staff(store, 1)
+        cls.assessment = cls.create_assessment(cls.staff, Assessment.STATUS_CONTRACTED, contracted_price=1000000)
+        SalesProcess.objects.create(contract=cls.assessment.contract)
+        cls.add_details(1)
+
+    @classmethod
+    def add_details(cls, count):
+        """案件詳細の各タブに出る明細を count 件ずつ追加する"""
+        assessment = cls.assessment
+        contract = assessment.contract
+        for i in range(count):
+            ContactHistory.objects.create(
+                assessment_request=assessment.assessment_request,
+                customer=assessment.customer,
+                recorded_by=cls.staff,
+                contacted_at=timezone.now(),
+                contact_method=ContactHistory.METHOD_CHOICES[0][0],
+                content='架電',
+            )
+            AssessmentCheckItem.objects.create(assessment=assessment, check_type='scratch', description='傷')
+            CustomerBankAccount.objects.create(
+                customer=assessment.customer,
+                bank_name='銀行',
+                branch_name='支店',
+                account_type=CustomerBankAccount.ACCOUNT_TYPE_CHOICES[0][0],
+                account_number=f'{i:07d}',
+                account_holder='名義',
+            )
+            AdvancePayment.objects.create(contract=contract, expected_amount=Decimal(10000), approved_by=cls.admin)
+            OtherFeeItem.objects.create(
+                sales_process=contract.sales_process,
+                amount=Decimal(1000),
+                created_by=cls.staff,
+                category=OtherFeeItem.CATEGORY_CHOICES[0][0],
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.url = reverse('leads:case_detail', args=[self.assessment.pk])
+        # ユーザー名簿・マスタ・勤怠表示のキャッシュを温めてから計測する
+        self.client.get(self.url)
+
+    def assert_constant_queries(self):
+        for tab in self.TABS:
+            with self.subTest(tab=tab), self.assertNumQueries(self.QUERY_COUNT):
+                response = self.client.get(self.url, {'tab': tab})
+                self.assertEqual(response.status_code, 200)
+
+    def test_query_count_is_constant_across_tabs(self):
+        self.assert_constant_queries()
+
+    def test_query_count_does_not_grow_with_details(self):
+        self.add_details(5)
+        self.assert_constant_queries()
+
+
+class KpiSnapshotRebuildTests(LeadsFixtureMixin, TestCase):
+    """KPI スナップショットの作り直し（rebuild_all と 0047 のデータ移行）"""
+
+    @classmethod
+    def setUpTestData(cls):
+        store, _ = Store.objects.get_or_create(code=Store.TSUKUBA, defaults={'name': 'つくば店'})
+        cls.staff, = cls.create_staff(store, 1)
+        cls.create_cases_for([cls.staff])
+        # 2026 年の年初を含む週（2025-12-29 月曜始まり）の前年末分だけの商談
+        cls.year_end = cls.create_assessment(cls.staff, Assessment.STATUS_LOST)
+        Assessment.objects.filter(pk=cls.year_end.pk).update(
+            created_at=timezone.make_aware(datetime(2025, 12, 30, 12)),
+        )
+
+    def snapshot_rows(self):
+        return set(UserKpiSnapshot.objects.values_list('user_id', 'period_type', 'period_start', *kpi_snapshot.KPI_FIELDS))
+
+    def test_rebuild_since_keeps_week_straddling_new_year(self):
+        kpi_snapshot.rebuild_all()
+        before = self.snapshot_rows()
+
+        kpi_snapshot.rebuild_all(since=date(2026, 3, 1))
+
+        self.assertEqual(self.snapshot_rows(), before)
+        self.assertTrue(UserKpiSnapshot.objects.filter(
+            user=self.staff, period_type=UserKpiSnapshot.PERIOD_WEEK, period_start=date(2025, 12, 29),
+        ).exists())
+
+    def test_data_migration_matches_rebuild_all(self):
+        contracted = Assessment.objects.filter(assigned_to=self.staff, status=Assessment.STATUS_CONTRACTED).first()
+        SalesProcess.objects.create(
+            contract=contracted.contract, sale_done=True, sold_price=Decimal(1500000), sold_at=timezone.localdate(),
+        )
+        kpi_snapshot.rebuild_all()
+        expected = self.snapshot_rows()
+
+        migration = importlib.import_module('leads.migrations.0047_populate_user_kpi_snapshots')
+        migration.populate_snapshots(apps, None)
+
+        self.assertEqual(self.snapshot_rows(), expected)
+
+
+class ExportDataVersionTests(LeadsFixtureMixin, TestCase):
+    """PDF 出力の版は、PDF に表示する名称（担当者・店舗・売却先・顧客）の変更でも変わること"""
+
+    PARAMS = dict.fromkeys(vehicle_export.SEARCH_PARAM_KEYS, '')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.store, _ = Store.objects.get_or_create(code=Store.TSUKUBA, defaults={'name': 'つくば店'})
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.staff, = cls.create_staff(cls.store, 1)
+        cls.assessment = cls.create_assessment(cls.staff, Assessment.STATUS_CONTRACTED, contracted_price=1000000)
+        contract = cls.assessment.contract
+        contract.approved_by = cls.admin
+        contract.save()
+        cls.venue = AuctionVenue.objects.create(name='USS東京')
+        SalesProcess.objects.create(contract=contract, sold_destination=cls.venue)
+
+    def versions(self):
+        return {
+            export_type: vehicle_export.data_version(export_type, vehicle_export.SCOPE_ALL, self.PARAMS)
+            for export_type, _ in ExportJob.EXPORT_TYPE_CHOICES
+        }
+
+    def assert_changes(self, export_types, update):
+        before = self.versions()
+        update()
+        after = self.versions()
+        self.assertEqual({t for t in before if before[t] != after[t]}, set(export_types))
+
+    def test_assigned_user_name(self):
+        self.assert_changes(
+            [ExportJob.TYPE_VEHICLE_LIST, ExportJob.TYPE_INVENTORY, ExportJob.TYPE_LEDGER],
+            lambda: User.objects.filter(pk=self.staff.pk).update(last_name='改名'),
+        )
+
+    def test_store_name(self):
+        self.assert_changes(
+            [ExportJob.TYPE_INVENTORY, ExportJob.TYPE_LEDGER],
+            lambda: Store.objects.filter(pk=self.store.pk).update(name='つくば本店'),
+        )
+
+    def test_sold_destination_name(self):
+        self.assert_changes(
+            [ExportJob.TYPE_INVENTORY, ExportJob.TYPE_LEDGER],
+            lambda: AuctionVenue.objects.filter(pk=self.venue.pk).update(name='USS名古屋'),
+        )
+
+    def test_customer_name_on_vehicle_list(self):
+        def rename():
+            customer = self.assessment.customer
+            customer.name = '改名'
+            customer.save()
+        self.assert_changes(
+            [ExportJob.TYPE_VEHICLE_LIST, ExportJob.TYPE_INVENTORY, ExportJob.TYPE_LEDGER], rename,
+        )
+
+
+class VehicleExportPdfTests(LeadsFixtureMixin, TestCase):
+    """車両一覧・在庫管理表・古物台帳の PDF が複数ページで生成されること"""
+
+    CONTRACTS = 120
+    PARAMS = dict.fromkeys(vehicle_export.SEARCH_PARAM_KEYS, '')
+
+    @classmethod
+    def setUpTestData(cls):
+        store, _ = Store.objects.get_or_create(code=Store.TSUKUBA, defaults={'name': 'つくば店'})
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        staff, = cls.create_staff(store, 1)
+        venue = AuctionVenue.objects.create(name='USS東京')
+        for i in range(cls.CONTRACTS):
+            contract = cls.create_assessment(staff, Assessment.STATUS_CONTRACTED, contracted_price=1000000 + i).contract
+            contract.approved_by = admin
+            contract.save()
+            SalesProcess.objects.create(
+                contract=contract, sale_done=True, sold_price=Decimal(1200000), sold_at=timezone.localdate(),
+                sold_destination=venue,
+            )
+
+    def render(self, export_type):
+        render, _ = export_jobs.RENDERERS[export_type]
+        out = io.BytesIO()
+        pages = render(out, vehicle_export.SCOPE_ALL, self.PARAMS)
+        return pages, out.getvalue()
+
+    def test_renders_every_row_across_pages(self):
+        for export_type, _ in ExportJob.EXPORT_TYPE_CHOICES:
+            with self.subTest(export_type=export_type):
+                pages, pdf = self.render(export_type)
+                self.assertTrue(pdf.startswith(b'%PDF-'))
+                self.assertTrue(pdf.rstrip().endswith(b'%%EOF'))
+                self.assertGreater(pages, 1)
+                self.assertEqual(len(re.findall(rb'/Type /Page\b', pdf)), pages)
+
+    def test_chunks_keep_queryset_order(self):
+        queryset = vehicle_export.build_contract_queryset(vehicle_export.SCOPE_ALL, **self.PARAMS).order_by('-pk')
+        chunked = list(vehicle_export.iter_values_in_chunks(queryset, ('purchase_price_incl_tax',), chunk_size=7))
+        self.assertEqual(chunked, list(queryset.values_list('purchase_price_incl_tax')))
+        self.assertEqual(len(chunked), self.CONTRACTS)
+
+
+class SequenceAllocateConcurrencyTests(TransactionTestCase):
+    """連番を複数スレッド（それぞれ別の DB 接続）から同時に払い出しても重複・欠番がないこと"""
+
+    WORKERS = 8
+    ITERATIONS = 25
+    MAX_BLOCK = 4
+
+    def test_concurrent_allocations_are_contiguous_and_unique(self):
+        results = [[] for _ in range(self.WORKERS)]
+        errors = []
+        start_barrier = threading.Barrier(self.WORKERS)
+
+        def allocate(count):
+            while True:
+                try:
+                    return sequence.allocate('test', 'concurrency', count)
+                except OperationalError as exc:
+                    # SQLite のテスト DB（共有キャッシュのメモリ DB）はロックを待たずにエラーを返すため取り直す。
+                    # 失敗した払い出しはロールバックされるので、番号の検証には影響しない
+                    if connection.vendor != 'sqlite' or 'locked' not in str(exc):
+                        raise
+
+        def worker(index):
+            try:
+                start_barrier.wait()
+                for i in range(self.ITERATIONS):
+                    results[index].extend(allocate(1 + (index + i) % self.MAX_BLOCK))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        issued = sorted(number for numbers in results for number in numbers)
+        self.assertEqual(issued, list(range(1, len(issued) + 1)))
+        self.assertEqual(NumberSequence.objects.get(sequence_type='test', key='concurrency').last_seq, len(issued))
+        # 各スレッドに払い出された番号は呼び出しごとに連続している
+        for numbers in results:
+            self.assertEqual(len(numbers), len(set(numbers)))
+
+
+class PhoneSearchTests(TestCase):
+    """電話番号検索は電話番号だけを照合すること（住所・郵便番号の数字に一致しない）"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.match = Customer.objects.create(name='一致', phone_number='090-1111-1234')
+        cls.other = Customer.objects.create(
+            name='住所だけ一致', phone_number='080-2222-5678', postal_code='123-4567', address='つくば市1-2-34',
+        )
+
+    def search(self, raw):
+        return set(_filter_by_phone(Customer.objects.all(), raw))
+
+    def test_last_four_digits(self):
+        self.assertEqual(self.search('1234'), {self.match})
+
+    def test_prefix(self):
+        self.assertEqual(self.search('090-1111'), {self.match})
+        self.assertEqual(self.search('080'), {self.other})
+
+
+class AssessmentImportJobTests(LeadsFixtureMixin, TestCase):
+    """査定システム取り込みジョブ（代替の査定システムをスレッドで起動して実行する）"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.fake = _FakeAssessmentSystem(delay=0, session_ttl=0, missing={'0000000000'})
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _handler(cls.fake))
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+        settings_override = override_settings(
+            ASSESSMENT_SYSTEM_BASE_URL=f'http://127.0.0.1:{cls.server.server_port}',
+            ASSESSMENT_SYSTEM_USER='tester',
+        )
+        settings_override.enable()
+        cls.addClassCleanup(settings_override.disable)
+
+    @classmethod
+    def setUpTestData(cls):
+        store, _ = Store.objects.get_or_create(code=Store.TSUKUBA, defaults={'name': 'つくば店'})
+        cls.staff, = cls.create_staff(store, 1)
+        cls.assessment = cls.create_assessment(cls.staff, Assessment.STATUS_IN_PROGRESS)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_worker_imports_vehicle(self):
+        job = assessment_import_jobs.enqueue(self.assessment, '1234567890', self.staff)
+        self.assertEqual(assessment_import_jobs.enqueue(self.assessment, '1234567890', self.staff), job)
+
+        call_command('run_assessment_import_worker', '--once', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AssessmentImportJob.STATUS_DONE)
+        self.assertEqual(job.result['vehicle']['maker'], '日産')
+        self.assertEqual(job.result['vehicle']['chassis_number'], 'FAKE-4567890')
+        vehicle = Vehicle.objects.get(pk=self.assessment.vehicle_id)
+        self.assertEqual((vehicle.maker, vehicle.car_model), ('日産', 'ノート'))
+        self.assessment.refresh_from_db()
+        self.assertEqual(self.assessment.assessment_system_id, '1234567890')
+        self.assertIsNotNone(self.assessment.assessment_system_imported_at)
+        # 取得が終わったらログアウトしている
+        self.assertEqual(self.fake.sessions, {})
+        self.assertIsNone(assessment_import_jobs.claim_next_job())
+
+    def test_missing_record_fails_job(self):
+        job = assessment_import_jobs.enqueue(self.assessment, '0000000000', self.staff)
+        assessment_import_jobs.run_job(assessment_import_jobs.claim_next_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AssessmentImportJob.STATUS_FAILED)
+        self.assertIn('見つかりませんでした', job.error_message)
+
+    def test_save_error_fails_job(self):
+        job = assessment_import_jobs.enqueue(self.assessment, '1234567890', self.staff)
+        with mock.patch.object(assessment_import_jobs, 'apply_import', side_effect=RuntimeError('boom')):
+            assessment_import_jobs.run_job(assessment_import_jobs.claim_next_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AssessmentImportJob.STATUS_FAILED)
+        self.assertIn('boom', job.error_message)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_timed_out_job_is_not_overwritten(self):
+        job = assessment_import_jobs.enqueue(self.assessment, '1234567890', self.staff)
+        claimed = assessment_import_jobs.claim_next_job()
+        AssessmentImportJob.objects.filter(pk=job.pk).update(
+            created_at=timezone.now() - assessment_import_jobs.JOB_TIMEOUT - timedelta(seconds=1),
+        )
+        self.assertEqual(assessment_import_jobs.get_job(job.pk).status, AssessmentImportJob.STATUS_FAILED)
+
+        assessment_import_jobs.run_job(claimed)
+
+        # 画面には失敗と返したため、完了にも車両情報の保存にもならない
+        job.refresh_from_db()
+        self.assertEqual(job.status, AssessmentImportJob.STATUS_FAILED)
+        self.assertEqual(job.result, {})
+        self.assertEqual(Vehicle.objects.get(pk=self.assessment.vehicle_id).maker, 'トヨタ')
+
+    def test_status_api_returns_server_timeout(self):
+        job = assessment_import_jobs.enqueue(self.assessment, '1234567890', self.staff)
+        self.client.force_login(self.staff)
+
+        response = self.client.get(reverse('leads:assessment_import_job_status', args=[self.assessment.pk, job.pk]))
+
+        # 画面はこの秒数を待つ上限にする（サーバーが失敗にするより先に諦めない）
+        payload = response.json()
+        self.assertEqual(payload['status'], AssessmentImportJob.STATUS_QUEUED)
+        self.assertEqual(payload['timeout_sec'], assessment_import_jobs.JOB_TIMEOUT.total_seconds())
@@ -25,6 +25,8 @@ urlpatterns = [
     path('api/assessments/<int:request_id>/detail/',            views.get_assessment_detail,            name='get_assessment_detail'),
     path('api/latest-id/',                                      views.get_latest_assessment_id,         name='get_latest_assessment_id'),
     path('api/check-new/',                                      views.check_new_assessments,            name='check_new_assessments'),
+    path('api/check-new/stream/',                               views.stream_new_assessments,           name='stream_new_assessments'),
+    path('api/check-new/wait/',                                 views.wait_new_assessments,             name='wait_new_assessments'),
     path('api/assessments/<int:request_id>/claim/',             views.claim_assessment_owner,           name='claim_assessment_owner'),
     path('api/assessments/<int:request_id>/call/',              views.increment_assessment_call_count,  name='increment_assessment_call_count'),
     path('api/assessments/<int:request_id>/update/',            views.update_assessment_follow_status,  name='update_assessment_follow_status'),
@@ -36,6 +38,7 @@ urlpatterns = [
     path('api/cases/<int:assessment_id>/change-appointment-getter/', views.change_appointment_getter,   name='change_appointment_getter'),
     path('api/cases/<int:assessment_id>/update-vehicle/',                views.update_vehicle_info,               name='update_vehicle_info'),
     path('api/cases/<int:assessment_id>/import-assessment-system/',  views.import_from_assessment_system,     name='import_from_assessment_system'),
+    path('api/cases/<int:assessment_id>/import-assessment-system/<int:job_id>/', views.assessment_import_job_status, name='assessment_import_job_status'),
     path('api/cases/<int:assessment_id>/save-assessment-system-id/', views.save_assessment_system_id,         name='save_assessment_system_id'),
     path('api/cases/<int:assessment_id>/update-customer/',     views.update_customer_info,              name='update_customer_info'),
     path('api/cases/<int:assessment_id>/save-bank-account/',   views.save_bank_account,                 name='save_bank_account'),
@@ -85,6 +88,9 @@ urlpatterns = [
     path('vehicles/export/inventory/pdf/',     views.inventory_table_pdf,  name='inventory_table_pdf'),
     path('vehicles/export/ledger/csv/',        views.ledger_csv,           name='ledger_csv'),
     path('vehicles/export/ledger/pdf/',        views.ledger_pdf,           name='ledger_pdf'),
+    path('api/export-jobs/',                   views.create_export_job,    name='create_export_job'),
+    path('api/export-jobs/<int:job_id>/',      views.export_job_status,    name='export_job_status'),
+    path('vehicles/export/jobs/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
     path('api/vehicles/create/',               views.vehicle_create,       name='vehicle_create'),
 
     # ── 顧客一覧 ─────────────────────────────────────────────
@@ -93,7 +99,9 @@ urlpatterns = [
     path('api/customers/<int:pk>/update/',                      views.update_customer_direct,     name='update_customer_direct'),
     path('api/customers/<int:pk>/save-bank-account/',           views.save_bank_account_direct,   name='save_bank_account_direct'),
     path('api/customers/<int:pk>/bank-accounts/<int:account_id>/delete/', views.delete_bank_account_direct, name='delete_bank_account_direct'),
+    path('api/phone-lookup/',                                   views.lookup_by_phone,            name='lookup_by_phone'),
 
     # ── スクレイパー内部 API（スクレイパープロセス専用・外部公開不可） ──
     path('internal/scraper/navikuru/', views.scraper_ingest_navikuru, name='scraper_ingest_navikuru'),
+    path('internal/scraper/navikuru/batch/', views.scraper_ingest_navikuru_batch, name='scraper_ingest_navikuru_batch'),
 ]
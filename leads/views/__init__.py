@@ -20,6 +20,8 @@ from .assessment import (
     get_assessments,
     check_new_assessments,
     get_latest_assessment_id,
+    stream_new_assessments,
+    wait_new_assessments,
     get_assessment_detail,
     claim_assessment_owner,
     increment_assessment_call_count,
@@ -36,6 +38,7 @@ from .case import (
     change_appointment_getter,
     update_vehicle_info,
     import_from_assessment_system,
+    assessment_import_job_status,
     save_assessment_system_id,
     update_customer_info,
     save_bank_account,
@@ -89,6 +92,7 @@ from .customer import (
     update_customer_direct,
     save_bank_account_direct,
     delete_bank_account_direct,
+    lookup_by_phone,
 )
 
 # --- 車両一覧 ---
@@ -100,24 +104,29 @@ from .vehicle import (
     inventory_table_pdf,
     ledger_csv,
     ledger_pdf,
+    create_export_job,
+    export_job_status,
+    export_job_download,
     vehicle_create,
 )
 
 # --- スクレイパー内部 API ---
 from .scraper_api import (
     scraper_ingest_navikuru,
+    scraper_ingest_navikuru_batch,
 )
 
 __all__ = [
     # assessment
     'assessment_list', 'assessment_detail', 'assessment_create', 'assessment_edit',
     'get_assessments', 'check_new_assessments', 'get_latest_assessment_id',
+    'stream_new_assessments', 'wait_new_assessments',
     'get_assessment_detail', 'claim_assessment_owner', 'increment_assessment_call_count',
     'update_assessment_follow_status', 'promote_to_case',
     # case
     'case_list', 'case_detail',
     'update_assessment_info', 'update_vehicle_info', 'import_from_assessment_system',
-    'save_assessment_system_id', 'update_customer_info',
+    'assessment_import_job_status', 'save_assessment_system_id', 'update_customer_info',
     'save_bank_account', 'delete_bank_account',
     'request_assessment_approval', 'approve_assessment',
     'cancel_contracted_assessment', 'change_appointment_getter', 'managed_release_list',
@@ -136,10 +145,13 @@ __all__ = [
     # customer
     'customer_list', 'customer_detail',
     'update_customer_direct', 'save_bank_account_direct', 'delete_bank_account_direct',
+    'lookup_by_phone',
     # vehicle
     'vehicle_list', 'vehicle_list_csv', 'vehicle_list_pdf',
     'inventory_table_csv', 'inventory_table_pdf', 'ledger_csv', 'ledger_pdf',
+    'create_export_job', 'export_job_status', 'export_job_download',
     'vehicle_create',
     # scraper api
     'scraper_ingest_navikuru',
+    'scraper_ingest_navikuru_batch',
 ]
@@ -6,23 +6,31 @@ views/assessment.py — 査定申込フェーズ（アポイント）
 
 API:
   get_assessments, check_new_assessments, get_latest_assessment_id,
+  stream_new_assessments, wait_new_assessments,
   get_assessment_detail, claim_assessment_owner,
   increment_assessment_call_count, update_assessment_follow_status,
   promote_to_case
 """
+import base64
+import binascii
 import json
 import logging
+import time
 from datetime import datetime
 
+from asgiref.sync import sync_to_async
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import F, Max, Q, Subquery, OuterRef, CharField, IntegerField
-from django.http import JsonResponse
+from django.db.models import F, Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
-from django.views.decorators.http import require_POST
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
 
 from accounts.models import Store
 from ..models import (
@@ -31,11 +39,22 @@ from ..models import (
     ContactHistory,
     Customer,
     PurchaseContract,
+    SearchDocument,
     Vehicle,
 )
+from ..services.assessment_feed import (
+    MAX_RECORDS,
+    fetch_new_records,
+    latest_assessment_id,
+    publish_new_assessment,
+    wait_for_new,
+)
+from ..services.search import search_target_ids
 from .utils import (
     _current_user_display_name,
+    _filter_by_phone,
     _generate_application_number,
+    _is_phone_query,
     generate_case_number,
 )
 
@@ -218,15 +237,19 @@ def assessment_create(request):
             sales_note=request.POST.get('sales_note', ''),
             follow_status=CarAssessmentRequest.STATUS_UNTOUCHED,
         )
+        publish_new_assessment(req)
         messages.success(request, f'査定申込を登録しました（{application_number}）')
         return redirect('leads:assessment_detail', pk=req.pk)
 
     customer_search = request.GET.get('customer_search', '').strip()
     found_customers = []
     if customer_search:
-        found_customers = Customer.objects.filter(
-            Q(name__icontains=customer_search) | Q(phone_number__icontains=customer_search)
-        )[:10]
+        if _is_phone_query(customer_search):
+            found_customers = _filter_by_phone(Customer.objects.all(), customer_search)[:10]
+        else:
+            found_customers = Customer.objects.filter(
+                pk__in=search_target_ids(SearchDocument.TARGET_CUSTOMER, customer_search)
+            )[:10]
 
     current_year = timezone.localdate(timezone.now()).year
     year_choices = [f'{y}年' for y in range(current_year + 1, 1969, -1)]
@@ -308,9 +331,129 @@ def assessment_edit(request, pk):
 # API
 # ---------------------------------------------------------------------------
 
+_ASSESSMENT_LIST_FIELDS = (
+    'id', 'application_number', 'external_service_id', 'application_datetime',
+    'desired_sale_timing', 'maker', 'car_model', 'year', 'mileage',
+    'customer_name', 'phone_number', 'call_count', 'postal_code',
+    'case_status', 'case_id', 'address', 'email', 'sales_owner_name',
+    'sales_assigned_at', 'follow_status', 'sales_note',
+    'reservation_datetime', 'status_updated_at', 'status_updated_by', 'created_at',
+)
+
+
+def _serialize_assessment_row(row):
+    """get_assessments の values() 行を JS 側で扱いやすい dict に変換する"""
+    def _fmt(dt, pattern):
+        return timezone.localtime(dt).strftime(pattern) if dt else ''
+
+    return {
+        'id':                   row['id'],
+        'application_number':   row['application_number'],
+        'external_service_id':  row['external_service_id'] or '',
+        'application_datetime': _fmt(row.get('application_datetime'), '%Y-%m-%d %H:%M'),
+        'desired_sale_timing':  row['desired_sale_timing'],
+        'maker':                row['maker'],
+        'car_model':            row['car_model'],
+        'year':                 row['year'],
+        'mileage':              row['mileage'],
+        'customer_name':        row['customer_name'],
+        'phone_number':         row['phone_number'],
+        'call_count':           row['call_count'],
+        'postal_code':          row['postal_code'],
+        'address':              row['address'],
+        'email':                row['email'],
+        'sales_owner_name':     row['sales_owner_name'],
+        'sales_assigned_at':    _fmt(row.get('sales_assigned_at'), '%Y-%m-%d %H:%M'),
+        'follow_status':        row['follow_status'],
+        'sales_note':           row['sales_note'],
+        'reservation_datetime': _fmt(row.get('reservation_datetime'), '%Y-%m-%dT%H:%M'),
+        'status_updated_at':    _fmt(row.get('status_updated_at'), '%Y-%m-%d %H:%M'),
+        'status_updated_by':    row['status_updated_by'],
+        'created_at':           _fmt(row.get('created_at'), '%Y-%m-%d %H:%M:%S'),
+        'case_status':          row.get('case_status') or '',
+        'case_id':              row.get('case_id'),
+    }
+
+
+def _encode_assessment_cursor(application_datetime, pk) -> str:
+    """(application_datetime, id) をクライアントに渡す不透明なカーソル文字列に変換する"""
+    raw = f'{application_datetime.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_assessment_cursor(cursor: str):
+    """カーソル文字列を (application_datetime, id) に戻す。不正値は ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        dt_raw, pk_raw = raw.rsplit('|', 1)
+        application_datetime = datetime.fromisoformat(dt_raw)
+        pk = int(pk_raw)
+    except (ValueError, UnicodeError, binascii.Error) as exc:
+        raise ValueError(f'invalid cursor: {cursor!r}') from exc
+    if timezone.is_naive(application_datetime):
+        raise ValueError(f'invalid cursor: {cursor!r}')
+    return application_datetime, pk
+
+
+def _get_assessments_by_cursor(request, queryset, per_page):
+    """カーソル（キーセット）方式のページ取得
+
+    (application_datetime, id) の降順で「前ページ最終行より後ろ」を直接シークするため、
+    OFFSET スキャンが発生せず、深いページでも先頭ページと同じコストで返せる。
+    件数は with_count=1 が指定されたときだけ数える（COUNT(*) は全件走査になるため）。
+    InnoDB のセカンダリインデックスは末尾に主キーを持つので、
+    idx_app_datetime がそのまま (application_datetime, id) の複合インデックスとして効く。
+    """
+    cursor = request.GET.get('cursor', '').strip()
+    with_count = request.GET.get('with_count', '') in ('1', 'true')
+
+    total_count = queryset.count() if with_count else None
+
+    if cursor:
+        try:
+            cursor_dt, cursor_pk = _decode_assessment_cursor(cursor)
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'カーソルが不正です'}, status=400)
+        queryset = queryset.filter(
+            Q(application_datetime__lt=cursor_dt)
+            | Q(application_datetime=cursor_dt, pk__lt=cursor_pk)
+        )
+
+    # 1 件多く取得して次ページの有無を判定する
+    rows = list(
+        queryset.with_case_fields()
+        .order_by('-application_datetime', '-id')
+        .values(*_ASSESSMENT_LIST_FIELDS)[:per_page + 1]
+    )
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    next_cursor = None
+    if has_next:
+        last = rows[-1]
+        next_cursor = _encode_assessment_cursor(last['application_datetime'], last['id'])
+
+    data = [_serialize_assessment_row(row) for row in rows]
+
+    return JsonResponse({
+        'success':     True,
+        'mode':        'cursor',
+        'total_count': total_count,
+        'per_page':    per_page,
+        'count':       len(data),
+        'has_next':    has_next,
+        'next_cursor': next_cursor,
+        'data':        data,
+    })
+
+
 @login_required
 def get_assessments(request):
-    """査定申込データ一覧取得 API（検索・ページネーション対応）"""
+    """査定申込データ一覧取得 API（検索・ページネーション対応）
+
+    mode=cursor を指定するとカーソル方式（無限スクロール用）で返す。
+    """
     application_number = request.GET.get('application_number', '').strip()
     customer_name      = request.GET.get('customer_name', '').strip()
     phone_number       = request.GET.get('phone_number', '').strip()
@@ -322,41 +465,29 @@ def get_assessments(request):
     date_to            = request.GET.get('date_to', '').strip()
     page               = int(request.GET.get('page', 1))
     per_page           = int(request.GET.get('per_page', 100))
+    cursor_mode        = request.GET.get('mode', '') == 'cursor'
 
     has_search = bool(
         application_number or customer_name or phone_number or maker
         or car_model or address or external_id or date_from or date_to
     )
 
-    case_status_subq = Assessment.objects.filter(
-        assessment_request_id=OuterRef('pk')
-    ).values('status')[:1]
-    case_id_subq = Assessment.objects.filter(
-        assessment_request_id=OuterRef('pk')
-    ).values('pk')[:1]
-
-    queryset = CarAssessmentRequest.objects.annotate(
-        case_status=Subquery(case_status_subq, output_field=CharField()),
-        case_id=Subquery(case_id_subq, output_field=IntegerField()),
-    ).order_by('-application_datetime')
-
-    if not has_search:
-        queryset = queryset[:100]
+    queryset = CarAssessmentRequest.objects.all()
 
     if application_number:
         queryset = queryset.filter(application_number=application_number)
-    if customer_name:
-        queryset = queryset.filter(customer_name__icontains=customer_name)
     if phone_number:
-        queryset = queryset.filter(phone_number__icontains=phone_number)
-    if maker:
-        queryset = queryset.filter(maker__icontains=maker)
-    if car_model:
-        queryset = queryset.filter(car_model__icontains=car_model)
-    if address:
-        queryset = queryset.filter(address__icontains=address)
-    if external_id:
-        queryset = queryset.filter(external_service_id__icontains=external_id)
+        # 電話番号は正規化カラムの前方一致（idx_phone_digits を使う）。4 桁以下は下4桁として部分一致
+        queryset = _filter_by_phone(queryset, phone_number)
+    # 氏名・メーカー・車種・住所・外部ID は検索ドキュメントの全文検索で絞り込む
+    # （表記ゆれを正規化して照合するため、項目をまたいで全語一致で判定する）
+    free_text = ' '.join(
+        value for value in (customer_name, maker, car_model, address, external_id) if value
+    )
+    if free_text:
+        queryset = queryset.filter(
+            pk__in=search_target_ids(SearchDocument.TARGET_ASSESSMENT_REQUEST, free_text)
+        )
     if date_from:
         try:
             queryset = queryset.filter(
@@ -374,49 +505,20 @@ def get_assessments(request):
         except ValueError:
             pass
 
+    if cursor_mode:
+        return _get_assessments_by_cursor(request, queryset, max(1, min(per_page, 200)))
+
+    queryset = queryset.with_case_fields().order_by('-application_datetime')
+    if not has_search:
+        queryset = queryset[:100]
+
     total_count = queryset.count() if has_search else min(queryset.count(), 100)
     paginator   = Paginator(queryset, per_page)
     page_obj    = paginator.get_page(page)
 
-    def _fmt(dt, pattern):
-        return timezone.localtime(dt).strftime(pattern) if dt else ''
-
     data = [
-        {
-            'id':                   row['id'],
-            'application_number':   row['application_number'],
-            'external_service_id':  row['external_service_id'] or '',
-            'application_datetime': _fmt(row.get('application_datetime'), '%Y-%m-%d %H:%M'),
-            'desired_sale_timing':  row['desired_sale_timing'],
-            'maker':                row['maker'],
-            'car_model':            row['car_model'],
-            'year':                 row['year'],
-            'mileage':              row['mileage'],
-            'customer_name':        row['customer_name'],
-            'phone_number':         row['phone_number'],
-            'call_count':           row['call_count'],
-            'postal_code':          row['postal_code'],
-            'address':              row['address'],
-            'email':                row['email'],
-            'sales_owner_name':     row['sales_owner_name'],
-            'sales_assigned_at':    _fmt(row.get('sales_assigned_at'), '%Y-%m-%d %H:%M'),
-            'follow_status':        row['follow_status'],
-            'sales_note':           row['sales_note'],
-            'reservation_datetime': _fmt(row.get('reservation_datetime'), '%Y-%m-%dT%H:%M'),
-            'status_updated_at':    _fmt(row.get('status_updated_at'), '%Y-%m-%d %H:%M'),
-            'status_updated_by':    row['status_updated_by'],
-            'created_at':           _fmt(row.get('created_at'), '%Y-%m-%d %H:%M:%S'),
-            'case_status':          row.get('case_status') or '',
-            'case_id':              row.get('case_id'),
-        }
-        for row in page_obj.object_list.values(
-            'id', 'application_number', 'external_service_id', 'application_datetime',
-            'desired_sale_timing', 'maker', 'car_model', 'year', 'mileage',
-            'customer_name', 'phone_number', 'call_count', 'postal_code',
-            'case_status', 'case_id', 'address', 'email', 'sales_owner_name',
-            'sales_assigned_at', 'follow_status', 'sales_note',
-            'reservation_datetime', 'status_updated_at', 'status_updated_by', 'created_at',
-        )
+        _serialize_assessment_row(row)
+        for row in page_obj.object_list.values(*_ASSESSMENT_LIST_FIELDS)
     ]
 
     return JsonResponse({
@@ -432,41 +534,185 @@ def get_assessments(request):
     })
 
 
-@login_required
-def check_new_assessments(request):
-    """新規レコードチェック API（通知ポーリング用）"""
+def _parse_last_id(raw) -> int:
+    try:
+        return max(int(raw or 0), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+_CHECK_NEW_DEFAULT_LIMIT = 50
+_CHECK_NEW_MAX_LIMIT     = 200
+
+
+def _check_new_params(request):
+    last_id = _parse_last_id(request.GET.get('last_id'))
     try:
-        last_id = int(request.GET.get('last_id', 0))
+        limit = int(request.GET.get('limit', _CHECK_NEW_DEFAULT_LIMIT))
     except ValueError:
-        last_id = 0
+        limit = _CHECK_NEW_DEFAULT_LIMIT
+    return last_id, max(1, min(limit, _CHECK_NEW_MAX_LIMIT))
 
-    new_records = CarAssessmentRequest.objects.filter(id__gt=last_id).order_by('-id').values(
-        'id', 'application_number', 'application_datetime', 'customer_name', 'maker', 'car_model',
-    )
 
-    data = [
-        {
-            'id':                   row['id'],
-            'application_number':   row['application_number'],
-            'application_datetime': (
-                timezone.localtime(row['application_datetime']).strftime('%Y-%m-%d %H:%M')
-                if row.get('application_datetime') else ''
-            ),
-            'customer_name': row['customer_name'],
-            'maker':         row['maker'],
-            'car_model':     row['car_model'],
-        }
-        for row in new_records
-    ]
+def _check_new_etag(request):
+    """新着の有無は最新 ID（ウォーターマーク）だけで決まるので、それを ETag にする"""
+    last_id, limit = _check_new_params(request)
+    return f'new-{last_id}-{limit}-{latest_assessment_id()}'
+
+
+def _latest_id_etag(request):
+    return f'latest-{latest_assessment_id()}'
+
 
-    return JsonResponse({'success': True, 'has_new': bool(data), 'count': len(data), 'data': data})
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_check_new_etag)
+def check_new_assessments(request):
+    """新規レコードチェック API（通知ポーリング用）
+
+    last_id より新しい申込を古い順に最大 limit 件ずつ取り出し、新しい順で返す。
+    続きがある場合は has_more=True と next_last_id を返すので、それを last_id にして再度呼ぶ。
+    last_id 未指定（0）の場合はテーブルを走査せず latest_id のみ返す。
+    最新 ID に変化がなければ If-None-Match に 304 を返す（DB には触れない）。
+    """
+    last_id, limit = _check_new_params(request)
+    latest_id = latest_assessment_id()
+
+    if last_id <= 0 or latest_id <= last_id:
+        return JsonResponse({
+            'success': True, 'has_new': False, 'count': 0, 'data': [],
+            'has_more': False, 'next_last_id': max(last_id, latest_id), 'latest_id': latest_id,
+        })
+
+    rows = fetch_new_records(last_id, limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_last_id = rows[-1]['id'] if rows else latest_id
+    data = rows[::-1]
+
+    return JsonResponse({
+        'success':      True,
+        'has_new':      bool(data),
+        'count':        len(data),
+        'data':         data,
+        'has_more':     has_more,
+        'next_last_id': next_last_id,
+        'latest_id':    max(latest_id, next_last_id),
+    })
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_latest_id_etag)
 def get_latest_assessment_id(request):
     """最新申込 ID 取得 API（通知ポーリング初期化用）"""
-    latest_id = CarAssessmentRequest.objects.aggregate(max_id=Max('id')).get('max_id') or 0
-    return JsonResponse({'success': True, 'latest_id': latest_id})
+    return JsonResponse({'success': True, 'latest_id': latest_assessment_id()})
+
+
+# ---------------------------------------------------------------------------
+# 新着通知（SSE / ロングポーリング）
+# ---------------------------------------------------------------------------
+
+_STREAM_HEARTBEAT_SECONDS = 20   # 無通信で中継機器に切断されないようコメント行を送る間隔
+_STREAM_MAX_SECONDS       = 300  # 1 接続の最大時間。超えたら閉じてブラウザに再接続させる
+_STREAM_RETRY_MS          = 5000
+_LONG_POLL_SECONDS        = 25
+
+
+def _sse_event(event: str, data: dict, event_id=None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def _next_new_records(last_id: int):
+    """last_id の直後から古い順に MAX_RECORDS 件（通知は新しい順）と、次に読む last_id・続きの有無を返す"""
+    rows = fetch_new_records(last_id, MAX_RECORDS + 1)
+    has_more = len(rows) > MAX_RECORDS
+    rows = rows[:MAX_RECORDS]
+    return rows[::-1], (rows[-1]['id'] if rows else last_id), has_more
+
+
+async def _new_assessment_events(last_id: int):
+    yield f'retry: {_STREAM_RETRY_MS}\n\n'
+    if last_id <= 0:
+        last_id = await sync_to_async(latest_assessment_id)()
+        yield _sse_event('ready', {'latest_id': last_id}, last_id)
+
+    started = time.monotonic()
+    while time.monotonic() - started < _STREAM_MAX_SECONDS:
+        latest = await wait_for_new(last_id, _STREAM_HEARTBEAT_SECONDS)
+        if latest <= last_id:
+            yield ': keepalive\n\n'
+            continue
+        # 一度に大量に登録された場合も取りこぼさないよう、返した最後の行まで読み進める
+        # （続きは次の周回で wait_for_new が即座に返るので、そのまま送る）
+        data, next_last_id, has_more = await sync_to_async(_next_new_records)(last_id)
+        last_id = next_last_id if (data or has_more) else latest
+        if data:
+            yield _sse_event('assessments', {'count': len(data), 'data': data}, last_id)
+
+
+@require_GET
+async def stream_new_assessments(request):
+    """新着申込の Server-Sent Events ストリーム（サイドバー通知用）
+
+    last_id（再接続時は Last-Event-ID ヘッダー）より新しい申込を event: assessments で送る。
+    last_id 未指定時は event: ready で現在の最新 ID を返す。
+    WSGI 配信ではストリームを保持できないため 503 を返し、クライアントは wait_new_assessments に切り替える。
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'success': False, 'message': 'ログインが必要です'}, status=401)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'success': False, 'message': 'ストリーム配信に対応していません'}, status=503)
+
+    last_id = _parse_last_id(request.headers.get('Last-Event-ID') or request.GET.get('last_id'))
+    response = StreamingHttpResponse(_new_assessment_events(last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+async def wait_new_assessments(request):
+    """新着申込のロングポーリング API（SSE が使えない環境向け。ASGI 配信時のみ）
+
+    last_id より新しい申込が登録されるまで最大 _LONG_POLL_SECONDS 秒待ってから返す。
+    レスポンス形式は check_new_assessments と同じ（古い順に最大 MAX_RECORDS 件ずつ読み進め、
+    続きがあれば has_more=True と next_last_id を返す）。
+    WSGI 配信では待機中ワーカーを占有するため待たずに 503 を返し、
+    クライアントは check_new_assessments の定期ポーリングに切り替える。
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'success': False, 'message': 'ログインが必要です'}, status=401)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'success': False, 'message': 'ロングポーリングに対応していません'}, status=503)
+
+    last_id = _parse_last_id(request.GET.get('last_id'))
+    if last_id <= 0:
+        latest = await sync_to_async(latest_assessment_id)()
+        return JsonResponse({'success': True, 'has_new': False, 'count': 0, 'data': [], 'latest_id': latest})
+
+    latest = await wait_for_new(last_id, _LONG_POLL_SECONDS)
+    data, next_last_id, has_more = [], latest, False
+    if latest > last_id:
+        data, next_last_id, has_more = await sync_to_async(_next_new_records)(last_id)
+        if not (data or has_more):
+            next_last_id = latest
+    return JsonResponse({
+        'success':      True,
+        'has_new':      bool(data),
+        'count':        len(data),
+        'data':         data,
+        'has_more':     has_more,
+        'next_last_id': max(next_last_id, last_id),
+        'latest_id':    max(latest, next_last_id, last_id),
+    })
 
 
 @login_required
@@ -9,7 +9,8 @@ API:
   save_bank_account, delete_bank_account, approve_assessment,
   add_contact_history, add_check_item, delete_check_item,
   add_advance_payment, delete_advance_payment,
-  approve_advance_payment, update_required_docs
+  approve_advance_payment, update_required_docs,
+  import_from_assessment_system, assessment_import_job_status
 """
 import json
 import logging
@@ -19,29 +20,33 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import Q
-from django.http import JsonResponse
+from django.db.models import Prefetch
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 
 from ..models import (
     AASaleImageUpload,
     AdvancePayment,
     Assessment,
     AssessmentCheckItem,
-    AuctionVenue,
+    AssessmentImportJob,
     CarAssessmentRequest,
     ContactHistory,
     ContractFileUpload,
     Customer,
     CustomerBankAccount,
+    Document,
     OtherFeeItem,
     OwnershipRelease,
     PurchaseContract,
     SalesProcess,
+    SearchDocument,
     Vehicle,
 )
+from ..services import master_data, user_directory
+from ..services.search import search_target_ids
 from .utils import (
     _current_user_display_name,
     _serialize_contract_file, _serialize_aa_image,
@@ -75,11 +80,7 @@ def case_list(request):
     q      = request.GET.get('q', '').strip()
     status = request.GET.get('status', '').strip()
     if q:
-        qs = qs.filter(
-            Q(case_number__icontains=q) |
-            Q(customer__name__icontains=q) | Q(customer__phone_number__icontains=q) |
-            Q(vehicle__maker__icontains=q) | Q(vehicle__car_model__icontains=q)
-        )
+        qs = qs.filter(pk__in=search_target_ids(SearchDocument.TARGET_CASE, q))
     if status:
         qs = qs.filter(status=status)
 
@@ -94,34 +95,55 @@ def case_list(request):
     })
 
 
+def _case_detail_queryset():
+    """案件詳細の集約（査定〜契約〜販売と各明細）を固定件数のクエリで読み込む QuerySet
+
+    1:1 の関連は select_related で 1 本の JOIN にまとめ、1:N の明細は関連ごとに 1 本の
+    prefetch で読む。明細の件数やタブに関係なくクエリ数は一定になる
+    （check_case_detail_queries で確認できる）。
+    """
+    contract_relations = (
+        'customer', 'manager1', 'manager2', 'approved_by', 'correction_approved_by', 'approval_requested_to',
+        'ownership_release', 'sales_process__sold_destination',
+    )
+    return Assessment.objects.select_related(
+        'assessment_request', 'customer', 'vehicle', 'assigned_to', 'approved_by', 'appointment_getter',
+        'approval_requested_to',
+        *(f'contract__{name}' for name in contract_relations),
+    ).prefetch_related(
+        'check_items',
+        'vehicle__images',
+        'customer__bank_accounts',
+        Prefetch(
+            'assessment_request__contact_histories',
+            queryset=ContactHistory.objects.select_related('recorded_by').order_by('-contacted_at'),
+        ),
+        Prefetch('contract__documents', queryset=Document.objects.select_related('document_type')),
+        Prefetch('contract__file_uploads', queryset=ContractFileUpload.objects.select_related('uploaded_by')),
+        Prefetch('contract__advance_payments', queryset=AdvancePayment.objects.select_related('approved_by')),
+        Prefetch('contract__sales_process__aa_images', queryset=AASaleImageUpload.objects.select_related('uploaded_by')),
+        Prefetch('contract__sales_process__other_fee_items', queryset=OtherFeeItem.objects.select_related('created_by')),
+    )
+
+
 @login_required
 def case_detail(request, pk):
     """案件詳細（S04）— 商談・契約タブ一気通貫"""
-    assessment = get_object_or_404(
-        Assessment.objects.select_related(
-            'assessment_request', 'customer', 'vehicle', 'assigned_to', 'approved_by'
-        ),
-        pk=pk,
-    )
-    try:
-        contract = PurchaseContract.objects.select_related(
-            'manager1', 'manager2', 'approved_by', 'correction_approved_by'
-        ).get(assessment=assessment)
-    except PurchaseContract.DoesNotExist:
-        contract = None
+    assessment = get_object_or_404(_case_detail_queryset(), pk=pk)
+    contract = getattr(assessment, 'contract', None)
 
-    histories     = assessment.assessment_request.contact_histories.select_related('recorded_by').order_by('-contacted_at')
+    # 以下はすべて _case_detail_queryset() で読み込み済み（追加のクエリは発生しない）
+    histories       = assessment.assessment_request.contact_histories.all()
     check_items     = assessment.check_items.all()
-    documents       = contract.documents.select_related('document_type').all() if contract else []
-    identity_docs   = contract.identity_documents.all() if contract else []
+    documents       = contract.documents.all() if contract else []
     contract_files_by_type = {}
     if contract:
-        for f in contract.file_uploads.select_related('uploaded_by'):
+        for f in contract.file_uploads.all():
             contract_files_by_type.setdefault(f.doc_type, []).append(_serialize_contract_file(f))
     bank_accounts   = assessment.customer.bank_accounts.all()
-    primary_bank_account = bank_accounts.filter(is_primary=True).first() or bank_accounts.first()
+    primary_bank_account = next((a for a in bank_accounts if a.is_primary), None) or next(iter(bank_accounts), None)
     ownership_release = getattr(contract, 'ownership_release', None) if contract else None
-    advance_payments  = contract.advance_payments.select_related('approved_by').all() if contract else []
+    advance_payments  = contract.advance_payments.all() if contract else []
     sales_process = getattr(contract, 'sales_process', None) if contract else None
     repair_flag   = contract.repair_flag if contract else False
     if sales_process:
@@ -138,11 +160,11 @@ def case_detail(request, pk):
     aa_images_by_type = {}
     other_fee_items_list = []
     if sales_process:
-        for img in sales_process.aa_images.select_related('uploaded_by'):
+        for img in sales_process.aa_images.all():
             aa_images_by_type.setdefault(img.image_type, []).append(_serialize_aa_image(img))
         other_fee_items_list = [
             _serialize_other_fee_item(item)
-            for item in sales_process.other_fee_items.select_related('created_by')
+            for item in sales_process.other_fee_items.all()
         ]
     vehicle_images = assessment.vehicle.images.all()
 
@@ -153,12 +175,9 @@ def case_detail(request, pk):
     from decimal import Decimal
     rating_choices = [Decimal(str(v / 10)) for v in range(10, 55, 5)]
 
-    User      = get_user_model()
-    all_users = User.objects.filter(is_active=True).order_by('last_name', 'first_name')
-    approvers = User.objects.filter(is_active=True).filter(
-        Q(is_superuser=True) |
-        Q(profile__role__in=['sub_leader', 'manager', 'superuser'])
-    ).distinct().order_by('last_name', 'first_name')
+    directory = user_directory.get_directory()
+    all_users = directory.active_users
+    approvers = directory.approvers
 
     contract_tax_rate = 10
     contract_total_payment = None
@@ -181,7 +200,6 @@ def case_detail(request, pk):
         'check_items':                  check_items,
         'documents':                    documents,
         'editable_status_choices':      editable_status_choices,
-        'identity_docs':                identity_docs,
         'contract_files_by_type':       contract_files_by_type,
         'contract_doc_type_choices':    ContractFileUpload.DOC_TYPE_CHOICES,
         'bank_accounts':                bank_accounts,
@@ -218,7 +236,7 @@ def case_detail(request, pk):
         'other_fee_items':               other_fee_items_list,
         'other_fee_category_choices':    OtherFeeItem.CATEGORY_CHOICES,
         'disposition_choices':           SalesProcess.DISPOSITION_CHOICES,
-        'auction_venues':                AuctionVenue.objects.all(),
+        'auction_venues':                master_data.auction_venues(),
         'required_doc_fields': [
             row for row in [
                 ('inkan',    '印鑑証明', contract.required_inkan_count    if contract else 0, contract.inkan_received    if contract else False, contract.inkan_received_date    if contract else None),
@@ -399,13 +417,10 @@ def update_vehicle_info(request, assessment_id):
 @login_required
 @require_POST
 def import_from_assessment_system(request, assessment_id):
-    """査定システムから車両情報を取り込む API"""
-    from ..services.assessment_system_scraper import scrape_vehicle_data
+    """査定システムから車両情報を取り込む API（ジョブを登録して即座に返す。状態は assessment_import_job_status）"""
+    from ..services import assessment_import_jobs
 
-    assessment = get_object_or_404(
-        Assessment.objects.select_related('vehicle'),
-        pk=assessment_id,
-    )
+    assessment = get_object_or_404(Assessment, pk=assessment_id)
     try:
         payload = json.loads(request.body)
     except (json.JSONDecodeError, AttributeError):
@@ -415,53 +430,39 @@ def import_from_assessment_system(request, assessment_id):
     if not assessment_system_id:
         return JsonResponse({'success': False, 'message': '査定システムIDを入力してください'}, status=400)
 
-    try:
-        data = scrape_vehicle_data(assessment_system_id)
-    except ValueError as e:
-        return JsonResponse({'success': False, 'message': str(e)}, status=404)
-    except Exception as e:
-        logger.exception('査定システム取り込みエラー')
-        return JsonResponse({'success': False, 'message': f'取り込みに失敗しました: {e}'}, status=500)
-
-    # 車両情報を保存
-    vehicle = assessment.vehicle
-    for field, value in data['vehicle'].items():
-        if field == 'inspection_expiry':
-            vehicle.inspection_expiry = value
-        elif value:
-            setattr(vehicle, field, value)
-    vehicle.updated_by = request.user
-    vehicle.save()
-
-    # Assessment に査定システム情報を保存
-    assessment.assessment_system_id          = assessment_system_id
-    assessment.assessment_system_imported_at = timezone.now()
-    if data.get('assessment_price') is not None:
-        assessment.assessment_price = data['assessment_price']
-    if data.get('recycle_amount') is not None:
-        assessment.assessment_system_recycle_amount = data['recycle_amount']
-    if data.get('overall_rating') is not None:
-        assessment.overall_rating = data['overall_rating']
-    assessment.save(update_fields=[
-        'assessment_system_id', 'assessment_system_imported_at',
-        'assessment_price', 'assessment_system_recycle_amount', 'overall_rating', 'updated_at',
-    ])
+    job = assessment_import_jobs.enqueue(assessment, assessment_system_id, request.user)
+    return JsonResponse(_import_job_payload(job))
 
-    return JsonResponse({
-        'success':             True,
-        'message':             '査定システムから車両情報を取り込みました',
-        'assessment_price':    data.get('assessment_price'),
-        'recycle_amount':      data.get('recycle_amount'),
-        'overall_rating':      data.get('overall_rating'),
-        'vehicle':             {
-            k: str(v) if v is not None else ''
-            for k, v in data['vehicle'].items()
-            if k != 'inspection_expiry'
-        } | {
-            'inspection_expiry': data['vehicle']['inspection_expiry'].strftime('%Y-%m-%d')
-            if data['vehicle'].get('inspection_expiry') else ''
-        },
-    })
+
+@login_required
+@require_GET
+def assessment_import_job_status(request, assessment_id, job_id):
+    """査定システム取り込みジョブ状態 API（画面からポーリングする。完了時は取り込み結果を含む）"""
+    from ..services import assessment_import_jobs
+
+    job = assessment_import_jobs.get_job(job_id)
+    if job is None or job.assessment_id != assessment_id:
+        raise Http404
+    return JsonResponse(_import_job_payload(job))
+
+
+def _import_job_payload(job):
+    from ..services.assessment_import_jobs import JOB_TIMEOUT
+
+    # timeout_sec: 画面がポーリングを続ける上限（過ぎたジョブは get_job が失敗にする）
+    payload = {
+        'success':     job.status != AssessmentImportJob.STATUS_FAILED,
+        'job_id':      job.pk,
+        'status':      job.status,
+        'message':     job.get_status_display(),
+        'timeout_sec': int(JOB_TIMEOUT.total_seconds()),
+    }
+    if job.status == AssessmentImportJob.STATUS_DONE:
+        payload['message'] = '査定システムから車両情報を取り込みました'
+        payload.update(job.result)
+    elif job.status == AssessmentImportJob.STATUS_FAILED:
+        payload['message'] = job.error_message or '取り込みに失敗しました'
+    return payload
 
 
 @login_required
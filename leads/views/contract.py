@@ -40,7 +40,10 @@ from ..models import (
     SalesProcess,
     Vehicle,
 )
+from ..services import master_data, user_directory
 from .utils import (
+    _filter_by_phone,
+    _is_phone_query,
     _parse_tristate, _parse_date,
     _sync_customer_from_contract,
     _serialize_contract_file, _serialize_aa_image,
@@ -74,7 +77,10 @@ def contract_list(request):
     q      = request.GET.get('q', '').strip()
     status = request.GET.get('status', '').strip()
     if q:
-        qs = qs.filter(Q(customer__name__icontains=q) | Q(customer__phone_number__icontains=q))
+        if _is_phone_query(q):
+            qs = qs.filter(customer__in=_filter_by_phone(Customer.objects.all(), q))
+        else:
+            qs = qs.filter(customer__name__icontains=q)
     if status:
         qs = qs.filter(status=status)
 
@@ -804,10 +810,9 @@ def sales_process_list(request):
     if sales_user_id:
         qs = qs.filter(contract__assigned_to_id=sales_user_id)
 
-    User = get_user_model()
-    sales_users = User.objects.filter(
-        contracts__sales_process__isnull=False,
-    ).distinct().order_by('last_name', 'first_name')
+    sales_users = user_directory.get_directory().pick(
+        SalesProcess.objects.values_list('contract__assigned_to_id', flat=True).order_by().distinct(),
+    )
 
     return render(request, 'leads/sales_process_list.html', {
         'processes':     qs,
@@ -862,14 +867,12 @@ def sale_info_list(request):
 
     # フィルター用マスタ（担当者も表示範囲に応じて絞る）
     stores  = Store.objects.filter(is_active=True).order_by('id') if has_global else None
-    User    = get_user_model()
-    user_qs = User.objects.filter(
-        is_active=True, assessments__contract__sales_process__isnull=False
-    ).distinct().order_by('last_name', 'first_name')
-    if not has_global and profile and profile.store:
-        user_qs = user_qs.filter(profile__store=profile.store)
-    users  = user_qs
-    venues = AuctionVenue.objects.order_by('name')
+    users   = user_directory.get_directory().pick(
+        SalesProcess.objects.values_list('contract__assessment__assigned_to_id', flat=True).order_by().distinct(),
+        active_only=True,
+        store_id=profile.store_id if not has_global and profile and profile.store else None,
+    )
+    venues = master_data.auction_venues()
 
     paginator = Paginator(qs, 100)
     page_obj  = paginator.get_page(request.GET.get('page', 1))
@@ -1288,6 +1291,8 @@ def store_performance(request, store_code):
         'assigned_to__profile',
         'assigned_to__profile__store',
         'contract',
+        'customer',
+        'vehicle',
     )
 
     if is_cc:
@@ -1308,48 +1313,50 @@ def store_performance(request, store_code):
     if f_user:
         qs = qs.filter(**{user_filter_field: f_user})
 
-    # 個人別集計
-    User = get_user_model()
-    store_users = User.objects.filter(
-        is_active=True,
-        profile__store__code=store_code,
-    ).order_by('last_name', 'first_name')
+    # 個人別集計（担当者ごとの GROUP BY 1 本。全体集計はその合計）
+    stats_by_person = {
+        row.pop(person_field): row
+        for row in qs.order_by().values(person_field).annotate(
+            total=Count('id'),
+            contracted=Count('id', filter=Q(status=Assessment.STATUS_CONTRACTED)),
+            managed=Count('id', filter=Q(status=Assessment.STATUS_MANAGED)),
+            lost=Count('id', filter=Q(status__in=[Assessment.STATUS_LOST, Assessment.STATUS_PRE_CANCEL])),
+            in_progress=Count('id', filter=Q(status=Assessment.STATUS_IN_PROGRESS)),
+            purchase_total=Sum(
+                'contract__purchase_price_incl_tax',
+                filter=Q(status=Assessment.STATUS_CONTRACTED, contract__isnull=False),
+            ),
+        )
+    }
+    empty_stats = {'total': 0, 'contracted': 0, 'managed': 0, 'lost': 0, 'in_progress': 0, 'purchase_total': 0}
+
+    store_users = user_directory.get_directory().store_users(store.pk)
 
     per_person = []
     for user in store_users:
-        user_qs = qs.filter(**{person_field: user})
-        total       = user_qs.count()
-        contracted  = user_qs.filter(status=Assessment.STATUS_CONTRACTED).count()
-        managed     = user_qs.filter(status=Assessment.STATUS_MANAGED).count()
-        lost        = user_qs.filter(status__in=[Assessment.STATUS_LOST, Assessment.STATUS_PRE_CANCEL]).count()
-        in_progress = user_qs.filter(status=Assessment.STATUS_IN_PROGRESS).count()
-        contract_rate = round(contracted / total * 100, 1) if total else 0
-        purchase_total = user_qs.filter(
-            status=Assessment.STATUS_CONTRACTED,
-            contract__isnull=False,
-        ).aggregate(s=Sum('contract__purchase_price_incl_tax'))['s'] or 0
-
+        stats = stats_by_person.get(user.pk, empty_stats)
+        total      = stats['total']
+        contracted = stats['contracted']
         per_person.append({
             'user':          user,
             'total':         total,
-            'in_progress':   in_progress,
+            'in_progress':   stats['in_progress'],
             'contracted':    contracted,
-            'managed':       managed,
-            'lost':          lost,
-            'contract_rate': contract_rate,
-            'purchase_total': purchase_total,
+            'managed':       stats['managed'],
+            'lost':          stats['lost'],
+            'contract_rate': round(contracted / total * 100, 1) if total else 0,
+            'purchase_total': stats['purchase_total'] or 0,
         })
 
-    # 全体集計
-    total_all       = qs.count()
-    contracted_all  = qs.filter(status=Assessment.STATUS_CONTRACTED).count()
-    managed_all     = qs.filter(status=Assessment.STATUS_MANAGED).count()
-    lost_all        = qs.filter(status__in=[Assessment.STATUS_LOST, Assessment.STATUS_PRE_CANCEL]).count()
-    in_progress_all = qs.filter(status=Assessment.STATUS_IN_PROGRESS).count()
+    # 全体集計（退職者など store_users に含まれない担当者の分も含む）
+    all_stats = list(stats_by_person.values())
+    total_all       = sum(s['total'] for s in all_stats)
+    contracted_all  = sum(s['contracted'] for s in all_stats)
+    managed_all     = sum(s['managed'] for s in all_stats)
+    lost_all        = sum(s['lost'] for s in all_stats)
+    in_progress_all = sum(s['in_progress'] for s in all_stats)
     rate_all        = round(contracted_all / total_all * 100, 1) if total_all else 0
-    purchase_all    = qs.filter(
-        status=Assessment.STATUS_CONTRACTED, contract__isnull=False,
-    ).aggregate(s=Sum('contract__purchase_price_incl_tax'))['s'] or 0
+    purchase_all    = sum(s['purchase_total'] or 0 for s in all_stats)
 
     # 案件一覧（絞り込み後、最新順）
     case_qs  = qs.order_by('-assessment_datetime')
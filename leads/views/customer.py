@@ -6,6 +6,7 @@ views/customer.py — 顧客マスタ管理ビュー
 - update_customer_direct : 顧客情報更新 API
 - save_bank_account_direct   : 口座情報追加・更新 API
 - delete_bank_account_direct : 口座情報削除 API
+- lookup_by_phone        : 電話番号照合 API（既存顧客・過去の査定申込）
 """
 import json
 import logging
@@ -13,14 +14,24 @@ import logging
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import Q
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, render
-from django.views.decorators.http import require_POST
-
-from ..models import Assessment, Customer, CustomerBankAccount
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
+
+from ..models import (
+    Assessment,
+    CarAssessmentRequest,
+    Customer,
+    CustomerBankAccount,
+    SearchDocument,
+    normalize_phone_digits,
+)
+from ..services.search import search_target_ids
 from .utils import _parse_date, _require_manager
 
+_PHONE_LOOKUP_LIMIT = 20
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,11 +45,7 @@ def customer_list(request):
     q = request.GET.get('q', '').strip()
     qs = Customer.objects.prefetch_related('bank_accounts').order_by('-created_at')
     if q:
-        qs = qs.filter(
-            Q(name__icontains=q) |
-            Q(phone_number__icontains=q) |
-            Q(email__icontains=q)
-        )
+        qs = qs.filter(pk__in=search_target_ids(SearchDocument.TARGET_CUSTOMER, q))
 
     paginator = Paginator(qs, 30)
     page = paginator.get_page(request.GET.get('page', 1))
@@ -190,3 +197,52 @@ def delete_bank_account_direct(request, pk, account_id):
     acc = get_object_or_404(CustomerBankAccount, pk=account_id, customer_id=pk)
     acc.delete()
     return JsonResponse({'success': True, 'message': '口座情報を削除しました'})
+
+
+@login_required
+@require_GET
+def lookup_by_phone(request):
+    """電話番号照合 API（着信時の既存顧客確認・重複チェック用）
+
+    GET パラメータ:
+      phone : 電話番号（ハイフン・全角可）
+      mode  : exact（完全一致）/ prefix（前方一致）。省略時は 10 桁以上で完全一致
+    いずれも正規化カラム phone_digits のインデックスで引く。
+    """
+    phone = request.GET.get('phone', '').strip()
+    mode  = request.GET.get('mode', '').strip()
+    if mode not in ('', 'exact', 'prefix'):
+        return JsonResponse({'success': False, 'message': 'mode が不正です'}, status=400)
+
+    digits = normalize_phone_digits(phone)
+    if len(digits) < 3:
+        return JsonResponse({'success': False, 'message': '電話番号を3桁以上入力してください'}, status=400)
+
+    prefix = None if not mode else mode == 'prefix'
+    customers = (
+        Customer.objects.by_phone(digits, prefix=prefix)
+        .order_by('-created_at')
+        .values('id', 'name', 'furigana', 'phone_number', 'address')[:_PHONE_LOOKUP_LIMIT]
+    )
+    requests = (
+        CarAssessmentRequest.objects.by_phone(digits, prefix=prefix)
+        .with_case_fields()
+        .order_by('-application_datetime')
+        .values(
+            'id', 'application_number', 'application_datetime', 'customer_name',
+            'phone_number', 'maker', 'car_model', 'follow_status', 'case_id',
+        )[:_PHONE_LOOKUP_LIMIT]
+    )
+
+    return JsonResponse({
+        'success':   True,
+        'digits':    digits,
+        'customers': list(customers),
+        'assessment_requests': [
+            {
+                **row,
+                'application_datetime': timezone.localtime(row['application_datetime']).strftime('%Y/%m/%d %H:%M'),
+            }
+            for row in requests
+        ],
+    })
@@ -4,17 +4,21 @@ leads/views/scraper_api.py — スクレイパー向け内部 API
 認証: Authorization: Bearer <SCRAPER_API_TOKEN>
 外部からは呼ばれない。スクレイパープロセスのみが使用する。
 """
+import json
 import logging
 import os
 from datetime import datetime
 
+from django.db import transaction
 from django.http import JsonResponse
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
-from ..models import CarAssessmentRequest
-from .utils import _generate_application_number
+from ..models import CarAssessmentRequest, SearchDocument, normalize_phone_digits
+from ..services import search
+from ..services.assessment_feed import publish_new_assessment
+from .utils import _generate_application_number, _generate_application_numbers
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +31,56 @@ def _check_token(request) -> bool:
     return auth == f'Bearer {token}'
 
 
+# 一括登録 API で 1 リクエストに受け付ける最大件数
+MAX_BATCH_SIZE = 500
+
+# 任意項目（未指定は空文字）
+_OPTIONAL_FIELDS = (
+    'external_status', 'email', 'postal_code', 'address', 'maker', 'car_model',
+    'year', 'mileage', 'desired_sale_timing',
+)
+
+
+def _parse_entry(payload) -> tuple[dict | None, str | None]:
+    """受信エントリを検証して (登録用の値, None) または (None, エラーメッセージ) を返す"""
+    if not isinstance(payload, dict):
+        return None, 'entry must be an object'
+
+    external_service_id = str(payload.get('external_service_id') or '').strip()
+    if not external_service_id:
+        return None, 'external_service_id is required'
+
+    customer_name = str(payload.get('customer_name') or '').strip()
+    phone_number  = str(payload.get('phone_number') or '').strip()
+    if not customer_name or not phone_number:
+        return None, 'customer_name and phone_number are required'
+
+    # 申込日時のパース
+    try:
+        app_dt = datetime.fromisoformat(payload.get('application_datetime', ''))
+        if app_dt.tzinfo is None:
+            app_dt = timezone.make_aware(app_dt)
+    except (ValueError, TypeError):
+        app_dt = timezone.now()
+
+    fields = {
+        'external_service_id':  external_service_id,
+        'application_datetime': app_dt,
+        'customer_name':        customer_name,
+        'phone_number':         phone_number,
+    }
+    for name in _OPTIONAL_FIELDS:
+        fields[name] = payload.get(name) or ''
+    return fields, None
+
+
+def _load_json(request):
+    try:
+        return json.loads(request.body)
+    except (json.JSONDecodeError, AttributeError):
+        return None
+
+
 @csrf_exempt
 @require_POST
 def scraper_ingest_navikuru(request):
@@ -54,29 +108,14 @@ def scraper_ingest_navikuru(request):
     if not _check_token(request):
         return JsonResponse({'error': 'Unauthorized'}, status=401)
 
-    import json
-    try:
-        payload = json.loads(request.body)
-    except (json.JSONDecodeError, AttributeError):
+    payload = _load_json(request)
+    if payload is None:
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
 
-    external_service_id = payload.get('external_service_id', '').strip()
-    if not external_service_id:
-        return JsonResponse({'error': 'external_service_id is required'}, status=400)
-
-    customer_name = payload.get('customer_name', '').strip()
-    phone_number  = payload.get('phone_number', '').strip()
-    if not customer_name or not phone_number:
-        return JsonResponse({'error': 'customer_name and phone_number are required'}, status=400)
-
-    # 申込日時のパース
-    try:
-        app_dt_raw = payload.get('application_datetime', '')
-        app_dt = datetime.fromisoformat(app_dt_raw)
-        if app_dt.tzinfo is None:
-            app_dt = timezone.make_aware(app_dt)
-    except (ValueError, TypeError):
-        app_dt = timezone.now()
+    fields, error = _parse_entry(payload)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+    external_service_id = fields['external_service_id']
 
     # 重複チェック: channel_type + external_service_id で既存を検索
     existing = CarAssessmentRequest.objects.filter(
@@ -88,8 +127,8 @@ def scraper_ingest_navikuru(request):
         # 既存レコードの外部ステータスとスクレイピング日時だけ更新
         update_fields = ['scraped_at', 'updated_at']
         existing.scraped_at = timezone.now()
-        if payload.get('external_status'):
-            existing.external_status = payload['external_status']
+        if fields['external_status']:
+            existing.external_status = fields['external_status']
             update_fields.append('external_status')
         existing.save(update_fields=update_fields)
         return JsonResponse({
@@ -98,30 +137,19 @@ def scraper_ingest_navikuru(request):
             'application_number': existing.application_number,
         })
 
-    # 新規登録
-    today = app_dt.date()
-    application_number = _generate_application_number(
-        CarAssessmentRequest.CHANNEL_NAVIKURU, today
-    )
-
-    obj = CarAssessmentRequest.objects.create(
-        application_number   = application_number,
-        application_datetime = app_dt,
-        channel_type         = CarAssessmentRequest.CHANNEL_NAVIKURU,
-        external_service_id  = external_service_id,
-        external_status      = payload.get('external_status', ''),
-        customer_name        = customer_name,
-        phone_number         = phone_number,
-        email                = payload.get('email', ''),
-        postal_code          = payload.get('postal_code', ''),
-        address              = payload.get('address', ''),
-        maker                = payload.get('maker', ''),
-        car_model            = payload.get('car_model', ''),
-        year                 = payload.get('year', ''),
-        mileage              = payload.get('mileage', ''),
-        desired_sale_timing  = payload.get('desired_sale_timing', ''),
-        scraped_at           = timezone.now(),
-    )
+    # 新規登録（登録に失敗したら申込番号の確保も取り消して欠番を出さない）
+    today = fields['application_datetime'].date()
+    with transaction.atomic():
+        application_number = _generate_application_number(
+            CarAssessmentRequest.CHANNEL_NAVIKURU, today
+        )
+        obj = CarAssessmentRequest.objects.create(
+            application_number = application_number,
+            channel_type       = CarAssessmentRequest.CHANNEL_NAVIKURU,
+            scraped_at         = timezone.now(),
+            **fields,
+        )
+    publish_new_assessment(obj)
     logger.info(f'[scraper] 新規登録: {application_number} ({external_service_id})')
 
     return JsonResponse({
@@ -129,3 +157,117 @@ def scraper_ingest_navikuru(request):
         'id': obj.pk,
         'application_number': application_number,
     }, status=201)
+
+
+@csrf_exempt
+@require_POST
+def scraper_ingest_navikuru_batch(request):
+    """
+    ナビクルスクレイパーからのデータ一括受信エンドポイント。
+
+    既存判定は external_service_id__in の 1 クエリ、申込番号は申込日ごとに連番を 1 回だけ進め、
+    既存分は bulk_update・新規分は bulk_create でまとめて書き込む。
+    bulk_create / bulk_update は保存シグナルが発火しないため、電話番号（数字のみ）と
+    検索ドキュメントはここで設定する。
+
+    Request body (JSON):
+        {"entries": [<scraper_ingest_navikuru と同じ形式のエントリ>, ...]}  — 最大 MAX_BATCH_SIZE 件
+
+    Response:
+        {"results": [
+            {"external_service_id": str, "created": bool, "id": int, "application_number": str}
+            または {"external_service_id": str, "error": str}
+        , ...]}  — entries と同じ順序
+    """
+    if not _check_token(request):
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+
+    payload = _load_json(request)
+    entries = payload.get('entries') if isinstance(payload, dict) else None
+    if not isinstance(entries, list):
+        return JsonResponse({'error': 'entries must be a list'}, status=400)
+    if len(entries) > MAX_BATCH_SIZE:
+        return JsonResponse({'error': f'too many entries (max {MAX_BATCH_SIZE})'}, status=400)
+
+    results = [None] * len(entries)
+    parsed  = {}  # external_service_id → 登録用の値（同じ ID が重複したら後勝ち）
+    indexes = {}  # external_service_id → results の位置
+    for i, entry in enumerate(entries):
+        fields, error = _parse_entry(entry)
+        if error:
+            external_service_id = entry.get('external_service_id', '') if isinstance(entry, dict) else ''
+            results[i] = {'external_service_id': external_service_id, 'error': error}
+            continue
+        parsed[fields['external_service_id']] = fields
+        indexes.setdefault(fields['external_service_id'], []).append(i)
+
+    now = timezone.now()
+    existing = {
+        obj.external_service_id: obj
+        for obj in CarAssessmentRequest.objects.filter(
+            channel_type=CarAssessmentRequest.CHANNEL_NAVIKURU,
+            external_service_id__in=list(parsed),
+        ).only('id', 'application_number', 'external_service_id', 'external_status')
+    }
+
+    # 既存レコード: 外部ステータスとスクレイピング日時だけ更新
+    to_update = []
+    for external_service_id, obj in existing.items():
+        obj.scraped_at = now
+        obj.updated_at = now
+        if parsed[external_service_id]['external_status']:
+            obj.external_status = parsed[external_service_id]['external_status']
+        to_update.append(obj)
+
+    # 新規レコード: 申込日ごとにまとめる（申込番号は申込日ごとに 1 回で確保）
+    new_by_day = {}
+    for external_service_id, fields in parsed.items():
+        if external_service_id not in existing:
+            new_by_day.setdefault(fields['application_datetime'].date(), []).append(fields)
+
+    with transaction.atomic():
+        if to_update:
+            CarAssessmentRequest.objects.bulk_update(to_update, ['scraped_at', 'updated_at', 'external_status'])
+
+        created = []
+        if new_by_day:
+            # 申込番号は登録と同じトランザクションで確保する（bulk_create が失敗したら確保も取り消され欠番が出ない）。
+            # 連番の行ロックはコミットまで続くため、同じ申込日の一括登録同士はここで直列になる。
+            # デッドロックしないよう、どの一括登録も申込日の昇順にロックする
+            to_create = []
+            for day in sorted(new_by_day):
+                day_fields = new_by_day[day]
+                numbers = _generate_application_numbers(CarAssessmentRequest.CHANNEL_NAVIKURU, day, len(day_fields))
+                for application_number, fields in zip(numbers, day_fields):
+                    to_create.append(CarAssessmentRequest(
+                        application_number = application_number,
+                        channel_type       = CarAssessmentRequest.CHANNEL_NAVIKURU,
+                        phone_digits       = normalize_phone_digits(fields['phone_number']),
+                        scraped_at         = now,
+                        **fields,
+                    ))
+            CarAssessmentRequest.objects.bulk_create(to_create)
+            # MySQL は bulk_create で主キーが返らないため、申込番号で読み直す
+            created = list(CarAssessmentRequest.objects.filter(
+                application_number__in=[obj.application_number for obj in to_create],
+            ))
+            search.index_new_objects(SearchDocument.TARGET_ASSESSMENT_REQUEST, created)
+            for obj in created:
+                publish_new_assessment(obj)
+
+    for obj, is_created in [(obj, False) for obj in existing.values()] + [(obj, True) for obj in created]:
+        for i in indexes[obj.external_service_id]:
+            results[i] = {
+                'external_service_id': obj.external_service_id,
+                'created': is_created,
+                'id': obj.pk,
+                'application_number': obj.application_number,
+            }
+    for obj in created:
+        logger.info(f'[scraper] 新規登録: {obj.application_number} ({obj.external_service_id})')
+    logger.info(
+        f'[scraper] 一括受信: {len(entries)} 件 '
+        f'(新規 {len(created)}, 更新 {len(existing)}, エラー {len(entries) - sum(map(len, indexes.values()))})'
+    )
+
+    return JsonResponse({'results': results})
@@ -4,16 +4,25 @@ views/utils.py — ビュー共通ヘルパー
 このモジュールのシンボルを外部から直接 import しないこと。
 views パッケージ内のみで使用する。
 """
+import codecs
+import csv
+import io
 import logging
 import os
+import re
 from datetime import datetime
 
-from django.db import transaction
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.db.models import Sum
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, StreamingHttpResponse
 from django.utils import timezone
 
-from ..models import CarAssessmentRequest, NumberSequence, OtherFeeItem, SalesProcess
+from ..models import (
+    PHONE_SUFFIX_MAX_DIGITS, CarAssessmentRequest, OtherFeeItem, SalesProcess, normalize_phone_digits,
+)
+from ..services import kpi_snapshot, sequence
+from ..services.user_directory import ja_full_name_parts
 
 logger = logging.getLogger(__name__)
 
@@ -34,28 +43,20 @@ _CHANNEL_PREFIX = {
 
 
 def _next_seq(sequence_type: str, key: str) -> int:
-    """汎用連番発行（行ロックで重複防止）"""
-    with transaction.atomic():
-        NumberSequence.objects.get_or_create(
-            sequence_type=sequence_type,
-            key=key,
-            defaults={'last_seq': 0},
-        )
-        obj = NumberSequence.objects.select_for_update().get(
-            sequence_type=sequence_type,
-            key=key,
-        )
-        obj.last_seq += 1
-        obj.save(update_fields=['last_seq'])
-    return obj.last_seq
+    """汎用連番発行（services/sequence の 1 UPDATE で払い出し）"""
+    return sequence.next_value(sequence_type, key)
 
 
 def _generate_application_number(channel_type: str, today) -> str:
     """査定申込番号を生成"""
+    return _generate_application_numbers(channel_type, today, 1)[0]
+
+
+def _generate_application_numbers(channel_type: str, today, count: int) -> list[str]:
+    """同じチャネル・日付の査定申込番号を count 件まとめて生成（連番の更新は 1 回）"""
     ch_prefix = _CHANNEL_PREFIX.get(channel_type, 'X')
     key = f'{channel_type}-{today.strftime("%Y%m%d")}'
-    seq = _next_seq('application_number', key)
-    return f'{ch_prefix}-{today.strftime("%Y%m%d")}-{seq:04d}'
+    return [f'{ch_prefix}-{today.strftime("%Y%m%d")}-{seq:04d}' for seq in sequence.allocate('application_number', key, count)]
 
 
 def generate_case_number() -> str:
@@ -75,10 +76,9 @@ def ja_full_name(user) -> str:
     """姓名順でフルネームを返す（日本語表示用）。未設定時は username にフォールバック。"""
     if user is None:
         return ''
-    last  = (getattr(user, 'last_name',  '') or '').strip()
-    first = (getattr(user, 'first_name', '') or '').strip()
-    full  = f'{last} {first}'.strip()
-    return full or (getattr(user, 'username', '') or '')
+    return ja_full_name_parts(
+        getattr(user, 'last_name', ''), getattr(user, 'first_name', ''), getattr(user, 'username', ''),
+    )
 
 
 def _current_user_display_name(user) -> str:
@@ -86,6 +86,54 @@ def _current_user_display_name(user) -> str:
     return ja_full_name(user)
 
 
+# ---------------------------------------------------------------------------
+# CSV ストリーミング出力
+# ---------------------------------------------------------------------------
+
+# 1 回の送信にまとめる CSV のおおよそのバイト数
+_CSV_FLUSH_BYTES = 64 * 1024
+
+def _iter_csv_bytes(header, rows):
+    """BOM 付き UTF-8 の CSV をある程度まとめたバイト列で順に返す（Excel で文字化けしないよう BOM は先頭に 1 回だけ）"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    yield codecs.BOM_UTF8 + buf.getvalue().encode('utf-8')
+    buf.seek(0)
+    buf.truncate()
+
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= _CSV_FLUSH_BYTES:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode('utf-8')
+
+
+async def _aiter_csv_bytes(header, rows):
+    """_iter_csv_bytes の非同期版（ASGI 用）。DB を読む同期処理はビューと同じスレッドで 1 塊ずつ進める"""
+    chunks = _iter_csv_bytes(header, rows)
+    next_chunk = sync_to_async(lambda: next(chunks, None), thread_sensitive=True)
+    while (chunk := await next_chunk()) is not None:
+        yield chunk
+
+
+def _streaming_csv_response(request, filename: str, header, rows) -> StreamingHttpResponse:
+    """rows（行のイテラブル）を全件メモリに載せずに CSV ダウンロードとして返す
+
+    ASGI では同期イテレータを渡すと Django が送信前に全件読み切ってしまうため、非同期イテレータで返す。
+    """
+    if isinstance(request, ASGIRequest):
+        content = _aiter_csv_bytes(header, rows)
+    else:
+        content = _iter_csv_bytes(header, rows)
+    response = StreamingHttpResponse(content, content_type='text/csv; charset=utf-8-sig')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 # ---------------------------------------------------------------------------
 # 権限チェック
 # ---------------------------------------------------------------------------
@@ -104,6 +152,9 @@ def _require_manager(request):
 # 型変換ヘルパー
 # ---------------------------------------------------------------------------
 
+_PHONE_QUERY_RE = re.compile(r'[0-9０-９+＋()（）\-‐－ー―\s]+')
+
+
 def _parse_tristate(val):
     """JSON の true/false/null を BooleanField 用に変換"""
     if val is None:
@@ -111,6 +162,26 @@ def _parse_tristate(val):
     return bool(val)
 
 
+def _is_phone_query(raw: str) -> bool:
+    """検索語が電話番号（数字・ハイフン・括弧・空白のみで 3 桁以上）かどうか"""
+    return bool(_PHONE_QUERY_RE.fullmatch(raw or '')) and len(normalize_phone_digits(raw)) >= 3
+
+
+def _filter_by_phone(queryset, raw: str):
+    """電話番号の検索語で絞り込む（queryset は Customer / CarAssessmentRequest）
+
+    5 桁以上は phone_digits の前方一致（インデックスを使う）。
+    4 桁以下は下4桁での照合が主な用途のため、phone_digits の部分一致で引く（前方の数桁でも一致する）。
+    検索ドキュメントは申込番号・郵便番号・住所の数字も含むため使わない。
+    """
+    digits = normalize_phone_digits(raw)
+    if not digits:
+        return queryset.none()
+    if len(digits) <= PHONE_SUFFIX_MAX_DIGITS:
+        return queryset.filter(phone_digits__contains=digits)
+    return queryset.by_phone(digits, prefix=True)
+
+
 def _parse_date(raw: str):
     """'YYYY-MM-DD' 文字列を date に変換。空文字・不正値は None"""
     if not raw:
@@ -238,3 +309,5 @@ def _sync_other_fee(sales_process) -> None:
     total = sales_process.other_fee_items.aggregate(total=Sum('amount'))['total']
     sales_process.other_fee = total if total is not None else Decimal(0)
     SalesProcess.objects.filter(pk=sales_process.pk).update(other_fee=sales_process.other_fee)
+    # update() はシグナルが発火しないため、KPI スナップショットの再集計を明示的に依頼する
+    kpi_snapshot.mark_sales_process_dirty(sales_process)
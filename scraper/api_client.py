@@ -1,18 +1,80 @@
 """
 scraper/api_client.py — Django 内部 API クライアント
+
+接続は 1 つの requests.Session（keep-alive のコネクションプール）を使い回す。
+一時的な接続エラー・5xx は HTTPAdapter の Retry で指数バックオフしながら再送する。
+Django 側は external_service_id をキーに登録済みなら更新するだけなので、
+前回の処理が終わった後の再送なら二重登録にはならない（応答が失われた分は 2 回目に「更新」として返る）。
+読み取りタイムアウトとゲートウェイタイムアウト（504）は Django 側がまだ処理中の可能性があり、
+再送すると同じ申込を並行して登録しかねないため再送しない（次回のポーリングで拾い直す）。
 """
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 from . import config
 
 logger = logging.getLogger(__name__)
 
-INGEST_URL = f'{config.DJANGO_BASE_URL}{config.NAVIKURU_INGEST_PATH}'
+INGEST_URL       = f'{config.DJANGO_BASE_URL}{config.NAVIKURU_INGEST_PATH}'
+BATCH_INGEST_URL = f'{config.DJANGO_BASE_URL}{config.NAVIKURU_BATCH_INGEST_PATH}'
 HEADERS = {
     'Authorization': f'Bearer {config.SCRAPER_API_TOKEN}',
     'Content-Type': 'application/json',
 }
 
+# (接続, 読み取り) タイムアウト秒
+INGEST_TIMEOUT       = (5, 10)
+BATCH_INGEST_TIMEOUT = (5, 30)
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=config.INGEST_MAX_RETRIES,
+        backoff_factor=config.INGEST_RETRY_BACKOFF_SEC,
+        read=0,                               # 送信済みの POST は処理中かもしれないので再送しない
+        status_forcelist=(500, 502, 503),
+        allowed_methods=frozenset({'POST'}),  # 登録 API は external_service_id で冪等
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=max(config.INGEST_CONCURRENCY, 1),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Django API 用の共有セッション（初回のみ作成）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def close():
+    """共有セッションのコネクションを閉じる（プロセス終了時用）"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
 
 def ingest(entry: dict) -> dict:
     """
@@ -42,9 +104,97 @@ def ingest(entry: dict) -> dict:
         requests.HTTPError: API がエラーを返した場合
         requests.ConnectionError: 接続できない場合
     """
-    response = requests.post(INGEST_URL, json=entry, headers=HEADERS, timeout=10)
+    response = get_session().post(INGEST_URL, json=entry, timeout=INGEST_TIMEOUT)
     response.raise_for_status()
     result = response.json()
     if result.get('created'):
         logger.info(f"[api_client] 新規登録: {result.get('application_number')} (外部ID: {entry.get('external_service_id')})")
     return result
+
+
+def batches(entries: list[dict], size: int = config.INGEST_BATCH_SIZE):
+    """entries を一括登録 API に送る単位（size 件ずつ）に分割する"""
+    for start in range(0, len(entries), size):
+        yield entries[start:start + size]
+
+
+def ingest_batch(entries: list[dict]) -> list[dict]:
+    """
+    複数エントリを 1 リクエストで Django 内部 API に送信する。
+
+    Args:
+        entries: ingest() と同じ形式のエントリのリスト（INGEST_BATCH_SIZE 件以下）
+
+    Returns:
+        entries と同じ順序の結果リスト。各要素は
+        {'external_service_id': str, 'created': bool, 'id': int, 'application_number': str}
+        または検証エラー時 {'external_service_id': str, 'error': str}
+
+    Raises:
+        requests.HTTPError: API がエラーを返した場合（再送しても失敗した場合を含む）
+        requests.ConnectionError: 接続できない場合
+    """
+    if not entries:
+        return []
+    response = get_session().post(BATCH_INGEST_URL, json={'entries': entries}, timeout=BATCH_INGEST_TIMEOUT)
+    response.raise_for_status()
+    results = response.json()['results']
+    for result in results:
+        if result.get('created'):
+            logger.info(f"[api_client] 新規登録: {result.get('application_number')} (外部ID: {result.get('external_service_id')})")
+        elif result.get('error'):
+            logger.warning(f"[api_client] 登録エラー (外部ID: {result.get('external_service_id')}): {result['error']}")
+    return results
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    """昇順ソート済みの値の pct パーセンタイル（nearest-rank）"""
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def ingest_all(entries: list[dict]) -> list[dict]:
+    """
+    エントリを INGEST_BATCH_SIZE 件ずつのバッチに分け、最大 INGEST_CONCURRENCY 並列で送信する。
+
+    同じ external_service_id のエントリは先頭の 1 件だけ送る（並列バッチ間での二重登録を防ぐ）。
+    送信に失敗したバッチのエントリは {'external_service_id': str, 'error': str, 'retryable': True}
+    として返す（例外は送出しない）。バッチごとの応答時間のパーセンタイルをログに出す。
+
+    Returns:
+        重複除去後のエントリと同じ順序の結果リスト
+    """
+    unique, seen = [], set()
+    for entry in entries:
+        external_service_id = entry.get('external_service_id')
+        if external_service_id in seen:
+            continue
+        seen.add(external_service_id)
+        unique.append(entry)
+    if not unique:
+        return []
+
+    def send(batch):
+        started = time.perf_counter()
+        try:
+            results = ingest_batch(batch)
+        except requests.RequestException as e:
+            logger.error(f'[api_client] 一括送信失敗 ({len(batch)} 件): {e}')
+            results = [
+                {'external_service_id': entry.get('external_service_id'), 'error': str(e), 'retryable': True}
+                for entry in batch
+            ]
+        return results, time.perf_counter() - started
+
+    chunks = list(batches(unique))
+    workers = max(1, min(config.INGEST_CONCURRENCY, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingest') as pool:
+        outcomes = list(pool.map(send, chunks))
+
+    latencies = sorted(elapsed * 1000 for _, elapsed in outcomes)
+    logger.info(
+        f'[api_client] 一括送信: {len(unique)} 件 / {len(chunks)} バッチ (並列 {workers}) — '
+        f'p50={_percentile(latencies, 50):.0f}ms p90={_percentile(latencies, 90):.0f}ms '
+        f'p99={_percentile(latencies, 99):.0f}ms max={latencies[-1]:.0f}ms'
+    )
+    return [result for results, _ in outcomes for result in results]
@@ -16,6 +16,9 @@ NAVIKURU_LIST_PATH = os.getenv('NAVIKURU_LIST_PATH', '/member/satei')
 NAVIKURU_USERNAME  = os.getenv('NAVIKURU_USERNAME', '')
 NAVIKURU_PASSWORD  = os.getenv('NAVIKURU_PASSWORD', '')
 
+# 複数ページ取得時に先読みする並列数（1 で逐次取得）
+NAVIKURU_FETCH_CONCURRENCY = int(os.getenv('NAVIKURU_FETCH_CONCURRENCY', '4'))
+
 # ── 導出 URL ─────────────────────────────────────────────────────────
 NAVIKURU_LIST_URL = NAVIKURU_BASE_URL + NAVIKURU_LIST_PATH
 
@@ -23,10 +26,18 @@ NAVIKURU_LIST_URL = NAVIKURU_BASE_URL + NAVIKURU_LIST_PATH
 DJANGO_BASE_URL      = os.getenv('DJANGO_BASE_URL', 'http://localhost:8000')
 SCRAPER_API_TOKEN    = os.getenv('SCRAPER_API_TOKEN', '')
 NAVIKURU_INGEST_PATH = '/sateiinfo/internal/scraper/navikuru/'
+NAVIKURU_BATCH_INGEST_PATH = '/sateiinfo/internal/scraper/navikuru/batch/'
+# 一括登録 API に 1 リクエストで送る件数（Django 側の上限は 500 件）
+INGEST_BATCH_SIZE    = int(os.getenv('INGEST_BATCH_SIZE', '100'))
+# 一括登録 API への同時送信数（バッチ単位）
+INGEST_CONCURRENCY   = int(os.getenv('INGEST_CONCURRENCY', '4'))
+# 接続エラー・5xx（504 を除く）時の再送回数と指数バックオフの基準秒数
+INGEST_MAX_RETRIES       = int(os.getenv('INGEST_MAX_RETRIES', '3'))
+INGEST_RETRY_BACKOFF_SEC = float(os.getenv('INGEST_RETRY_BACKOFF_SEC', '0.5'))
 
 # ── ポーリング設定 ────────────────────────────────────────────────────
-# 営業時間内（ACTIVE_HOURS_START〜ACTIVE_HOURS_END JST）は短い間隔で変更検知、
-# 営業時間外はフルフェッチのみ実施する。
+# 間隔は scheduler.py が新着の到着ペースから決める。
+# 営業時間内 / 外の間隔は、その曜日・時間帯の履歴がまだ少ないときの既定値として使う。
 POLL_INTERVAL_ACTIVE_SEC = int(os.getenv('POLL_INTERVAL_ACTIVE_SEC', '30'))    # 営業時間内
 POLL_INTERVAL_IDLE_SEC   = int(os.getenv('POLL_INTERVAL_IDLE_SEC',   '3600'))  # 営業時間外
 ACTIVE_HOURS_START       = os.getenv('ACTIVE_HOURS_START', '08:30')            # JST HH:MM
@@ -34,6 +45,25 @@ ACTIVE_HOURS_END         = os.getenv('ACTIVE_HOURS_END',   '21:00')            #
 SESSION_REFRESH_MIN      = int(os.getenv('SESSION_REFRESH_MIN', '30'))
 MAX_CONSECUTIVE_ERRORS   = int(os.getenv('MAX_CONSECUTIVE_ERRORS', '5'))
 
+# 適応ポーリング（scheduler.py）
+POLL_INTERVAL_MIN_SEC         = float(os.getenv('POLL_INTERVAL_MIN_SEC', '10'))
+POLL_INTERVAL_MAX_SEC         = float(os.getenv('POLL_INTERVAL_MAX_SEC', '3600'))
+POLL_TARGET_ARRIVALS_PER_POLL = float(os.getenv('POLL_TARGET_ARRIVALS_PER_POLL', '0.1'))  # 1 回あたりの期待新着件数
+POLL_HISTORY_WEEKS            = int(os.getenv('POLL_HISTORY_WEEKS', '8'))
+POLL_BURST_WINDOW_SEC         = float(os.getenv('POLL_BURST_WINDOW_SEC', '900'))
+POLL_BURST_FACTOR             = float(os.getenv('POLL_BURST_FACTOR', '3'))
+POLL_BURST_MIN_PER_HOUR       = float(os.getenv('POLL_BURST_MIN_PER_HOUR', '4'))  # 平常がこれ未満でもこの値を基準にする
+POLL_QUIET_GRACE_POLLS        = int(os.getenv('POLL_QUIET_GRACE_POLLS', '5'))
+POLL_QUIET_MAX_SEC            = float(os.getenv('POLL_QUIET_MAX_SEC', '600'))
+POLL_ERROR_BACKOFF_MAX_SEC    = float(os.getenv('POLL_ERROR_BACKOFF_MAX_SEC', '600'))
+SCHEDULER_METRICS_PATH        = os.getenv('SCHEDULER_METRICS_PATH', '')  # 空なら出力しない
+
+# ── 永続状態（ウォーターマーク・outbox） ─────────────────────────────
+STATE_DB_PATH = os.getenv('SCRAPER_STATE_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state.sqlite3'))
+OUTBOX_DRAIN_LIMIT    = int(os.getenv('OUTBOX_DRAIN_LIMIT', '1000'))       # 1 ポーリングで送る最大件数
+OUTBOX_RETRY_BASE_SEC = float(os.getenv('OUTBOX_RETRY_BASE_SEC', '30'))    # 再送間隔（失敗ごとに倍）
+OUTBOX_RETRY_MAX_SEC  = float(os.getenv('OUTBOX_RETRY_MAX_SEC', '1800'))   # 再送間隔の上限
+
 # ── 日次リカバリー設定 ────────────────────────────────────────────────
 # reconcile.py が遡る時間数（デフォルト25時間: 1日 + 1時間の余裕）
 RECONCILE_LOOKBACK_HOURS = int(os.getenv('RECONCILE_LOOKBACK_HOURS', '25'))
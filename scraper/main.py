@@ -5,11 +5,15 @@ supervisord から起動されることを想定。
 シグナル受信で graceful shutdown する。
 
 ポーリング戦略:
-  営業時間内（ACTIVE_HOURS_START〜ACTIVE_HOURS_END JST）
-    → POLL_INTERVAL_ACTIVE_SEC ごとにpage1のみ取得して変更検知。
-      最新エントリIDが変化した時だけ fetch_entries_until_id() でフルフェッチ（ページネーション対応）。
-  営業時間外
-    → POLL_INTERVAL_IDLE_SEC ごとに fetch_entries_until_id() でフルフェッチ。
+  毎回 page1 のみ取得して変更検知
+  （条件付きリクエスト + 一覧テーブルのハッシュ比較。変化がなければパースしない）。
+  最新エントリIDが変化した時だけ fetch_entries_until_id() でフルフェッチ（ページネーション対応）。
+  次のポーリングまでの間隔は scheduler.py が新着の到着ペース・連続エラー・閑散度から決める。
+
+取り込み:
+  取得したエントリはローカルの outbox（scraper/state.py）に積んでから Django API に送る。
+  最新エントリID（ウォーターマーク）も同じファイルに保存し、再起動後はそこから再開する。
+  送信に失敗したエントリは outbox に残り、毎ポーリングで再送される。
 """
 import logging
 import signal
@@ -19,6 +23,8 @@ from datetime import datetime, timedelta, timezone
 
 from . import api_client, config
 from .navikuru import NavikuruScraper
+from .scheduler import AdaptiveScheduler
+from .state import ScraperState
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,7 +35,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 _shutdown = False
-JST = timezone(timedelta(hours=9))
 
 
 def _handle_signal(signum, frame):
@@ -42,37 +47,44 @@ signal.signal(signal.SIGTERM, _handle_signal)
 signal.signal(signal.SIGINT, _handle_signal)
 
 
-def is_active_hours() -> bool:
-    """現在時刻が営業時間内（ACTIVE_HOURS_START〜ACTIVE_HOURS_END JST）かどうか"""
-    now = datetime.now(JST)
-    sh, sm = map(int, config.ACTIVE_HOURS_START.split(':'))
-    eh, em = map(int, config.ACTIVE_HOURS_END.split(':'))
-    start = now.replace(hour=sh, minute=sm, second=0, microsecond=0)
-    end   = now.replace(hour=eh, minute=em, second=0, microsecond=0)
-    return start <= now < end
+def _drain_outbox(state: ScraperState) -> int:
+    """outbox の送信時刻に達したエントリを Django API に送り、新規件数を返す。
 
+    受信確認が取れたエントリ（検証エラーで登録できないものを含む）は outbox から消し、
+    送信に失敗したエントリは指数バックオフで再送を予約する。
+    """
+    entries = state.due_entries(config.OUTBOX_DRAIN_LIMIT)
+    if not entries:
+        return 0
 
-def _ingest_entries(entries: list[dict]) -> int:
-    """エントリをインジェストし、新規件数を返す。"""
-    new_count = 0
-    for entry in entries:
-        result = api_client.ingest(entry)
-        if result.get('created'):
-            new_count += 1
-    return new_count
+    results = api_client.ingest_all(entries)
+    acked = [result['external_service_id'] for result in results if not result.get('retryable')]
+    failures = {result['external_service_id']: result['error'] for result in results if result.get('retryable')}
+    state.ack(acked)
+    if failures:
+        state.retry_later(failures)
+        logger.warning(f'[main] 送信失敗 {len(failures)} 件を再送待ちにしました（outbox 残り {state.pending_count()} 件）')
+    return sum(1 for result in results if result.get('created'))
 
 
 def run():
     logger.info('[main] スクレイパー起動')
     scraper = NavikuruScraper()
+    state = ScraperState(
+        config.STATE_DB_PATH,
+        retry_base_sec=config.OUTBOX_RETRY_BASE_SEC,
+        retry_max_sec=config.OUTBOX_RETRY_MAX_SEC,
+    )
+    scheduler = AdaptiveScheduler(state)
     consecutive_errors = 0
     last_login_at: datetime | None = None
-    last_known_id: str | None = None  # 変更検知 & ID打ち切りの基準
+    last_known_id: str | None = state.get_watermark()  # 変更検知 & ID打ち切りの基準（再起動後も引き継ぐ）
+    logger.info(f'[main] 再開位置: {last_known_id or "(なし)"} / outbox 未送信 {state.pending_count()} 件')
+    # 起動直後・エラー明けの取得は止まっていた間の回収分（到着ペースの履歴に数えない）
+    catching_up = True
 
     while not _shutdown:
         now = datetime.now(timezone.utc)
-        active = is_active_hours()
-        poll_interval = config.POLL_INTERVAL_ACTIVE_SEC if active else config.POLL_INTERVAL_IDLE_SEC
 
         # セッション維持・再ログイン
         needs_relogin = (
@@ -86,62 +98,69 @@ def run():
                 consecutive_errors = 0
             except Exception as e:
                 consecutive_errors += 1
+                scheduler.record_error()
+                catching_up = True
                 logger.error(f'[main] ログイン失敗 ({consecutive_errors}/{config.MAX_CONSECUTIVE_ERRORS}): {e}')
                 if consecutive_errors >= config.MAX_CONSECUTIVE_ERRORS:
                     logger.critical('[main] 連続エラー上限に達しました。プロセスを終了します。')
                     sys.exit(1)
-                _sleep(poll_interval)
+                _sleep(scheduler.next_decision().interval)
                 continue
 
         try:
-            if active:
-                # ── 営業時間内: 変更検知 → 新着時のみフルフェッチ ──────────────
-                page1 = scraper.fetch_new_entries(max_pages=1)
-                if not page1 or page1[0]['external_service_id'] == last_known_id:
-                    logger.debug('[main] 変更なし — スキップ')
-                    consecutive_errors = 0
-                    _sleep(poll_interval)
-                    continue
-
-                # 新着あり: ID打ち切りでフルフェッチ（ページネーション対応）
-                new_entries = (
-                    scraper.fetch_entries_until_id(last_known_id)
-                    if last_known_id is not None
-                    else page1  # 初回起動時はpage1のみ使用
-                )
+            # 変更検知: 1 ページ目が前回から変化していなければ None（パースもしない）
+            page1 = scraper.poll_first_page()
+            if not page1 or page1[0]['external_service_id'] == last_known_id:
+                logger.debug('[main] 変更なし')
+                new_entries = []
+            elif last_known_id is None:
+                # 初回起動時は page1 のみ使用（以前からある申込なので新着としては数えない）
+                new_entries = page1
+                catching_up = True
             else:
-                # ── 営業時間外: ID打ち切りでフルフェッチ（ページネーション対応）──
-                new_entries = (
-                    scraper.fetch_entries_until_id(last_known_id)
-                    if last_known_id is not None
-                    else scraper.fetch_new_entries(max_pages=1)  # 初回起動時
-                )
-
-            new_count = _ingest_entries(new_entries)
+                # 新着あり: ID打ち切りでフルフェッチ（ページネーション対応）
+                new_entries = scraper.fetch_entries_until_id(last_known_id)
+                # 前回のウォーターマークが一覧から消えていた場合は全ページ分なので新着として数えない
+                catching_up = catching_up or not scraper.stop_id_found
+
+            # 取得したエントリを outbox に積んでからウォーターマークを進める（送信失敗でも取りこぼさない）
             if new_entries:
+                state.stage(new_entries, new_entries[0]['external_service_id'])
                 last_known_id = new_entries[0]['external_service_id']
+            scheduler.record_success(len(new_entries), catch_up=catching_up)
+            catching_up = False
+
+            new_count = _drain_outbox(state)
             if new_count:
                 logger.info(f'[main] 新規登録: {new_count} 件')
             consecutive_errors = 0
 
         except Exception as e:
+            # outbox に積めなかった新着を次回の変更検知で「変化なし」と判定しないようにする
+            scraper.reset_change_detection()
+            scheduler.record_error()
+            catching_up = True
             consecutive_errors += 1
             logger.error(f'[main] 取得/インジェスト失敗 ({consecutive_errors}/{config.MAX_CONSECUTIVE_ERRORS}): {e}')
             if consecutive_errors >= config.MAX_CONSECUTIVE_ERRORS:
                 logger.critical('[main] 連続エラー上限に達しました。プロセスを終了します。')
                 sys.exit(1)
 
-        _sleep(poll_interval)
+        _sleep(scheduler.next_decision().interval)
 
+    api_client.close()
+    state.close()
     logger.info('[main] シャットダウン完了')
 
 
-def _sleep(seconds: int):
+def _sleep(seconds: float):
     """シグナルで中断できるよう 1 秒刻みでスリープ。"""
-    for _ in range(seconds):
-        if _shutdown:
+    deadline = time.monotonic() + seconds
+    while not _shutdown:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
             break
-        time.sleep(1)
+        time.sleep(min(1.0, remaining))
 
 
 if __name__ == '__main__':
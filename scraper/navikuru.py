@@ -13,19 +13,45 @@ https://coop-admin.otokuru.com にログインし、
   - テーブル: table.custom-table tbody tr.d-flex
   - 各行の td 順: [申込情報, 個人情報, 車種情報, ステータス, メモ, 更新]
   - ページネーション: ?page=N
+
+複数ページの取得（日次照合・停止明けの追いつき）は、2 ページ目以降を
+NAVIKURU_FETCH_CONCURRENCY 並列で先読みする。打ち切り条件（stop_id / since_dt）に
+達した時点で未着手の先読みは取り消す。各レスポンスの HTML パースは 1 回だけ。
+
+営業時間内の変更検知（poll_first_page）は ETag / Last-Modified があれば条件付きリクエストにし、
+さらに一覧テーブル部分の生 HTML のハッシュが前回と同じならパースせずに「変化なし」を返す。
 """
+import hashlib
 import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from urllib.parse import urljoin
 
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup, Comment, NavigableString
 
 from . import config
 
 logger = logging.getLogger(__name__)
 
+PAGE_TIMEOUT = 15
+
+# 変更検知で比較する一覧テーブル部分（ページ内の CSRF トークン等の変化を無視する）
+_ROW_TABLE_RE = re.compile(r'<table[^>]*custom-table.*?</table>', re.S)
+_LOGIN_FORM_MARKER = 'signin[username]'
+
+
+@dataclass
+class _Page:
+    """一覧 1 ページ分の取得結果"""
+    number: int
+    entries: list[dict]
+    has_next: bool
+
 
 class NavikuruScraper:
     def __init__(self):
@@ -34,7 +60,19 @@ class NavikuruScraper:
             'User-Agent': 'Mozilla/5.0 (compatible; GigiScraper/1.0)',
             'Accept-Language': 'ja,en;q=0.9',
         })
+        # 先読みの並列数ぶん keep-alive 接続を保持する
+        adapter = HTTPAdapter(pool_maxsize=max(config.NAVIKURU_FETCH_CONCURRENCY, 1))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self._logged_in = False
+        self._login_lock = threading.Lock()
+        self._login_generation = 0
+        # 1 ページ目の変更検知用（前回の検証子と一覧テーブルのハッシュ）
+        self._page1_etag          = None
+        self._page1_last_modified = None
+        self._page1_hash          = None
+        # 直前の fetch_entries_until_id で stop_id まで辿り着けたか
+        self.stop_id_found = False
 
     # ──────────────────────────────────────────────
     # 認証
@@ -136,33 +174,65 @@ class NavikuruScraper:
         logger.info(f'[navikuru] 一覧取得開始 (max_pages={max_pages})')
 
         all_entries = []
-        for page in range(1, max_pages + 1):
-            url = config.NAVIKURU_LIST_URL if page == 1 else f'{config.NAVIKURU_LIST_URL}?page={page}'
-            resp = self.session.get(url, timeout=15)
+        for page in self._iter_pages(max_pages=max_pages):
+            all_entries.extend(page.entries)
 
-            if self._needs_login(BeautifulSoup(resp.text, 'lxml')):
-                logger.warning('[navikuru] セッション切れ — 再ログイン')
-                self._logged_in = False
-                self.login()
-                resp = self.session.get(url, timeout=15)
+        logger.info(f'[navikuru] {len(all_entries)} 件取得')
+        return all_entries
 
-            resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, 'lxml')
-            entries = self._parse_entries(soup)
-            all_entries.extend(entries)
+    def poll_first_page(self) -> list[dict] | None:
+        """
+        変更検知用に 1 ページ目を取得する。前回から変化がなければ None を返す（HTML をパースしない）。
 
-            # 次ページが存在しない場合は終了
-            if not self._has_next_page(soup, page):
-                break
+          - 前回の ETag / Last-Modified を送り、304 なら変化なし
+          - 一覧テーブル部分の生 HTML のハッシュが前回と同じなら変化なし
+          - 変化があればパースしてエントリを返す
 
-        logger.info(f'[navikuru] {len(all_entries)} 件取得')
-        return all_entries
+        取り込みに失敗した場合は reset_change_detection() を呼び、次回は必ずパースさせること。
+        """
+        self.ensure_logged_in()
+        url = self._page_url(1)
+        headers = {}
+        if self._page1_etag:
+            headers['If-None-Match'] = self._page1_etag
+        if self._page1_last_modified:
+            headers['If-Modified-Since'] = self._page1_last_modified
+
+        generation = self._login_generation
+        resp = self.session.get(url, headers=headers, timeout=PAGE_TIMEOUT)
+        if resp.status_code == 304:
+            logger.debug('[navikuru] 1 ページ目: 304 Not Modified')
+            return None
+
+        if _LOGIN_FORM_MARKER in resp.text:
+            self._relogin(generation)
+            resp = self.session.get(url, timeout=PAGE_TIMEOUT)
+        resp.raise_for_status()
+
+        self._page1_etag          = resp.headers.get('ETag')
+        self._page1_last_modified = resp.headers.get('Last-Modified')
+
+        match = _ROW_TABLE_RE.search(resp.text)
+        digest = hashlib.sha256((match.group(0) if match else resp.text).encode('utf-8')).hexdigest()
+        if digest == self._page1_hash:
+            logger.debug('[navikuru] 1 ページ目: 一覧テーブル変化なし')
+            return None
+        self._page1_hash = digest
+
+        return self._parse_entries(BeautifulSoup(resp.text, 'lxml'))
+
+    def reset_change_detection(self) -> None:
+        """変更検知の記録を破棄する（次回の poll_first_page は必ずパースする）"""
+        self._page1_etag          = None
+        self._page1_last_modified = None
+        self._page1_hash          = None
 
     def fetch_entries_until_id(self, stop_id: str) -> list[dict]:
         """
         stop_id（external_service_id）に一致するエントリが現れるまでページを取得し、
         それより新しいエントリのみ返す。
         一覧は新着順なので stop_id が見つかった時点でページネーションを終了する。
+        stop_id が見つからず全ページを取得した場合は self.stop_id_found が False になる。
 
         Args:
             stop_id: この external_service_id を持つエントリの直前で取得を止める
@@ -173,41 +243,26 @@ class NavikuruScraper:
         self.ensure_logged_in()
         logger.info(f'[navikuru] ID打ち切り取得開始 (stop_id={stop_id})')
         all_entries = []
-        page = 1
-
-        while True:
-            url = config.NAVIKURU_LIST_URL if page == 1 else f'{config.NAVIKURU_LIST_URL}?page={page}'
-            resp = self.session.get(url, timeout=15)
-
-            if self._needs_login(BeautifulSoup(resp.text, 'lxml')):
-                logger.warning('[navikuru] セッション切れ — 再ログイン')
-                self._logged_in = False
-                self.login()
-                resp = self.session.get(url, timeout=15)
+        found_stop = False
 
-            resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, 'lxml')
-            entries = self._parse_entries(soup)
-
-            if not entries:
+        for page in self._iter_pages():
+            if not page.entries:
                 break
 
             page_entries = []
-            found_stop = False
-            for entry in entries:
+            for entry in page.entries:
                 if entry['external_service_id'] == stop_id:
                     found_stop = True
                     break
                 page_entries.append(entry)
 
             all_entries.extend(page_entries)
-            logger.info(f'[navikuru] page={page}: {len(entries)} 件取得, うち対象 {len(page_entries)} 件')
+            logger.info(f'[navikuru] page={page.number}: {len(page.entries)} 件取得, うち対象 {len(page_entries)} 件')
 
-            if found_stop or not self._has_next_page(soup, page):
+            if found_stop:
                 break
 
-            page += 1
-
+        self.stop_id_found = found_stop
         logger.info(f'[navikuru] ID打ち切り取得完了: 合計 {len(all_entries)} 件')
         return all_entries
 
@@ -228,29 +283,15 @@ class NavikuruScraper:
 
         logger.info(f'[navikuru] 差分取得開始 (since={since_dt.isoformat()})')
         all_entries = []
-        page = 1
 
-        while True:
-            url = config.NAVIKURU_LIST_URL if page == 1 else f'{config.NAVIKURU_LIST_URL}?page={page}'
-            resp = self.session.get(url, timeout=15)
-
-            if self._needs_login(BeautifulSoup(resp.text, 'lxml')):
-                logger.warning('[navikuru] セッション切れ — 再ログイン')
-                self._logged_in = False
-                self.login()
-                resp = self.session.get(url, timeout=15)
-
-            resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, 'lxml')
-            entries = self._parse_entries(soup)
-
-            if not entries:
+        for page in self._iter_pages():
+            if not page.entries:
                 break
 
             # 新着順なので、このページの最古エントリで打ち切り判断
             stop_after_this_page = False
             page_entries = []
-            for entry in entries:
+            for entry in page.entries:
                 entry_dt = self._parse_entry_datetime(entry.get('application_datetime', ''))
                 if entry_dt is None or entry_dt >= since_dt:
                     page_entries.append(entry)
@@ -258,16 +299,88 @@ class NavikuruScraper:
                     stop_after_this_page = True
 
             all_entries.extend(page_entries)
-            logger.info(f'[navikuru] page={page}: {len(entries)} 件取得, うち対象 {len(page_entries)} 件')
+            logger.info(f'[navikuru] page={page.number}: {len(page.entries)} 件取得, うち対象 {len(page_entries)} 件')
 
-            if stop_after_this_page or not self._has_next_page(soup, page):
+            if stop_after_this_page:
                 break
 
-            page += 1
-
         logger.info(f'[navikuru] 差分取得完了: 合計 {len(all_entries)} 件')
         return all_entries
 
+    # ──────────────────────────────────────────────
+    # ページ取得
+    # ──────────────────────────────────────────────
+
+    @staticmethod
+    def _page_url(page: int) -> str:
+        return config.NAVIKURU_LIST_URL if page == 1 else f'{config.NAVIKURU_LIST_URL}?page={page}'
+
+    def _relogin(self, expired_at: int) -> None:
+        """セッション切れ時の再ログイン。並列取得中は最初に気づいたスレッドだけがログインする"""
+        with self._login_lock:
+            if self._login_generation != expired_at:
+                return  # 他のスレッドが再ログイン済み
+            logger.warning('[navikuru] セッション切れ — 再ログイン')
+            self._logged_in = False
+            self.login()
+            self._login_generation += 1
+
+    def _fetch_page(self, page: int) -> _Page:
+        """一覧ページを 1 件取得してパースする（セッション切れなら再ログインして取り直す）"""
+        url = self._page_url(page)
+        generation = self._login_generation
+        resp = self.session.get(url, timeout=PAGE_TIMEOUT)
+        soup = BeautifulSoup(resp.text, 'lxml')
+
+        if self._needs_login(soup):
+            self._relogin(generation)
+            resp = self.session.get(url, timeout=PAGE_TIMEOUT)
+            soup = BeautifulSoup(resp.text, 'lxml')
+
+        resp.raise_for_status()
+        return _Page(page, self._parse_entries(soup), self._has_next_page(soup, page))
+
+    def _iter_pages(self, max_pages: int | None = None, concurrency: int | None = None):
+        """
+        1 ページ目から順にページを返すジェネレータ。次ページがなくなるか max_pages に達したら終わる。
+
+        1 ページ目は単独で取得し、呼び出し側が 2 ページ目を要求した時点から
+        concurrency ページ分を並列で先読みする。呼び出し側がループを抜けると
+        未着手の先読みは取り消される（実行中のリクエストは完了を待たずに破棄）。
+        """
+        concurrency = max(1, concurrency or config.NAVIKURU_FETCH_CONCURRENCY)
+        last_page = max_pages or float('inf')
+
+        page = self._fetch_page(1)
+        yield page
+        if not page.has_next or last_page <= 1:
+            return
+
+        if concurrency == 1:
+            while page.has_next and page.number < last_page:
+                page = self._fetch_page(page.number + 1)
+                yield page
+            return
+
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='navikuru')
+        pending = {}
+        try:
+            next_to_submit = 2
+            current = 2
+            while current <= last_page:
+                while next_to_submit <= last_page and next_to_submit < current + concurrency:
+                    pending[next_to_submit] = pool.submit(self._fetch_page, next_to_submit)
+                    next_to_submit += 1
+                page = pending.pop(current).result()
+                yield page
+                if not page.has_next:
+                    return
+                current += 1
+        finally:
+            for future in pending.values():
+                future.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+
     # ──────────────────────────────────────────────
     # HTML パース
     # ──────────────────────────────────────────────
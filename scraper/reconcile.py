@@ -43,16 +43,14 @@ def run():
         sys.exit(1)
 
     created = updated = errors = 0
-    for entry in entries:
-        try:
-            result = api_client.ingest(entry)
-            if result.get('created'):
-                created += 1
-            else:
-                updated += 1
-        except Exception as e:
+    for result in api_client.ingest_all(entries):
+        if result.get('error'):
             errors += 1
-            logger.error(f'[reconcile] インジェスト失敗 (external_id={entry.get("external_service_id")}): {e}')
+            logger.error(f'[reconcile] インジェスト失敗 (external_id={result.get("external_service_id")}): {result["error"]}')
+        elif result.get('created'):
+            created += 1
+        else:
+            updated += 1
 
     logger.info(f'[reconcile] 完了 — 新規: {created}, 更新: {updated}, エラー: {errors}')
     if errors:
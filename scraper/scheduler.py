@@ -0,0 +1,195 @@
+"""
+scraper/scheduler.py — 新着の到着ペースに合わせたポーリング間隔の決定
+
+固定の 2 段階（営業時間内 / 外）の代わりに、次の順で間隔を決める。
+
+  1. エラー     : 連続エラー回数に応じて指数バックオフ（POLL_ERROR_BACKOFF_MAX_SEC まで）
+  2. バースト   : 直近 POLL_BURST_WINDOW_SEC の到着ペースが平常の POLL_BURST_FACTOR 倍以上なら最短間隔
+  3. 到着ペース : 同じ曜日・時間帯の過去 POLL_HISTORY_WEEKS 週の平均新着件数から、
+                  1 回のポーリングあたりの期待新着件数が POLL_TARGET_ARRIVALS_PER_POLL になる間隔
+                  （履歴が少ない時間帯は従来の営業時間内 / 外の間隔を使う）
+  4. 閑散       : 新着なしが POLL_QUIET_GRACE_POLLS 回を超えて続くと 1 回ごとに間隔を倍にする
+                  （POLL_QUIET_MAX_SEC まで。3. の間隔がそれより長ければ 3. のまま）
+
+営業時間内は 3.・4. の間隔も POLL_INTERVAL_ACTIVE_SEC を上限にする（反響への初動を遅らせない）。
+間隔は常に POLL_INTERVAL_MIN_SEC〜POLL_INTERVAL_MAX_SEC に収める。
+到着ペースの履歴には、前回のポーリング以降に届いた新着だけを記録する
+（起動直後・エラー明けの取りこぼし回収は record_success(..., catch_up=True) で記録から外す）。
+判断結果は INFO ログ（理由が変わったとき）と、SCHEDULER_METRICS_PATH 指定時は
+Prometheus の textfile 形式（node_exporter の textfile collector 用）で出力する。
+"""
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from . import config
+from .state import ScraperState
+
+logger = logging.getLogger(__name__)
+
+JST = timezone(timedelta(hours=9))
+
+# 履歴の平均を使い始める最小の記録時間数（それ未満は営業時間内 / 外の既定間隔）
+_MIN_HISTORY_SAMPLES = 3
+
+
+@dataclass(frozen=True)
+class PollDecision:
+    interval: float
+    reason: str                      # error / burst / rate / default / quiet
+    expected_per_hour: float | None  # 同じ曜日・時間帯の平均新着件数（履歴不足なら None）
+    recent_per_hour: float           # 直近ウィンドウの到着ペース
+    empty_streak: int
+    error_streak: int
+
+
+def _slot(ts: float) -> tuple[int, int, int]:
+    """(時間帯の開始 UNIX 秒, 曜日, 時) を JST で返す"""
+    local = datetime.fromtimestamp(ts, JST).replace(minute=0, second=0, microsecond=0)
+    return int(local.timestamp()), local.weekday(), local.hour
+
+
+def _is_active_hours(ts: float) -> bool:
+    now = datetime.fromtimestamp(ts, JST)
+    sh, sm = map(int, config.ACTIVE_HOURS_START.split(':'))
+    eh, em = map(int, config.ACTIVE_HOURS_END.split(':'))
+    start = now.replace(hour=sh, minute=sm, second=0, microsecond=0)
+    end   = now.replace(hour=eh, minute=em, second=0, microsecond=0)
+    return start <= now < end
+
+
+class AdaptiveScheduler:
+    def __init__(self, state: ScraperState, clock=time.time):
+        self._state = state
+        self._clock = clock
+        self._recent = deque()  # (到着時刻, 件数)
+        self._empty_streak = 0
+        self._error_streak = 0
+        self._polls_total = 0
+        self._arrivals_total = 0
+        self._errors_total = 0
+        self._last_decision: PollDecision | None = None
+        self._pruned_at = float('-inf')
+
+    # ── 結果の記録 ─────────────────────────────────
+
+    def record_success(self, new_count: int, *, catch_up: bool = False) -> None:
+        """ポーリング成功（new_count = 前回のポーリング以降に届いた新着件数）
+
+        catch_up=True は起動直後・エラー明けなど、前回から間が空いた回収分。
+        いつ届いたか分からないため、到着ペースの履歴・直近ペース・新着なし回数には数えない。
+        """
+        now = self._clock()
+        self._polls_total += 1
+        self._error_streak = 0
+        if catch_up:
+            return
+        self._state.record_arrivals(*_slot(now), new_count)
+        self._arrivals_total += new_count
+        if new_count:
+            self._recent.append((now, new_count))
+            self._empty_streak = 0
+        else:
+            self._empty_streak += 1
+
+        # 履歴は 1 日 1 回、保持期間を過ぎた分を削除する
+        if now - self._pruned_at >= 86400:
+            self._state.prune_arrivals(int(now - config.POLL_HISTORY_WEEKS * 7 * 86400))
+            self._pruned_at = now
+
+    def record_error(self) -> None:
+        self._polls_total += 1
+        self._errors_total += 1
+        self._error_streak += 1
+
+    # ── 間隔の決定 ─────────────────────────────────
+
+    def _recent_per_hour(self, now: float) -> float:
+        window = config.POLL_BURST_WINDOW_SEC
+        while self._recent and self._recent[0][0] < now - window:
+            self._recent.popleft()
+        return sum(count for _, count in self._recent) * 3600 / window
+
+    def next_decision(self) -> PollDecision:
+        now = self._clock()
+        _, weekday, hour = _slot(now)
+        samples, average = self._state.slot_arrival_stats(
+            weekday, hour, since=int(now - config.POLL_HISTORY_WEEKS * 7 * 86400),
+        )
+        expected = average if samples >= _MIN_HISTORY_SAMPLES else None
+        recent = self._recent_per_hour(now)
+        lower, upper = config.POLL_INTERVAL_MIN_SEC, config.POLL_INTERVAL_MAX_SEC
+
+        if self._error_streak:
+            reason = 'error'
+            interval = min(lower * 2 ** self._error_streak, config.POLL_ERROR_BACKOFF_MAX_SEC)
+        elif recent and recent >= max(expected or 0, config.POLL_BURST_MIN_PER_HOUR) * config.POLL_BURST_FACTOR:
+            reason = 'burst'
+            interval = lower
+        else:
+            if expected is None:
+                reason = 'default'
+                interval = config.POLL_INTERVAL_ACTIVE_SEC if _is_active_hours(now) else config.POLL_INTERVAL_IDLE_SEC
+            else:
+                reason = 'rate'
+                interval = 3600 * config.POLL_TARGET_ARRIVALS_PER_POLL / max(expected, 1e-6)
+            quiet_polls = self._empty_streak - config.POLL_QUIET_GRACE_POLLS
+            if quiet_polls > 0:
+                reason = 'quiet'
+                interval = min(interval * 2 ** min(quiet_polls, 16), max(interval, config.POLL_QUIET_MAX_SEC))
+            if _is_active_hours(now):
+                interval = min(interval, config.POLL_INTERVAL_ACTIVE_SEC)
+
+        decision = PollDecision(
+            interval=float(min(max(interval, lower), upper)),
+            reason=reason,
+            expected_per_hour=expected,
+            recent_per_hour=recent,
+            empty_streak=self._empty_streak,
+            error_streak=self._error_streak,
+        )
+        if self._last_decision is None or self._last_decision.reason != decision.reason:
+            logger.info(
+                f'[scheduler] 間隔 {decision.interval:.0f}s (理由={decision.reason}, '
+                f'平常={"-" if expected is None else f"{expected:.1f}"}/h, 直近={recent:.1f}/h, '
+                f'新着なし={decision.empty_streak} 回, エラー={decision.error_streak} 回)'
+            )
+        self._last_decision = decision
+        self._write_metrics(decision)
+        return decision
+
+    # ── メトリクス ─────────────────────────────────
+
+    def _write_metrics(self, decision: PollDecision) -> None:
+        path = config.SCHEDULER_METRICS_PATH
+        if not path:
+            return
+        lines = [
+            '# HELP navikuru_poll_interval_seconds 次のポーリングまでの間隔',
+            '# TYPE navikuru_poll_interval_seconds gauge',
+            f'navikuru_poll_interval_seconds{{reason="{decision.reason}"}} {decision.interval}',
+            '# TYPE navikuru_expected_arrivals_per_hour gauge',
+            f'navikuru_expected_arrivals_per_hour {decision.expected_per_hour if decision.expected_per_hour is not None else "NaN"}',
+            '# TYPE navikuru_recent_arrivals_per_hour gauge',
+            f'navikuru_recent_arrivals_per_hour {decision.recent_per_hour}',
+            '# TYPE navikuru_empty_poll_streak gauge',
+            f'navikuru_empty_poll_streak {decision.empty_streak}',
+            '# TYPE navikuru_error_streak gauge',
+            f'navikuru_error_streak {decision.error_streak}',
+            '# TYPE navikuru_polls_total counter',
+            f'navikuru_polls_total {self._polls_total}',
+            '# TYPE navikuru_arrivals_total counter',
+            f'navikuru_arrivals_total {self._arrivals_total}',
+            '# TYPE navikuru_poll_errors_total counter',
+            f'navikuru_poll_errors_total {self._errors_total}',
+        ]
+        tmp = f'{path}.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f'[scheduler] メトリクス書き込み失敗: {e}')
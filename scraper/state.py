@@ -0,0 +1,172 @@
+"""
+scraper/state.py — スクレイパーの永続状態（ローカル SQLite）
+
+  watermark     : 取り込み済みの最新 external_service_id（再起動後もここから再開する）
+  outbox        : 一覧から取得したが Django API の受信確認がまだのエントリ
+  arrival_hours : 1 時間ごとの新着件数（ポーリング間隔の調整用。稼働していた時間帯のみ記録）
+
+取得したエントリは outbox への書き込みとウォーターマークの更新を 1 トランザクションで行い、
+その後 outbox を Django API へ送る。送信に失敗したエントリは指数バックオフで再送する。
+プロセスが途中で落ちても、取得済みのエントリは outbox に残り次回起動時に送られる。
+"""
+import json
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watermark (
+    name  TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    seq                 INTEGER PRIMARY KEY AUTOINCREMENT,
+    external_service_id TEXT NOT NULL UNIQUE,
+    payload             TEXT NOT NULL,
+    attempts            INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at     REAL NOT NULL,
+    last_error          TEXT NOT NULL DEFAULT '',
+    created_at          REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_next_attempt ON outbox (next_attempt_at);
+CREATE TABLE IF NOT EXISTS arrival_hours (
+    hour_start INTEGER PRIMARY KEY,
+    weekday    INTEGER NOT NULL,
+    hour       INTEGER NOT NULL,
+    arrivals   INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_arrival_hours_slot ON arrival_hours (weekday, hour);
+"""
+
+_WATERMARK_NAVIKURU = 'navikuru_last_id'
+
+
+class ScraperState:
+    """ウォーターマーク・outbox・新着件数の履歴を保持するローカル SQLite（単一スレッドから使用する）"""
+
+    def __init__(self, path: str, retry_base_sec: float = 30, retry_max_sec: float = 1800):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=FULL')
+        self._conn.executescript(_SCHEMA)
+        self._retry_base_sec = retry_base_sec
+        self._retry_max_sec  = retry_max_sec
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ── ウォーターマーク ─────────────────────────────
+
+    def get_watermark(self) -> str | None:
+        row = self._conn.execute(
+            'SELECT value FROM watermark WHERE name = ?', (_WATERMARK_NAVIKURU,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def stage(self, entries: list[dict], watermark: str) -> None:
+        """エントリを outbox に積み、ウォーターマークを進める（1 トランザクション）"""
+        now = time.time()
+        with self._transaction():
+            self._conn.executemany(
+                """
+                INSERT INTO outbox (external_service_id, payload, next_attempt_at, created_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (external_service_id) DO UPDATE SET
+                    payload = excluded.payload,
+                    next_attempt_at = excluded.next_attempt_at
+                """,
+                [
+                    (entry['external_service_id'], json.dumps(entry, ensure_ascii=False), now, now)
+                    for entry in entries
+                ],
+            )
+            self._conn.execute(
+                'INSERT INTO watermark (name, value) VALUES (?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET value = excluded.value',
+                (_WATERMARK_NAVIKURU, watermark),
+            )
+
+    # ── outbox ─────────────────────────────────────
+
+    def due_entries(self, limit: int) -> list[dict]:
+        """送信時刻に達したエントリを取得順に返す"""
+        rows = self._conn.execute(
+            'SELECT payload FROM outbox WHERE next_attempt_at <= ? ORDER BY seq LIMIT ?',
+            (time.time(), limit),
+        ).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def ack(self, external_service_ids: list[str]) -> None:
+        """受信確認が取れたエントリを outbox から削除する"""
+        with self._transaction():
+            self._conn.executemany(
+                'DELETE FROM outbox WHERE external_service_id = ?',
+                [(external_service_id,) for external_service_id in external_service_ids],
+            )
+
+    def retry_later(self, failures: dict[str, str]) -> None:
+        """送信に失敗したエントリ（external_service_id → エラー）の次回送信時刻を指数バックオフで延ばす"""
+        now = time.time()
+        with self._transaction():
+            for external_service_id, error in failures.items():
+                row = self._conn.execute(
+                    'SELECT attempts FROM outbox WHERE external_service_id = ?', (external_service_id,)
+                ).fetchone()
+                if row is None:
+                    continue
+                attempts = row[0] + 1
+                delay = min(self._retry_base_sec * 2 ** (attempts - 1), self._retry_max_sec)
+                self._conn.execute(
+                    'UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? '
+                    'WHERE external_service_id = ?',
+                    (attempts, now + delay, error[:500], external_service_id),
+                )
+
+    def pending_count(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    # ── 新着件数の履歴 ─────────────────────────────
+
+    def record_arrivals(self, hour_start: int, weekday: int, hour: int, count: int) -> None:
+        """hour_start（その時間帯の開始 UNIX 秒）の新着件数に count を加算する（0 件でも稼働記録として残す）"""
+        self._conn.execute(
+            'INSERT INTO arrival_hours (hour_start, weekday, hour, arrivals) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (hour_start) DO UPDATE SET arrivals = arrivals + excluded.arrivals',
+            (hour_start, weekday, hour, count),
+        )
+
+    def slot_arrival_stats(self, weekday: int, hour: int, since: int) -> tuple[int, float]:
+        """曜日・時間帯ごとの (記録時間数, 1 時間あたり平均新着件数)。since より前の記録は使わない"""
+        samples, average = self._conn.execute(
+            'SELECT COUNT(*), AVG(arrivals) FROM arrival_hours WHERE weekday = ? AND hour = ? AND hour_start >= ?',
+            (weekday, hour, since),
+        ).fetchone()
+        return samples, average or 0.0
+
+    def prune_arrivals(self, before: int) -> None:
+        self._conn.execute('DELETE FROM arrival_hours WHERE hour_start < ?', (before,))
+
+    # ── 内部 ───────────────────────────────────────
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+
+class _Transaction:
+    """autocommit 接続上の BEGIN IMMEDIATE 〜 COMMIT / ROLLBACK"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __enter__(self):
+        self._conn.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
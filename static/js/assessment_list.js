@@ -3,12 +3,18 @@
  * 依存: app.js (getCsrf, showToast), Bootstrap 5
  * テンプレート側インライン宣言が必要な変数: currentUserDisplayName
  * window.resetAndLoad を公開し、sidebar.js の通知ポーリングから呼ばれる。
+ * 一覧は /sateiinfo/api/assessments/?mode=cursor で取得し、末尾到達時に続きを読み込む。
  */
 
-let currentPage    = 1;
-let perPage        = 100;
-let totalPages     = 1;
+const perPage     = 100;
+const maxPageSize = 200;   // API の per_page 上限
 let currentFilters = {};
+let nextCursor     = null;
+let hasNext        = false;
+let pageRequest    = null;   // 実行中の取得（AbortController）
+let loadedCount    = 0;
+let totalCount     = null;
+let scrollObserver = null;
 
 let statusUpdateModal;
 let assessmentDetailModal;
@@ -18,6 +24,7 @@ document.addEventListener('DOMContentLoaded', () => {
   assessmentDetailModal = new bootstrap.Modal(document.getElementById('assessmentDetailModal'));
   initSearchPanel();
   initBackToTop('backToTopBtn');
+  initInfiniteScroll();
   loadAssessments();
 });
 
@@ -55,34 +62,88 @@ function hideLoading() {
   document.getElementById('loadingOverlay').classList.remove('active');
 }
 
-// ── データ読み込み ────────────────────────────────────────────────────────
+// ── データ読み込み（カーソル方式・無限スクロール） ───────────────────────
 
-function loadAssessments(page = 1) {
-  showLoading();
-  currentPage = page;
+function hasActiveFilters() {
+  return Object.values(currentFilters).some(v => v);
+}
+
+function requestAssessmentPage(cursor, size, withCount, signal) {
+  const params = new URLSearchParams({ ...currentFilters, mode: 'cursor', per_page: size });
+  if (cursor) params.set('cursor', cursor);
+  if (withCount) params.set('with_count', '1');
 
-  const params = new URLSearchParams({ page: currentPage, per_page: perPage });
-  fetch(`/sateiinfo/api/assessments/?${params}`)
+  return fetch(`/sateiinfo/api/assessments/?${params}`, { signal })
     .then(r => r.json())
     .then(data => {
-      if (data.success) {
-        renderTable(data.data);
-        updatePagination(data);
-      }
-    })
-    .catch(error => {
-      console.error('Error:', error);
-      showToast('エラー', 'データの読み込みに失敗しました', 'danger');
-    })
-    .finally(() => hideLoading());
+      if (!data.success) throw new Error(data.message);
+      return data;
+    });
 }
 
-// ── 検索 ─────────────────────────────────────────────────────────────────
+/**
+ * 一覧を取得して描画する。
+ * reset=true で先頭から読み直し、false で next_cursor の続きを末尾に追加する。
+ * reset は実行中の取得（スクロールでの追加読み込みを含む）を取り消して優先する。
+ * keepRows を指定した reset は、先頭からその件数までを読み直す（読み込み済みの行を残したまま最新にする）。
+ * 総件数は COUNT(*) が重いため、検索条件がある場合の先頭ページでのみ要求する。
+ */
+async function fetchAssessmentPage(reset, errorMessage, keepRows = 0) {
+  if (!reset && (pageRequest || !hasNext)) return;
+  if (pageRequest) pageRequest.abort();
+
+  const controller = new AbortController();
+  pageRequest = controller;
+  if (reset) showLoading();
+  toggleScrollLoading(!reset);
+
+  try {
+    const pages = [];
+    let cursor = reset ? null : nextCursor;
+    let rows   = 0;
+    do {
+      const size = reset ? Math.min(Math.max(keepRows - rows, perPage), maxPageSize) : perPage;
+      const page = await requestAssessmentPage(cursor, size, reset && !pages.length && hasActiveFilters(), controller.signal);
+      pages.push(page);
+      rows  += page.count;
+      cursor = page.next_cursor;
+    } while (reset && rows < keepRows && pages[pages.length - 1].has_next);
+
+    const last = pages[pages.length - 1];
+    if (reset) {
+      loadedCount = 0;
+      totalCount  = pages[0].total_count;
+    }
+    pages.forEach((page, index) => renderTable(page.data, !reset || index > 0));
+    loadedCount += rows;
+    nextCursor   = last.next_cursor;
+    hasNext      = last.has_next;
+    updateSummary();
+  } catch (error) {
+    if (error.name === 'AbortError') return;
+    console.error('Error:', error);
+    showToast('エラー', errorMessage, 'danger');
+  } finally {
+    if (pageRequest === controller) {
+      pageRequest = null;
+      if (reset) hideLoading();
+      toggleScrollLoading(false);
+    }
+  }
+}
+
+function loadAssessments() {
+  currentFilters = {};
+  fetchAssessmentPage(true, 'データの読み込みに失敗しました');
+}
 
-function searchAssessments(page = 1) {
-  showLoading();
-  currentPage = page;
+function loadMoreAssessments() {
+  fetchAssessmentPage(false, 'データの読み込みに失敗しました');
+}
 
+// ── 検索 ─────────────────────────────────────────────────────────────────
+
+function searchAssessments() {
   currentFilters = {
     customer_name:      document.getElementById('customerName').value,
     phone_number:       document.getElementById('phoneNumber').value,
@@ -94,21 +155,7 @@ function searchAssessments(page = 1) {
     date_from:          document.getElementById('dateFrom').value,
     date_to:            document.getElementById('dateTo').value,
   };
-
-  const params = new URLSearchParams({ ...currentFilters, page: currentPage, per_page: perPage });
-  fetch(`/sateiinfo/api/assessments/?${params}`)
-    .then(r => r.json())
-    .then(data => {
-      if (data.success) {
-        renderTable(data.data);
-        updatePagination(data);
-      }
-    })
-    .catch(error => {
-      console.error('Error:', error);
-      showToast('エラー', '検索に失敗しました', 'danger');
-    })
-    .finally(() => hideLoading());
+  fetchAssessmentPage(true, '検索に失敗しました');
 }
 
 function clearSearch() {
@@ -117,95 +164,42 @@ function clearSearch() {
 }
 
 function refreshCurrentList() {
-  if (Object.values(currentFilters).some(v => v)) {
-    searchAssessments(currentPage);
-  } else {
-    loadAssessments(currentPage);
-  }
+  const scrollY = window.scrollY;
+  fetchAssessmentPage(true, 'データの読み込みに失敗しました', loadedCount)
+    .then(() => window.scrollTo(0, scrollY));
 }
 
 // window に公開（sidebar.js の通知ポーリングから参照される）
 window.resetAndLoad = function resetAndLoad() {
   clearSearch();
-  currentPage = 1;
-  loadAssessments(1);
+  loadAssessments();
 };
 
-// ── ページネーション ──────────────────────────────────────────────────────
+// ── 無限スクロール ────────────────────────────────────────────────────────
 
-function updatePagination(data) {
-  document.getElementById('totalCount').textContent = data.total_count.toLocaleString();
-  const start = data.total_count > 0 ? (data.page - 1) * data.per_page + 1 : 0;
-  const end   = Math.min(data.page * data.per_page, data.total_count);
-  document.getElementById('pageStart').textContent = start.toLocaleString();
-  document.getElementById('pageEnd').textContent   = end.toLocaleString();
-  totalPages = data.total_pages;
-  renderPagination(data);
+function initInfiniteScroll() {
+  const sentinel = document.getElementById('assessmentScrollSentinel');
+  if (!sentinel || !('IntersectionObserver' in window)) return;
+  scrollObserver = new IntersectionObserver(entries => {
+    if (entries.some(entry => entry.isIntersecting)) loadMoreAssessments();
+  }, { rootMargin: '400px 0px' });
+  scrollObserver.observe(sentinel);
 }
 
-function renderPagination(data) {
-  const containerTop    = document.getElementById('paginationContainerTop');
-  const containerBottom = document.getElementById('paginationContainerBottom');
-  const rowTop          = document.getElementById('paginationTopRow');
-  const rowBottom       = document.getElementById('paginationBottomRow');
-
-  if (data.total_pages <= 1) {
-    rowTop.style.display    = 'none';
-    rowBottom.style.display = 'none';
-    return;
-  }
-
-  rowTop.style.display    = 'block';
-  rowBottom.style.display = 'block';
-  let html = '';
-
-  html += `
-    <li class="page-item ${!data.has_previous ? 'disabled' : ''}">
-      <a class="page-link" href="#" onclick="event.preventDefault(); ${data.has_previous ? 'goToPage(' + (data.page - 1) + ')' : ''}">
-        <i class="bi bi-chevron-left"></i> 前へ
-      </a>
-    </li>`;
-
-  const maxButtons = 5;
-  let startPage = Math.max(1, data.page - Math.floor(maxButtons / 2));
-  let endPage   = Math.min(data.total_pages, startPage + maxButtons - 1);
-  if (endPage - startPage < maxButtons - 1) startPage = Math.max(1, endPage - maxButtons + 1);
-
-  if (startPage > 1) {
-    html += `<li class="page-item"><a class="page-link" href="#" onclick="event.preventDefault(); goToPage(1)">1</a></li>`;
-    if (startPage > 2) html += `<li class="page-item disabled"><span class="page-link">...</span></li>`;
-  }
-
-  for (let i = startPage; i <= endPage; i++) {
-    html += `
-      <li class="page-item ${i === data.page ? 'active' : ''}">
-        <a class="page-link" href="#" onclick="event.preventDefault(); goToPage(${i})">${i}</a>
-      </li>`;
-  }
-
-  if (endPage < data.total_pages) {
-    if (endPage < data.total_pages - 1) html += `<li class="page-item disabled"><span class="page-link">...</span></li>`;
-    html += `<li class="page-item"><a class="page-link" href="#" onclick="event.preventDefault(); goToPage(${data.total_pages})">${data.total_pages}</a></li>`;
-  }
-
-  html += `
-    <li class="page-item ${!data.has_next ? 'disabled' : ''}">
-      <a class="page-link" href="#" onclick="event.preventDefault(); ${data.has_next ? 'goToPage(' + (data.page + 1) + ')' : ''}">
-        次へ <i class="bi bi-chevron-right"></i>
-      </a>
-    </li>`;
-
-  containerTop.innerHTML    = html;
-  containerBottom.innerHTML = html;
+function toggleScrollLoading(visible) {
+  const el = document.getElementById('assessmentScrollLoading');
+  if (el) el.classList.toggle('d-none', !visible);
 }
 
-function goToPage(page) {
-  if (Object.values(currentFilters).some(v => v)) {
-    searchAssessments(page);
-  } else {
-    loadAssessments(page);
-  }
-  window.scrollTo({ top: 0, behavior: 'smooth' });
+function updateSummary() {
+  document.getElementById('totalCount').textContent =
+    totalCount !== null && totalCount !== undefined
+      ? totalCount.toLocaleString()
+      : `${loadedCount.toLocaleString()}${hasNext ? '+' : ''}`;
+  document.getElementById('loadedCount').textContent = loadedCount.toLocaleString();
+
+  const moreBtn = document.getElementById('loadMoreBtn');
+  if (moreBtn) moreBtn.classList.toggle('d-none', !hasNext);
 }
 
 // ── テーブル描画 ──────────────────────────────────────────────────────────
@@ -216,11 +210,11 @@ function formatOwnerName(value) {
   return raw.split(/\s+/).filter(Boolean).map(part => escapeHtml(part)).join('<br>');
 }
 
-function renderTable(data) {
+function renderTable(data, append = false) {
   const feed = document.getElementById('assessmentFeedContainer');
 
   if (data.length === 0) {
-    feed.innerHTML = '<p class="text-center text-muted py-4 mb-0">データがありません</p>';
+    if (!append) feed.innerHTML = '<p class="text-center text-muted py-4 mb-0">データがありません</p>';
     return;
   }
 
@@ -260,7 +254,7 @@ function renderTable(data) {
     return `<span class="ui-badge ${cls}">${escapeHtml(follow)}</span>`;
   };
 
-  feed.innerHTML = data.map(item => {
+  const html = data.map(item => {
     const owner = (item.sales_owner_name || '').trim();
     const encodedStatus = encodeURIComponent(item.follow_status || '未対応');
     const encodedNote   = encodeURIComponent(item.sales_note || '');
@@ -303,6 +297,12 @@ function renderTable(data) {
       </div>
     </div>`;
   }).join('');
+
+  if (append) {
+    feed.insertAdjacentHTML('beforeend', html);
+  } else {
+    feed.innerHTML = html;
+  }
 }
 
 // ── 通話記録 ─────────────────────────────────────────────────────────────
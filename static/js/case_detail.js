@@ -372,6 +372,13 @@ function saveVehicle() {
   });
 }
 
+// 取り込みはジョブとして登録し、完了するまで状態 API をポーリングする。
+// 待つ上限はサーバーの JOB_TIMEOUT（応答の timeout_sec）。過ぎたジョブはサーバー側で失敗になるため、
+// 通常はその応答で終わり、IMPORT_JOB_GRACE_MS は状態 API に届かない場合の余裕
+const IMPORT_JOB_POLL_MS            = 1500;
+const IMPORT_JOB_DEFAULT_TIMEOUT_MS = 600 * 1000;
+const IMPORT_JOB_GRACE_MS           = 30 * 1000;
+
 function importFromAssessmentSystem() {
   const assessmentSystemId = document.getElementById('assessmentSystemId').value.trim();
   if (!assessmentSystemId) {
@@ -387,12 +394,8 @@ function importFromAssessmentSystem() {
   })
   .then(r => r.json())
   .then(d => {
-    _hideImportOverlay();
-    if (d.success) {
-      _showImportConfirmModal(d);
-    } else {
-      alert(d.message || '取り込みに失敗しました');
-    }
+    const timeoutMs = d.timeout_sec ? d.timeout_sec * 1000 : IMPORT_JOB_DEFAULT_TIMEOUT_MS;
+    _handleImportJob(d, Date.now() + timeoutMs + IMPORT_JOB_GRACE_MS);
   })
   .catch(() => {
     _hideImportOverlay();
@@ -400,6 +403,35 @@ function importFromAssessmentSystem() {
   });
 }
 
+function _handleImportJob(d, deadline) {
+  if (d.status === 'done') {
+    _hideImportOverlay();
+    _showImportConfirmModal(d);
+    return;
+  }
+  if (!d.success || d.status === 'failed') {
+    _hideImportOverlay();
+    alert(d.message || '取り込みに失敗しました');
+    return;
+  }
+  _pollImportJob(d.job_id, deadline);
+}
+
+function _pollImportJob(jobId, deadline) {
+  if (Date.now() >= deadline) {
+    _hideImportOverlay();
+    alert('取り込みに時間がかかっています。しばらくしてから画面を再読み込みしてください');
+    return;
+  }
+
+  setTimeout(() => {
+    apiFetch(`/sateiinfo/api/cases/${ASSESSMENT_ID}/import-assessment-system/${jobId}/`)
+      .then(r => r.json())
+      .then(d => _handleImportJob(d, deadline))
+      .catch(() => _pollImportJob(jobId, deadline));
+  }, IMPORT_JOB_POLL_MS);
+}
+
 function _showImportOverlay() {
   let overlay = document.getElementById('importLoadingOverlay');
   if (!overlay) {
@@ -1,6 +1,6 @@
 /**
  * sidebar.js — サイドバー関連の JS
- * 勤怠タイマー と グローバル通知ポーリング
+ * 勤怠タイマー と グローバル新着通知（SSE / ロングポーリング / 定期ポーリング）
  * _internal_header_sidebar.html の <script> タグから切り出したもの。
  */
 
@@ -47,7 +47,7 @@
   setInterval(updateDuration, 30000);
 })();
 
-// ── グローバル通知ポーリング ──────────────────────────────────────────────
+// ── グローバル新着通知 ──────────────────────────────────────────────────
 (function () {
   const storageKey    = 'globalLatestAssessmentId';
   const recentKey     = 'globalRecentAssessmentNotifications';
@@ -156,37 +156,128 @@
     return latestId;
   };
 
-  const pollNewAssessments = async () => {
-    const lastId = await ensureBaseline();
-    if (lastId <= 0) return;
+  const handleNewRecords = (records, count, persist) => {
+    const lastId = toInt(localStorage.getItem(storageKey));
+    const latestId = Math.max(...records.map(item => toInt(item.id)));
+    if (latestId > lastId) localStorage.setItem(storageKey, String(latestId));
 
-    const res = await fetch(`/sateiinfo/api/check-new/?last_id=${lastId}`);
-    if (!res.ok) return;
+    // 通知履歴は受信したタブ（接続担当）だけが書き込む。他タブは再描画のみ
+    if (persist) {
+      const first = records[0] || {};
+      const recent = getRecent();
+      recent.unshift({
+        id:    Date.now(),
+        title: `${count}件の新着申込`,
+        body:  `${first.application_number || '-'} ${first.customer_name || ''}`.trim(),
+        time:  new Date().toLocaleString('ja-JP'),
+      });
+      setRecent(recent);
+    }
 
-    const data = await res.json();
-    if (!data.success || !data.has_new || !Array.isArray(data.data) || data.data.length === 0) return;
+    unseenCount += count;
+    renderBadge();
+    renderRecentList();
+    showGlobalNewToast(records, count);
+  };
 
-    const latestId = Math.max(...data.data.map(item => toInt(item.id)));
-    if (latestId > lastId) localStorage.setItem(storageKey, String(latestId));
+  // ── 新着の受信（SSE → ロングポーリング → 定期ポーリングの順で試す。前の 2 つは ASGI 配信時のみ） ──
+  // サーバーへの接続はブラウザ内で 1 タブだけが持ち、受信内容は BroadcastChannel で他タブに配る
+  const channel = 'BroadcastChannel' in window ? new BroadcastChannel('globalAssessmentFeed') : null;
+  if (channel) {
+    channel.addEventListener('message', (e) => {
+      const payload = e.data || {};
+      if (Array.isArray(payload.data) && payload.data.length > 0) {
+        handleNewRecords(payload.data, toInt(payload.count), false);
+      }
+    });
+  }
+
+  const dispatchNewRecords = (payload) => {
+    if (!Array.isArray(payload.data) || payload.data.length === 0) return;
+    const message = { count: toInt(payload.count), data: payload.data };
+    handleNewRecords(message.data, message.count, true);
+    if (channel) channel.postMessage(message);
+  };
 
-    const first = data.data[0] || {};
-    const recent = getRecent();
-    recent.unshift({
-      id:    Date.now(),
-      title: `${data.count}件の新着申込`,
-      body:  `${first.application_number || '-'} ${first.customer_name || ''}`.trim(),
-      time:  new Date().toLocaleString('ja-JP'),
+  const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+  // 接続できなくなったら resolve する（→ ロングポーリングへ切り替え）
+  const runEventStream = () => new Promise((resolve) => {
+    const lastId = toInt(localStorage.getItem(storageKey));
+    const source = new EventSource(`/sateiinfo/api/check-new/stream/?last_id=${lastId}`);
+
+    source.addEventListener('ready', (e) => {
+      const data = JSON.parse(e.data);
+      if (toInt(localStorage.getItem(storageKey)) <= 0) {
+        localStorage.setItem(storageKey, String(toInt(data.latest_id)));
+      }
     });
-    setRecent(recent);
+    source.addEventListener('assessments', (e) => dispatchNewRecords(JSON.parse(e.data)));
+    source.addEventListener('error', () => {
+      // 一時的な切断はブラウザが Last-Event-ID 付きで自動再接続する。
+      // 503（WSGI 配信）や 401 で CLOSED になった場合のみ諦める
+      if (source.readyState === EventSource.CLOSED) {
+        source.close();
+        resolve();
+      }
+    });
+  });
 
-    unseenCount += data.count;
-    renderBadge();
-    renderRecentList();
-    showGlobalNewToast(data.data, data.count);
+  // 503（WSGI 配信）なら resolve する（→ 定期ポーリングへ切り替え）
+  const runLongPolling = async () => {
+    for (;;) {
+      try {
+        const lastId = await ensureBaseline();
+        const res = await fetch(`/sateiinfo/api/check-new/wait/?last_id=${lastId}`);
+        if (res.status === 503) return;
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        const data = await res.json();
+        if (data.success && data.has_new) {
+          dispatchNewRecords(data);
+        } else if (toInt(data.latest_id) > lastId) {
+          localStorage.setItem(storageKey, String(toInt(data.latest_id)));
+        }
+      } catch {
+        await sleep(30000);
+      }
+    }
+  };
+
+  // 定期ポーリング（WSGI 配信時）。続きがある間（has_more）は間を空けずに読み進める
+  const runShortPolling = async () => {
+    for (;;) {
+      try {
+        const lastId = await ensureBaseline();
+        if (lastId > 0) {
+          const res = await fetch(`/sateiinfo/api/check-new/?last_id=${lastId}`);
+          if (!res.ok) throw new Error(`HTTP ${res.status}`);
+          const data = await res.json();
+          if (data.success && data.has_new) dispatchNewRecords(data);
+          if (data.success && toInt(data.next_last_id) > toInt(localStorage.getItem(storageKey))) {
+            localStorage.setItem(storageKey, String(toInt(data.next_last_id)));
+          }
+          if (data.success && data.has_more) continue;
+        }
+      } catch {
+        // 次の周期で再試行する
+      }
+      await sleep(30000);
+    }
+  };
+
+  const startFeed = async () => {
+    await ensureBaseline().catch(() => 0);
+    if ('EventSource' in window) await runEventStream();
+    await runLongPolling();
+    await runShortPolling();
   };
 
   renderRecentList();
   renderBadge();
-  ensureBaseline().catch(() => {});
-  setInterval(() => { pollNewAssessments().catch(() => {}); }, 30000);
+  if (navigator.locks) {
+    // ロックを取れたタブだけが接続を持つ（タブを閉じるとロックが解放され、別タブが引き継ぐ）
+    navigator.locks.request('globalAssessmentFeed', () => startFeed());
+  } else {
+    startFeed();
+  }
 })();
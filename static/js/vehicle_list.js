@@ -82,24 +82,34 @@ function selectExportDoc(btn) {
   });
 }
 
-// 資料キー → 出力形式 → URL要素ID のマッピング
+// 資料キー → CSV の URL要素ID のマッピング（PDF は出力ジョブで生成する）
 const EXPORT_URL_MAP = {
-  vehicle_list: { csv: 'exportUrlCsv',          pdf: 'exportUrlPdf' },
-  inventory:    { csv: 'exportUrlInventoryCsv',  pdf: 'exportUrlInventoryPdf' },
-  ledger:       { csv: 'exportUrlLedgerCsv',     pdf: 'exportUrlLedgerPdf' },
+  vehicle_list: 'exportUrlCsv',
+  inventory:    'exportUrlInventoryCsv',
+  ledger:       'exportUrlLedgerCsv',
 };
 
+// 出力ジョブの状態確認間隔（ミリ秒）と打ち切りまでの回数（約 10 分）
+const EXPORT_JOB_POLL_MS = 2000;
+const EXPORT_JOB_MAX_POLLS = 300;
+
 /**
  * CSV または PDF を出力する。
  * @param {'csv'|'pdf'} format
  */
 function doExport(format) {
-  const urlMap = EXPORT_URL_MAP[_currentDocKey];
-  if (!urlMap) {
+  if (!EXPORT_URL_MAP[_currentDocKey]) {
     showToast('エラー', '資料の種類が未選択です', 'danger');
     return;
   }
-  const urlEl = document.getElementById(urlMap[format]);
+
+  if (format === 'pdf') {
+    bootstrap.Modal.getOrCreateInstance(document.getElementById('exportModal')).hide();
+    startPdfExportJob(_currentDocKey);
+    return;
+  }
+
+  const urlEl = document.getElementById(EXPORT_URL_MAP[_currentDocKey]);
   if (!urlEl) {
     showToast('エラー', '出力URLが見つかりません', 'danger');
     return;
@@ -108,3 +118,53 @@ function doExport(format) {
   bootstrap.Modal.getOrCreateInstance(document.getElementById('exportModal')).hide();
   window.location.href = urlEl.dataset.url;
 }
+
+
+// ── PDF 出力ジョブ ────────────────────────────────────────────────────────────
+
+/**
+ * PDF 出力ジョブを登録し、完了したらダウンロードする。
+ * 同じ条件・同じデータの PDF が作成済みなら即座にダウンロードが始まる。
+ * @param {string} docKey - 'vehicle_list' | 'inventory' | 'ledger'
+ */
+function startPdfExportJob(docKey) {
+  const query = document.getElementById('exportJobQuery')?.dataset.query || '';
+
+  apiFetch(`/sateiinfo/api/export-jobs/?export_type=${encodeURIComponent(docKey)}&${query}`, { method: 'POST' })
+    .then(r => r.json())
+    .then(d => {
+      if (!d.success) {
+        showToast('エラー', d.message, 'danger');
+        return;
+      }
+      if (d.status === 'done') {
+        window.location.href = d.download_url;
+        return;
+      }
+      showToast('PDF出力', 'PDF を作成しています。完了すると自動でダウンロードされます', 'info');
+      pollPdfExportJob(d.job_id, 0);
+    })
+    .catch(err => showToast('エラー', '通信エラー: ' + err.message, 'danger'));
+}
+
+function pollPdfExportJob(jobId, count) {
+  if (count >= EXPORT_JOB_MAX_POLLS) {
+    showToast('エラー', 'PDF の作成に時間がかかっています。しばらくしてから再度お試しください', 'danger');
+    return;
+  }
+
+  setTimeout(() => {
+    apiFetch(`/sateiinfo/api/export-jobs/${jobId}/`)
+      .then(r => r.json())
+      .then(d => {
+        if (d.status === 'done') {
+          window.location.href = d.download_url;
+        } else if (d.status === 'failed' || !d.success) {
+          showToast('エラー', d.message, 'danger');
+        } else {
+          pollPdfExportJob(jobId, count + 1);
+        }
+      })
+      .catch(() => pollPdfExportJob(jobId, count + 1));
+  }, EXPORT_JOB_POLL_MS);
+}